@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+# bench_icp.py
+# 스캔 정합 벤치마크: icp2d (SE(2) point-to-line) vs open3d point-to-point (LiDAR 페이지의 예전 방식)
+#   python bench_icp.py                          # 풀장 시뮬레이터 스캔 (정답 이동량 있음 → 오차 측정)
+#   python bench_icp.py --log rpi/runs/pool1     # 기록 스캔 (scan_log 형식, 정답 없음 → 두 방식 차이/잔차)
+#   옵션: --frames 300 --skip 1 --index kdtree|grid --seed 0
+# 프레임 쌍마다 ms (p50/p90/max), 정답 대비 이동 오차(mm)/회전 오차(deg), 정합 실패 수 출력
+# 시뮬레이터 입력이면 누적 드리프트도: 스캔-스캔 vs 키프레임 서브맵(slam2d) vs 서브맵+포즈 그래프
+
+import os, sys, time, math, argparse
+import numpy as np
+from icp2d import ICP2D
+from slam2d import SubmapSLAM
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "rpi"))
+from loop_sched import LatencyHistogram
+from pool_sim import PoolSim
+from scan_log import ScanLog
+
+try:
+    import open3d as o3d
+    HAS_O3D = True
+except Exception:
+    HAS_O3D = False
+
+def pol2xy(theta, r, max_r):
+    m = np.isfinite(r) & (r > 0.05) & (r < max_r)
+    return np.stack([r[m]*np.cos(theta[m]), r[m]*np.sin(theta[m])], axis=1).astype(np.float32)
+
+def o3d_icp(curr_xy, prev_xy):
+    """LiDAR 페이지의 예전 icp_step 그대로 (3D 점군 두 개 생성 + point-to-point 30회)."""
+    if curr_xy.shape[0] < 50 or prev_xy.shape[0] < 50:
+        return 0.0, 0.0, 0.0
+    src = o3d.geometry.PointCloud(); src.points = o3d.utility.Vector3dVector(np.c_[curr_xy, np.zeros(len(curr_xy))])
+    tgt = o3d.geometry.PointCloud(); tgt.points = o3d.utility.Vector3dVector(np.c_[prev_xy, np.zeros(len(prev_xy))])
+    reg = o3d.pipelines.registration.registration_icp(
+        src, tgt, 0.30, np.eye(4),
+        o3d.pipelines.registration.TransformationEstimationPointToPoint(),
+        o3d.pipelines.registration.ICPConvergenceCriteria(max_iteration=30))
+    T4 = reg.transformation
+    return float(T4[0,3]), float(T4[1,3]), float(np.arctan2(T4[1,0], T4[0,0]))
+
+# ----- 입력 -----
+def sim_frames(n, seed, max_r):
+    """풀장 시뮬레이터 (자동조종) → [(xy, 보트 자세 x, y, heading)]"""
+    sim = PoolSim(seed=seed)
+    out = []
+    for _ in range(n):
+        sim.wander(); sim.step(sim.scan_dt)
+        th, rr = sim.scan()
+        out.append((pol2xy(th.astype(np.float64), rr.astype(np.float64), max_r), (sim.x, sim.y, sim.heading)))
+    return out
+
+def log_frames(path, n, max_r):
+    log = ScanLog(path)
+    out = []
+    for i in range(min(n, len(log))):
+        _, ang, rng = log[i]
+        out.append((pol2xy(np.asarray(ang, np.float64), np.asarray(rng, np.float64), max_r), None))
+    return out
+
+def gt_delta(pa, pb):
+    """자세 a→b 상대 이동을 라이다 좌표(0=선수, 시계방향 +, y=오른쪽)로: b 좌표 → a 좌표 변환."""
+    (xa, ya, ha), (xb, yb, hb) = pa, pb
+    c, s = math.cos(ha), math.sin(ha)
+    fx = c*(xb - xa) + s*(yb - ya); ly = -s*(xb - xa) + c*(yb - ya)     # a 기준 (앞, 왼쪽)
+    dth = (hb - ha + math.pi) % (2*math.pi) - math.pi
+    return fx, -ly, -dth
+
+# ----- 실행 -----
+def run(name, fn, pairs):
+    h = LatencyHistogram(); est = []
+    for a, b in pairs:
+        t0 = time.perf_counter()
+        est.append(fn(b, a))
+        h.record(time.perf_counter() - t0)
+    return name, h.summary(), np.asarray(est)
+
+def report(name, s, est, gt, fails=None):
+    line = f"{name:<14} ms p50={s['p50_ms']:>7.3f} p90={s['p90_ms']:>7.3f} max={s['max_ms']:>7.3f}"
+    if gt is not None:
+        et = np.hypot(est[:,0] - gt[:,0], est[:,1] - gt[:,1]) * 1000.0
+        er = np.degrees(np.abs((est[:,2] - gt[:,2] + np.pi) % (2*np.pi) - np.pi))
+        line += (f" | 이동 오차 mm 평균={et.mean():6.1f} p95={np.percentile(et, 95):6.1f}"
+                 f" | 회전 오차 deg 평균={er.mean():5.2f} p95={np.percentile(er, 95):5.2f}")
+    if fails is not None:
+        line += f" | 실패 {fails}"
+    print(line)
+
+def drift(frames):
+    """누적 자세 오차: 스캔-스캔(ICP2D.step) vs 키프레임 서브맵(SubmapSLAM), 시작 자세 기준."""
+    p0 = frames[0][1]
+    gt = np.array([gt_delta(p0, f[1]) for f in frames])
+    for name, mk in (("스캔-스캔", lambda: ICP2D()), ("서브맵", lambda: SubmapSLAM()),
+                     ("서브맵+PGO", lambda: SubmapSLAM(pgo=True))):
+        m = mk(); h = LatencyHistogram(); T = np.eye(3); est = []
+        for xy, _ in frames:
+            t0 = time.perf_counter()
+            if isinstance(m, ICP2D):
+                dx, dy, dth = m.step(xy)
+                c, s = math.cos(dth), math.sin(dth)
+                T = T @ np.array([[c, -s, dx], [s, c, dy], [0, 0, 1]])
+                est.append((T[0, 2], T[1, 2], math.atan2(T[1, 0], T[0, 0])))
+            else:
+                est.append(m.update(xy))
+            h.record(time.perf_counter() - t0)
+        est = np.asarray(est); s_ = h.summary()
+        et = np.hypot(est[:, 0] - gt[:, 0], est[:, 1] - gt[:, 1])
+        extra = f" 키프레임={m.stats()['keyframes']} 루프={m.stats()['loops']}" if isinstance(m, SubmapSLAM) else ""
+        print(f"드리프트 {name:<10} ms p50={s_['p50_ms']:>7.3f} p90={s_['p90_ms']:>7.3f} | "
+              f"위치 오차 최종={et[-1]*100:6.1f}cm 최대={et.max()*100:6.1f}cm{extra}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--log", help="scan_log 기록 폴더 (없으면 시뮬레이터)")
+    ap.add_argument("--frames", type=int, default=300)
+    ap.add_argument("--skip", type=int, default=1, help="프레임 쌍 간격 (클수록 이동량 큼)")
+    ap.add_argument("--max-range", type=float, default=8.0)
+    ap.add_argument("--index", default="auto", choices=["auto", "kdtree", "grid"])
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    frames = log_frames(args.log, args.frames, args.max_range) if args.log else \
+             sim_frames(args.frames, args.seed, args.max_range)
+    k = max(1, args.skip)
+    pairs = [(frames[i][0], frames[i + k][0]) for i in range(len(frames) - k)]
+    gt = None
+    if frames and frames[0][1] is not None:
+        gt = np.array([gt_delta(frames[i][1], frames[i + k][1]) for i in range(len(frames) - k)])
+    print(f"입력: {'기록 ' + args.log if args.log else '시뮬레이터'}  프레임 쌍={len(pairs)} (간격 {k})  "
+          f"점/스캔 평균={np.mean([len(f[0]) for f in frames]):.0f}")
+
+    # icp2d: 쌍마다 독립 (웜 스타트는 직전 쌍 결과 — 페이지의 step() 과 같은 조건)
+    icp = ICP2D(index=args.index); fails = 0; warm = [(0.0, 0.0, 0.0)]
+    def icp2d_fn(curr, prev):
+        nonlocal fails
+        icp.set_reference(prev)
+        r = icp.match(curr, init=warm[0])
+        if not icp.info["ok"]:
+            fails += 1; r = (0.0, 0.0, 0.0)
+        warm[0] = r
+        return r
+    name, s, est = run(f"icp2d/{icp.index}", icp2d_fn, pairs)
+    report(name, s, est, gt, fails)
+
+    if HAS_O3D:
+        name, s, est_o3d = run("open3d p2p", o3d_icp, pairs)
+        report(name, s, est_o3d, gt)
+        if gt is None:
+            dt = np.hypot(est[:,0] - est_o3d[:,0], est[:,1] - est_o3d[:,1]) * 1000.0
+            print(f"두 방식 차이: 이동 평균 {dt.mean():.1f} mm, "
+                  f"회전 평균 {np.degrees(np.abs(est[:,2] - est_o3d[:,2])).mean():.2f} deg")
+    else:
+        print("open3d 없음 → icp2d 만 측정")
+    if gt is not None:
+        report("정지 가정(0)", {"p50_ms": 0, "p90_ms": 0, "max_ms": 0}, np.zeros_like(gt), gt)
+        drift(frames)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# bench_occ.py
+# 점유맵 갱신 비용: 예전 update_occ (끝점 +0.35, 프레임마다 맵 전체 감쇠) vs occ_grid.OccGrid (광선 추적 + 지연 감쇠)
+#   python bench_occ.py                     # 맵 4/10/20m × 해상도 0.05/0.02m
+#   옵션: --scans 200 --rays 720 --wall 1.6
+# 스캔당 갱신 ms 와 화면 읽기(image) ms 를 따로 출력 — OccGrid 갱신은 맵 크기와 무관해야 함
+# 벽까지 거리(--wall)는 맵 크기와 상관없이 고정 → 광선 길이가 같아서 맵 크기 영향만 따로 보임
+
+import os, sys, time, argparse
+import numpy as np
+from occ_grid import OccGrid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "rpi"))
+from loop_sched import LatencyHistogram
+
+def old_update_occ(m, world_xy, map_size, res, decay_pct=5):
+    """LiDAR 페이지의 예전 update_occ 그대로."""
+    half = map_size/2.0; px = m.shape[0]
+    ix = ((world_xy[:,0] + half)/res).astype(int)
+    iy = ((half - world_xy[:,1])/res).astype(int)
+    inb = (ix>=0)&(iy>=0)&(ix<px)&(iy<px)
+    if np.any(inb):
+        m[iy[inb], ix[inb]] = np.clip(m[iy[inb], ix[inb]] + 0.35, 0.0, 1.0)
+    if decay_pct>0: m[:] *= (1.0 - decay_pct/100.0)
+
+def scans(n, rays, wall, seed=0):
+    """원점 근처에서 조금씩 움직이는 보트 + 반지름 wall·(0.88~1.12) 둥근 벽 (거리 노이즈)."""
+    rng = np.random.default_rng(seed)
+    th = np.linspace(-np.pi, np.pi, rays, endpoint=False)
+    for i in range(n):
+        o = np.array([0.1*np.cos(i*0.05), 0.1*np.sin(i*0.05)])
+        r = wall*(1.0 + 0.12*np.cos(3*th)) + rng.normal(0, 0.01, rays)
+        yield o, np.c_[o[0] + r*np.cos(th), o[1] + r*np.sin(th)]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scans", type=int, default=200)
+    ap.add_argument("--rays", type=int, default=720)
+    ap.add_argument("--wall", type=float, default=1.6, help="벽까지 평균 거리(m), 모든 맵 크기에서 같음 (4m 맵 안에 들어가게 1.6)")
+    args = ap.parse_args()
+    print(f"{'맵':>5} {'해상도':>6} {'셀':>9} | {'예전 ms':>8} | {'OccGrid 갱신 ms':>15} {'읽기 ms':>8}")
+    for size in (4.0, 10.0, 20.0):
+        for res in (0.05, 0.02):
+            m = np.zeros((int(size/res),)*2, np.float32)
+            g = OccGrid(size, res, half_life_s=10.0)
+            h_old, h_new, h_read = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+            for i, (o, pts) in enumerate(scans(args.scans, args.rays, args.wall)):
+                t0 = time.perf_counter(); old_update_occ(m, pts, size, res); h_old.record(time.perf_counter() - t0)
+                now = i * 0.1
+                t0 = time.perf_counter(); g.update(o, pts, now); h_new.record(time.perf_counter() - t0)
+                t0 = time.perf_counter(); g.image(now); h_read.record(time.perf_counter() - t0)   # 페이지처럼 스캔마다
+            print(f"{size:>4.0f}m {res:>6.2f} {m.size:>9,} | {h_old.summary()['mean_ms']:>8.3f} | "
+                  f"{h_new.summary()['mean_ms']:>15.3f} {h_read.summary()['mean_ms']:>8.3f}")
+
+if __name__ == "__main__":
+    main()
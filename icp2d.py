@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+# icp2d.py
+# 2D 스캔 정합: SE(2) point-to-line ICP (open3d 없이 numpy 만)
+#  - 최근접점: scipy cKDTree (없으면 격자 해시 GridNN)
+#  - 오차: 기준 스캔 선분의 법선 방향 거리 (point-to-line) → 벽/직선이 많은 풀장에서 몇 번 만에 수렴
+#  - 이상점 제거: 거리 게이트(max_dist) + 잔차 MAD 기준 3σ
+#  - 웜 스타트: 직전 프레임 결과(등속 가정)에서 시작
+#  - 기준 스캔 법선은 스캔 순서(각도순) 앞뒤 점으로 계산 → pol2xy 출력처럼 각도순 배열을 넣어야 함
+#
+#   icp = ICP2D()
+#   dx, dy, dth = icp.step(xy)     # 직전 스캔 대비 현재 스캔 이동 (현재 좌표 → 직전 좌표 변환)
+#   icp.info                       # {"ok", "iters", "inliers", "fitness", "rmse"}
+
+import math
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+    HAS_SCIPY = True
+except Exception:
+    HAS_SCIPY = False
+
+class GridNN:
+    """cKDTree 대용 격자 해시 최근접점. cell 보다 먼 점은 못 찾을 수 있음 → cell = 게이트 거리로 씀."""
+    _OFF = 1 << 20
+
+    def __init__(self, pts, cell: float):
+        self.pts = np.asarray(pts, np.float64); self.cell = float(cell)
+        k = np.floor(self.pts / self.cell).astype(np.int64)
+        keys = self._keys(k[:, 0], k[:, 1])
+        self.order = np.argsort(keys, kind="stable")
+        self.skeys = keys[self.order]
+
+    def _keys(self, kx, ky):
+        return (kx + self._OFF) * (2 * self._OFF) + (ky + self._OFF)
+
+    def query(self, q, distance_upper_bound=np.inf):
+        """cKDTree.query 와 같은 모양: (거리, 인덱스). 못 찾으면 (inf, len(pts))."""
+        q = np.asarray(q, np.float64)
+        best_d = np.full(len(q), np.inf); best_i = np.full(len(q), len(self.pts), np.intp)
+        kq = np.floor(q / self.cell).astype(np.int64)
+        for ox in (-1, 0, 1):
+            for oy in (-1, 0, 1):
+                key = self._keys(kq[:, 0] + ox, kq[:, 1] + oy)
+                lo = np.searchsorted(self.skeys, key, "left")
+                cnt = np.searchsorted(self.skeys, key, "right") - lo
+                for j in range(int(cnt.max()) if cnt.size else 0):
+                    sel = np.flatnonzero(cnt > j)
+                    idx = self.order[lo[sel] + j]
+                    d = np.hypot(q[sel, 0] - self.pts[idx, 0], q[sel, 1] - self.pts[idx, 1])
+                    b = d < best_d[sel]
+                    best_d[sel[b]] = d[b]; best_i[sel[b]] = idx[b]
+        far = best_d > distance_upper_bound
+        best_d[far] = np.inf; best_i[far] = len(self.pts)
+        return best_d, best_i
+
+def line_normals(xy, jump: float = 0.15):
+    """각도순 점 → (법선 (N,2), 유효 마스크). 앞뒤 점 간격이 jump 보다 크면(가장자리/끊김) 무효."""
+    n = len(xy)
+    nrm = np.zeros((n, 2)); ok = np.zeros(n, bool)
+    if n < 3:
+        return nrm, ok
+    gap = np.hypot(*(xy[1:] - xy[:-1]).T)                  # 점 i 와 i+1 사이
+    t = np.empty_like(xy)
+    t[1:-1] = xy[2:] - xy[:-2]; t[0] = xy[1] - xy[0]; t[-1] = xy[-1] - xy[-2]
+    ok[1:-1] = (gap[:-1] < jump) & (gap[1:] < jump)
+    ok[0] = gap[0] < jump; ok[-1] = gap[-1] < jump
+    L = np.hypot(t[:, 0], t[:, 1])
+    ok &= L > 1e-9
+    L[~ok] = 1.0
+    nrm[:, 0] = -t[:, 1] / L; nrm[:, 1] = t[:, 0] / L
+    return nrm, ok
+
+class ICP2D:
+    def __init__(self, max_iter: int = 20, max_dist: float = 0.30, min_pts: int = 30,
+                 tol_xy: float = 1e-4, tol_th: float = 1e-4, jump: float = 0.15, index: str = "auto"):
+        """
+        max_dist : 대응점 게이트(m). 이보다 먼 최근접점은 버림
+        min_pts  : 정합에 필요한 최소 대응점 수 (모자라면 실패 → 이동 0)
+        jump     : 법선 계산 시 이웃 점 간격 상한(m)
+        index    : "auto" | "kdtree" | "grid"
+        """
+        self.max_iter = int(max_iter); self.max_dist = float(max_dist); self.min_pts = int(min_pts)
+        self.tol_xy = tol_xy; self.tol_th = tol_th; self.jump = jump
+        if index == "auto":
+            index = "kdtree" if HAS_SCIPY else "grid"
+        if index == "kdtree" and not HAS_SCIPY:
+            raise ValueError("index='kdtree' 는 scipy 필요")
+        self.index = index
+        self.reset()
+
+    def reset(self):
+        self.ref = None
+        self.last = (0.0, 0.0, 0.0)
+        self.info = {"ok": False, "iters": 0, "inliers": 0, "fitness": 0.0, "rmse": 0.0}
+
+    def set_reference(self, xy, normals=None, valid=None):
+        """기준 점군. 여러 스캔을 합친 서브맵처럼 각도순이 아니면 스캔별로 구한 법선/유효 마스크를 같이 넘김."""
+        xy = np.asarray(xy, np.float64).reshape(-1, 2)
+        self.ref = xy
+        if normals is None:
+            self.ref_n, self.ref_ok = line_normals(xy, self.jump)
+        else:
+            self.ref_n, self.ref_ok = np.asarray(normals, np.float64), np.asarray(valid, bool)
+        self._nn = cKDTree(xy) if self.index == "kdtree" else GridNN(xy, self.max_dist)
+
+    def match(self, xy, init=(0.0, 0.0, 0.0)):
+        """xy 를 기준 스캔에 맞추는 (dx, dy, dth). 실패하면 info["ok"]=False 와 함께 init 을 돌려줌."""
+        src = np.asarray(xy, np.float64).reshape(-1, 2)
+        dx, dy, th = map(float, init)
+        info = self.info = {"ok": False, "iters": 0, "inliers": 0, "fitness": 0.0, "rmse": 0.0}
+        if self.ref is None or len(src) < self.min_pts or len(self.ref) < self.min_pts:
+            return dx, dy, th
+        nref = len(self.ref)
+        for it in range(1, self.max_iter + 1):
+            c, s = math.cos(th), math.sin(th)
+            P = src @ np.array([[c, s], [-s, c]]) + (dx, dy)            # R·p + t
+            d, j = self._nn.query(P, distance_upper_bound=self.max_dist)
+            m = j < nref
+            m[m] = self.ref_ok[j[m]]
+            if m.sum() < self.min_pts:
+                info["iters"] = it; return tuple(init)
+            Pk, N = P[m], self.ref_n[j[m]]
+            e = np.einsum("ij,ij->i", N, Pk - self.ref[j[m]])
+            # 이상점: 잔차 MAD 기준 3σ (최소 1cm)
+            thr = max(3.0 * 1.4826 * float(np.median(np.abs(e))), 0.01)
+            inl = np.abs(e) <= thr
+            if inl.sum() < self.min_pts:
+                info["iters"] = it; return tuple(init)
+            Pk, N, e = Pk[inl], N[inl], e[inl]
+            # 선형화: e + [nx, ny, n·perp(p)]·[ddx, ddy, dθ] = 0  (perp(p) = (-py, px))
+            A = np.column_stack([N[:, 0], N[:, 1], N[:, 1] * Pk[:, 0] - N[:, 0] * Pk[:, 1]])
+            H = A.T @ A
+            H += np.eye(3) * (1e-9 * (np.trace(H) + 1.0))               # 복도처럼 한 방향이 안 잡힐 때 대비
+            ddx, ddy, dth = np.linalg.solve(H, -A.T @ e)
+            # 증분을 앞에 합성: R' = R(dθ)R, t' = R(dθ)t + dd
+            cd, sd = math.cos(dth), math.sin(dth)
+            dx, dy = cd * dx - sd * dy + ddx, sd * dx + cd * dy + ddy
+            th += dth
+            info.update(iters=it, inliers=int(inl.sum()), fitness=round(float(inl.sum()) / len(src), 3),
+                        rmse=float(np.sqrt(np.mean(e * e))))
+            if abs(ddx) < self.tol_xy and abs(ddy) < self.tol_xy and abs(dth) < self.tol_th:
+                break
+        info["ok"] = True
+        return dx, dy, (th + math.pi) % (2 * math.pi) - math.pi
+
+    def step(self, xy):
+        """직전 스캔 기준 정합 후 현재 스캔을 새 기준으로. 실패/첫 프레임이면 (0, 0, 0)."""
+        xy = np.asarray(xy, np.float64).reshape(-1, 2)
+        if self.ref is None:
+            self.set_reference(xy); return 0.0, 0.0, 0.0
+        dx, dy, dth = self.match(xy, init=self.last)
+        if not self.info["ok"]:
+            dx = dy = dth = 0.0
+        self.last = (dx, dy, dth)
+        if len(xy) >= self.min_pts:
+            self.set_reference(xy)
+        return dx, dy, dth
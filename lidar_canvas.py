@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+# lidar_canvas.py
+# LiDAR 스캔/점유맵을 브라우저 canvas 에서 그리는 Streamlit 커스텀 컴포넌트 (components/lidar_canvas/index.html)
+#  - 서버는 matplotlib 그림/PNG 를 만들지 않고 압축한 바이너리만 보냄
+#      스캔 : 포인트당 4바이트 (각도 uint16 = 2π/65536 단위, 거리 uint16 mm)
+#      맵   : 처음/재동기화 때만 전체(셀당 uint8), 이후엔 바뀐 셀만 (인덱스 uint32 + 값 uint8)
+#      궤적 : int16 mm (최대 TRAJ_MAX 점으로 솎음)
+#  - 맵 델타는 세대(gen) 번호로 이어짐: 브라우저의 세대 ≠ 델타의 base 이면 (새로고침, 중간에 끊긴 rerun)
+#    컴포넌트 값 {"resync": n} 으로 알려옴 → 다음 호출에서 전체 프레임을 보냄
+#
+#   scan_view(theta, r, rmax=3.0, zero="N", key="scan")
+#   map_view(occ, map_size, traj=traj_xy, boxes=boxes, key="occ")
+
+import os
+import numpy as np
+import streamlit as st
+import streamlit.components.v1 as components
+
+_component = components.declare_component(
+    "lidar_canvas", path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "components", "lidar_canvas"))
+
+TRAJ_MAX = 1000      # 궤적 최대 점 수
+MAP_TOL  = 4         # 이 단계(0~255) 이상 바뀐 셀만 델타로 보냄 (0 으로 떨어진 셀은 항상 보냄)
+
+def encode_scan(theta, r, rmax: float) -> bytes:
+    """(라디안, m) → [uint16 각도, uint16 mm] × N. 무효점/rmax 밖은 뺌."""
+    th = np.asarray(theta, np.float64); rr = np.asarray(r, np.float64)
+    ok = np.isfinite(th) & np.isfinite(rr) & (rr > 0) & (rr <= rmax)
+    th, rr = th[ok], rr[ok]
+    out = np.empty((th.size, 2), "<u2")
+    out[:, 0] = (np.round(np.mod(th, 2*np.pi) * (65536.0 / (2*np.pi))).astype(np.int64) & 0xFFFF)
+    out[:, 1] = np.minimum(np.round(rr * 1000.0), 65535)
+    return out.tobytes()
+
+def encode_traj(traj) -> bytes:
+    t = np.asarray(traj, np.float64).reshape(-1, 2)
+    if len(t) > TRAJ_MAX:
+        t = t[np.linspace(0, len(t) - 1, TRAJ_MAX).astype(np.intp)]   # 마지막 점은 항상 포함
+    return np.clip(np.round(t * 1000.0), -32768, 32767).astype("<i2").tobytes()
+
+def scan_view(theta, r, rmax: float, zero: str = "E", clockwise: bool = True, title: str = "",
+              height: int = 420, key: str = "lidar_scan"):
+    """극좌표 스캔. zero="N" 이면 0°가 위(선수), clockwise=True 면 각도 증가 = 시계방향."""
+    _component(kind="scan", pts=encode_scan(theta, r, rmax), rmax=float(rmax), zero=zero,
+               clockwise=bool(clockwise), title=title, height=int(height), key=key, default=None)
+
+def map_view(occ, map_size: float, traj=None, boxes=(), title: str = "", height: int = 460,
+             key: str = "lidar_map", tol: int = MAP_TOL):
+    """
+    점유맵(0~1 실수 또는 uint8 0~255, 행 0 = +y 쪽 위) + 궤적 + 군집 박스 [(xmin, ymin, xmax, ymax, cx, cy)].
+    세션마다 브라우저에 보낸 맵 사본을 들고 있다가 바뀐 셀만 보냄.
+    """
+    occ = np.asarray(occ)
+    q = occ if occ.dtype == np.uint8 else np.clip(occ.astype(np.float32) * 255.0 + 0.5, 0, 255).astype(np.uint8)
+    store = st.session_state.setdefault("_lidar_canvas", {})
+    s = store.get(key)
+    reply = st.session_state.get(key)           # 브라우저가 마지막으로 보낸 값
+    resync = reply.get("resync") if isinstance(reply, dict) else None
+    if s is not None and s.get("want") is not None:
+        resync = s["want"]
+    full = (s is None or s["sent"].shape != q.shape or s["map_size"] != map_size
+            or (resync is not None and resync != s["resync"]))
+
+    if full:
+        gen = (s["gen"] + 1) if s else 1
+        if resync is None and s is not None: resync = s["resync"]
+        s = store[key] = {"gen": gen, "sent": q.copy(), "map_size": map_size, "resync": resync, "want": None}
+        args = dict(mode="key", full=q.tobytes(), base=0)
+    else:
+        sv, qv = s["sent"].reshape(-1), q.reshape(-1)
+        d = np.abs(qv.astype(np.int16) - sv)
+        idx = np.flatnonzero((d >= tol) | ((qv == 0) & (sv != 0)))
+        sv[idx] = qv[idx]
+        args = dict(mode="delta", idx=idx.astype("<u4").tobytes(), val=qv[idx].tobytes(), base=s["gen"])
+        s["gen"] += 1
+
+    got = _component(kind="map", gen=s["gen"], rows=int(q.shape[0]), cols=int(q.shape[1]),
+                     map_size=float(map_size), traj=encode_traj(traj if traj is not None else []),
+                     boxes=[list(map(float, b)) for b in boxes], title=title, height=int(height),
+                     key=key, default=None, **args)
+    # session_state 로 못 읽은 경우 대비: 이번에 돌아온 요청은 다음 호출에서 처리
+    n = got.get("resync") if isinstance(got, dict) else None
+    s["want"] = n if (n is not None and n != s["resync"]) else None
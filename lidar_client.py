@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+# lidar_client.py
+# 라즈베리파이 lidar_server(8001) 에서 LiDAR 프레임을 받아오는 대시보드 공용 헬퍼
+#  - /lidar/latest.bin (float32 바이너리) 우선, 서버가 구버전이면 /lidar/latest (JSON) 로 폴백
+
+import struct, threading
+from typing import Optional, Tuple
+
+import numpy as np
+import requests
+
+# rpi/lidar_server.py 의 BIN_MAGIC / BIN_HDR 와 동일해야 함
+BIN_MAGIC = b"LDR1"
+BIN_HDR = struct.Struct("<4sIdI")   # magic, seq(uint32), ts(float64), n(uint32)
+
+# 서버 주소별 바이너리 엔드포인트 지원 여부 캐시 (404 받으면 JSON 고정)
+_bin_supported = {}
+
+def decode_frame(buf) -> Tuple[int, float, np.ndarray, np.ndarray]:
+    """바이너리 프레임 → (seq, ts, angles_deg, ranges_m). 배열은 buf를 참조하는 읽기 전용 뷰."""
+    magic, seq, ts, n = BIN_HDR.unpack_from(buf, 0)
+    if magic != BIN_MAGIC:
+        raise ValueError(f"bad lidar frame magic: {magic!r}")
+    off = BIN_HDR.size
+    ang = np.frombuffer(buf, dtype="<f4", count=n, offset=off)
+    rng = np.frombuffer(buf, dtype="<f4", count=n, offset=off + 4*n)
+    return seq, ts, ang, rng
+
+def _fetch_json(base: str, timeout: float) -> Tuple[np.ndarray, np.ndarray, float]:
+    r = requests.get(f"{base}/lidar/latest", timeout=timeout); r.raise_for_status()
+    js = r.json()
+    ang = np.asarray(js.get("angles", []), dtype=np.float32)
+    rng = np.asarray(js.get("ranges", []), dtype=np.float32)
+    return ang, rng, float(js.get("ts", 0.0))
+
+def fetch_bin_frame(base: str, timeout: float = 2.5) -> Optional[Tuple[np.ndarray, np.ndarray, float]]:
+    """/lidar/latest.bin 1회 조회 → (angles_deg, ranges_m, ts). 미지원 서버/실패 시 None."""
+    base = base.rstrip("/")
+    if not _bin_supported.get(base, True):
+        return None
+    try:
+        r = requests.get(f"{base}/lidar/latest.bin", timeout=timeout)
+        if r.status_code in (404, 405):
+            _bin_supported[base] = False
+            return None
+        r.raise_for_status()
+        _, ts, ang, rng = decode_frame(r.content)
+        _bin_supported[base] = True
+        return ang, rng, ts
+    except Exception:
+        return None
+
+def fetch_frame(base: str, timeout: float = 2.5) -> Optional[Tuple[np.ndarray, np.ndarray, float]]:
+    """최신 프레임 1장 → (angles_deg, ranges_m, ts). 바이너리 우선, 안 되면 JSON. 실패 시 None."""
+    base = base.rstrip("/")
+    got = fetch_bin_frame(base, timeout)
+    if got is not None:
+        return got
+    try:
+        return _fetch_json(base, timeout)
+    except Exception:
+        return None
+
+# ---------- /lidar/stream 웹소켓 구독 ----------
+try:
+    from websockets.sync.client import connect as _ws_connect
+    HAS_WS = True
+except Exception:
+    HAS_WS = False
+
+# 업그레이드를 403/404 로 거절한 주소 (구버전 서버) → 다시 시도하지 않음 (_bin_supported 와 같은 방식)
+_ws_unsupported = set()
+
+def _rejected_status(e) -> Optional[int]:
+    """웹소켓 핸드셰이크 거절 예외 → HTTP 상태 코드 (websockets 신/구 버전 모두). 아니면 None."""
+    resp = getattr(e, "response", None)
+    code = getattr(resp, "status_code", None) if resp is not None else getattr(e, "status_code", None)
+    return int(code) if code is not None else None
+
+class LidarStream:
+    """
+    lidar_server /lidar/stream 구독 헬퍼 (백그라운드 스레드 1개).
+    서버가 새 스캔마다 push 하면 최신 1장만 보관하고, next()는 아직 안 꺼낸 새 프레임만 돌려줍니다.
+    (폴링처럼 같은 프레임을 두 번 그리거나 매번 TCP 연결을 새로 맺지 않음)
+    서버가 업그레이드를 403/404 로 거절하면 unsupported=True 로 두고 재시도 중단,
+    그 밖의 실패(서버 꺼짐 등)는 reconnect_s 부터 max_backoff_s 까지 두 배씩 늘려 재시도.
+    """
+    def __init__(self, url: str, reconnect_s: float = 1.0, max_backoff_s: float = 30.0):
+        self.url = url
+        self.reconnect_s = reconnect_s; self.max_backoff_s = max_backoff_s
+        self.connected = False
+        self.unsupported = url in _ws_unsupported
+        self.received = 0        # 받은 프레임 수
+        self.skipped = 0         # 서버/클라이언트에서 건너뛴 프레임 수 (seq 간격으로 계산)
+        self._cv = threading.Condition()
+        self._frame = None       # (seq, ts, ang_deg, rng)
+        self._taken_seq = None
+        self._last_rx_seq = None
+        self._ws = None
+        self._stop = threading.Event()
+        self._th = threading.Thread(target=self._run, daemon=True)
+        if not self.unsupported:
+            self._th.start()
+
+    @classmethod
+    def for_host(cls, host: str, port: int) -> "LidarStream":
+        return cls(f"ws://{host}:{int(port)}/lidar/stream")
+
+    def _run(self):
+        delay = self.reconnect_s
+        while not self._stop.is_set():
+            try:
+                with _ws_connect(self.url, open_timeout=2.0, max_size=None) as ws:
+                    self._ws = ws; self.connected = True
+                    delay = self.reconnect_s
+                    for buf in ws:
+                        seq, ts, ang, rng = decode_frame(buf)
+                        if self._last_rx_seq is not None:
+                            self.skipped += max(0, ((seq - self._last_rx_seq) & 0xFFFFFFFF) - 1)
+                        self._last_rx_seq = seq
+                        self.received += 1
+                        with self._cv:
+                            if self._frame is not None and self._frame[0] != self._taken_seq:
+                                self.skipped += 1   # 꺼내기 전에 덮어씀
+                            self._frame = (seq, ts, ang, rng)
+                            self._cv.notify_all()
+            except Exception as e:
+                if _rejected_status(e) in (403, 404):
+                    _ws_unsupported.add(self.url); self.unsupported = True
+                    return
+            finally:
+                self._ws = None; self.connected = False
+            self._stop.wait(delay)
+            delay = min(delay * 2, self.max_backoff_s)
+
+    def next(self, timeout: float = 1.0) -> Optional[Tuple[np.ndarray, np.ndarray, float]]:
+        """아직 꺼내지 않은 새 프레임 → (angles_deg, ranges_m, ts). timeout 안에 없으면 None."""
+        with self._cv:
+            if not self._cv.wait_for(lambda: self._frame is not None and self._frame[0] != self._taken_seq,
+                                     timeout=timeout):
+                return None
+            seq, ts, ang, rng = self._frame
+            self._taken_seq = seq
+        return ang, rng, ts
+
+    def close(self):
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try: ws.close()
+            except Exception: pass
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+# occ_grid.py
+# 로그 오즈(log-odds) 점유 격자 (LiDAR 페이지용)
+#  - 셀 값: int16 고정소수점 로그 오즈 (SCALE=256 → 1.0 = 256), [L_MIN, L_MAX] 로 포화
+#  - 스캔 반영: 현재 자세(라이다 위치)에서 각 끝점까지 광선을 한 번에(벡터화) 추적해서
+#      지나간 셀 = 비어 있음(L_MISS), 끝점 셀 = 점유(L_HIT). 같은 스캔에서 여러 광선이 지나간 셀은 한 번만
+#    광선 추적은 Amanatides–Woo 셀 경계 순회: 광선이 넘는 열/행 경계마다 새로 들어간 셀 하나
+#      → 모서리를 스치는 셀도 빠지지 않음 (정확히 격자점을 지나면 옆 셀 하나가 더 들어갈 수 있음)
+#    광선은 맵 경계에서 자르고, 중복 제거는 정렬 없이 재사용 스크래치 배열(셀당 int32)로
+#      → 비용은 광선 수 × 맵 안 광선 길이(셀)에 비례 (bench_occ.py 로 맵 크기별 확인)
+#  - 감쇠: 프레임마다 맵 전체에 곱하지 않고, 셀마다 마지막 갱신 틱(반감기/TICKS 단위 정수)을 두었다가
+#    그 셀을 다시 갱신하거나 읽을 때만 경과 틱만큼 0(모름) 쪽으로 (정수 곱 + 시프트, 반감기 half_life_s, None 이면 감쇠 없음)
+#  - 화면용 image() 는 틱마다 한 번만 맵 전체를 다시 만들고, 그 사이엔 update() 가 바꾼 셀만 고쳐 둔 캐시를 복사
+#  - 좌표: 맵 중심 (0,0), 행 0 = +y 쪽(위), 열 0 = -x 쪽 — 예전 occ_map 과 같음
+#
+#   g = OccGrid(size_m=4.0, res=0.05, half_life_s=10.0)
+#   g.update((x, y), world_xy, now)        # 라이다 위치 + 월드 좌표 끝점
+#   img = g.image(now)                     # uint8 점유 확률 (0=빔, 128=모름, 255=점유)
+
+import math
+import numpy as np
+
+SCALE = 256
+L_HIT  = int(round(0.85 * SCALE))      # p≈0.70
+L_MISS = int(round(-0.40 * SCALE))     # p≈0.40
+L_MIN  = int(round(-2.0 * SCALE))
+L_MAX  = int(round(3.5 * SCALE))
+TICKS  = 8                             # 반감기당 감쇠 틱 수 (2^TICKS_LOG2)
+TICKS_LOG2 = 3
+
+# 로그 오즈 → uint8 확률 표 (읽을 때 exp 대신 표 조회)
+_LUT = np.round(255.0 / (1.0 + np.exp(-np.arange(L_MIN, L_MAX + 1) / SCALE))).astype(np.uint8)
+# 반감기 안의 남은 틱 → Q15 배율 2^(-k/TICKS)
+_FRAC = np.round(32768.0 * np.exp2(-np.arange(TICKS) / TICKS)).astype(np.int32)
+
+def _decayed(L, el):
+    """L(int16) 을 경과 틱 el(int32) 만큼 0 쪽으로: |L|·2^(-frac/TICKS) >> (정수 반감기 수). 부동소수점 없음."""
+    el = np.maximum(el, 0)
+    sh = np.minimum(el >> TICKS_LOG2, 16) + 15
+    a = (np.abs(L.astype(np.int32)) * _FRAC[el & (TICKS - 1)]) >> sh
+    return np.where(L < 0, -a, a).astype(np.int16)
+
+def _crossings(a0, da, ae, b0, db):
+    """a 축 셀 경계를 넘을 때마다 새로 들어간 셀 (a 인덱스, b 인덱스). a0/b0 는 광선 시작(스칼라), ae 는 끝."""
+    ia0 = math.floor(a0)
+    cnt = np.abs(np.floor(ae).astype(np.int32) - ia0)
+    rid = np.repeat(np.arange(len(cnt), dtype=np.int32), cnt)
+    k = np.arange(rid.size, dtype=np.int32) - np.repeat((np.cumsum(cnt) - cnt).astype(np.int32), cnt) + 1
+    s = np.where(da[rid] < 0, -1, 1).astype(np.int32)
+    a = ia0 + s * k
+    t = (a + (s < 0) - a0) / da[rid]                   # 경계 a(+1) 를 넘는 광선 위치 (0~1)
+    return a, np.floor(b0 + db[rid] * t).astype(np.int32)
+
+class OccGrid:
+    def __init__(self, size_m: float, res: float, half_life_s: float = None,
+                 l_hit: int = L_HIT, l_miss: int = L_MISS, t0: float = 0.0):
+        self.size_m = float(size_m); self.res = float(res)
+        self.n = int(round(self.size_m / self.res))
+        self.half = self.size_m / 2.0
+        self.half_life_s = half_life_s
+        self.l_hit, self.l_miss = int(l_hit), int(l_miss)
+        self.L = np.zeros((self.n, self.n), np.int16)
+        self.stamp = np.zeros((self.n, self.n), np.int32)     # 마지막 갱신 틱
+        self.t0 = float(t0)
+        self.updates = 0
+        self._seen = None                                      # 중복 제거 스크래치 (처음 update 때 만듦)
+        self._img = None; self._img_tick = None                # image() 캐시
+
+    def _cells(self, x, y):
+        """월드 좌표 → 연속 셀 좌표 (열, 행)."""
+        return (np.asarray(x) + self.half) / self.res, (self.half - np.asarray(y)) / self.res
+
+    def tick(self, now: float) -> int:
+        if not self.half_life_s:
+            return 0
+        return int((float(now) - self.t0) * TICKS / self.half_life_s)
+
+    def _trace(self, c0, r0, c1, r1):
+        """(c0, r0) → 끝점들 광선이 지나는 맵 안 셀 평탄 인덱스 (int32, 중복 있음, 끝점 셀 포함)."""
+        n = self.n
+        dc, dr = c1 - c0, r1 - r0
+        if 0 <= c0 < n and 0 <= r0 < n:
+            # 맵 밖으로 나가는 광선은 경계에서 자름 (맵 밖 구간은 추적하지 않음)
+            lim = n - 1e-6
+            with np.errstate(divide="ignore", invalid="ignore"):
+                tc = np.where(dc > 0, (lim - c0) / dc, np.where(dc < 0, -c0 / dc, np.inf))
+                tr = np.where(dr > 0, (lim - r0) / dr, np.where(dr < 0, -r0 / dr, np.inf))
+            t = np.minimum(np.minimum(tc, tr), 1.0)
+            c1, r1 = c0 + dc * t, r0 + dr * t
+        ca, rb = _crossings(c0, dc, c1, r0, dr)         # 열 경계
+        ra, cb = _crossings(r0, dr, r1, c0, dc)         # 행 경계
+        col = np.concatenate([ca, cb, [math.floor(c0)]]).astype(np.int32)
+        row = np.concatenate([rb, ra, [math.floor(r0)]]).astype(np.int32)
+        inb = (col >= 0) & (row >= 0) & (col < n) & (row < n)
+        return row[inb] * n + col[inb]
+
+    def update(self, origin, world_xy, now: float):
+        """origin=(x, y) 라이다 위치, world_xy=(N,2) 끝점 (월드 좌표), now=초 (time.monotonic 등)."""
+        pts = np.asarray(world_xy, np.float64).reshape(-1, 2)
+        if not len(pts):
+            return
+        n = self.n; tk = self.tick(now)
+        c0, r0 = self._cells(float(origin[0]), float(origin[1]))
+        c1, r1 = self._cells(pts[:, 0], pts[:, 1])
+        free = self._trace(float(c0), float(r0), c1, r1)
+        hc, hr = np.floor(c1).astype(np.int32), np.floor(r1).astype(np.int32)
+        inb = (hc >= 0) & (hr >= 0) & (hc < n) & (hr < n)
+        hit = hr[inb] * n + hc[inb]
+
+        # 중복 제거 (정렬 없음): 셀마다 자기 순번을 써 넣고, 살아남은 순번 하나만 남김.
+        # 끝점 셀은 -1 로 덮어서 빈 공간 쪽에서 빠지게 (점유만)
+        if self._seen is None:
+            self._seen = np.empty(n * n, np.int32)
+        seen = self._seen
+        fi = np.arange(free.size, dtype=np.int32); hi = np.arange(hit.size, dtype=np.int32)
+        seen[free] = fi; seen[hit] = -1
+        free = free[seen[free] == fi]
+        seen[hit] = hi
+        hit = hit[seen[hit] == hi]
+
+        L = self.L.reshape(-1); st = self.stamp.reshape(-1)
+        img = self._img.reshape(-1) if self._img is not None and self._img_tick == tk else None
+        for idx, dl in ((free, self.l_miss), (hit, self.l_hit)):
+            if idx.size:
+                v = _decayed(L[idx], tk - st[idx]) if self.half_life_s else L[idx]
+                v = np.clip(v.astype(np.int32) + dl, L_MIN, L_MAX)
+                L[idx] = v; st[idx] = tk
+                if img is not None:
+                    img[idx] = _LUT[v - L_MIN]                 # 캐시 그림도 바뀐 셀만
+        self.updates += 1
+
+    def logodds(self, now: float) -> np.ndarray:
+        """감쇠를 반영한 로그 오즈 사본 (int16). 저장된 값은 건드리지 않음."""
+        if not self.half_life_s:
+            return self.L.copy()
+        return _decayed(self.L, self.tick(now) - self.stamp)
+
+    def image(self, now: float) -> np.ndarray:
+        """uint8 점유 확률 (0=빔, 128=모름, 255=점유) — 화면용 새 배열. 맵 전체 계산은 감쇠 틱이 바뀔 때만."""
+        tk = self.tick(now)
+        if self._img is None or tk != self._img_tick:
+            self._img = _LUT[self.logodds(now).astype(np.intp) - L_MIN]
+            self._img_tick = tk
+        return self._img.copy()
+
+    def occupied(self, now: float, p: float = 0.65) -> np.ndarray:
+        """점유 확률 p 이상 셀 마스크."""
+        return self.logodds(now) >= int(round(math.log(p / (1 - p)) * SCALE))
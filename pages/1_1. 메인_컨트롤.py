@@ -8,6 +8,14 @@ import streamlit as st
 import streamlit.components.v1 as components
 import time
 
+import lidar_client
+import lidar_canvas
+
+# 라즈베리파이 코드(rpi/)의 풀장 시뮬레이터 재사용
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "rpi"))
+from pool_sim import PoolSim
+
 def custom_sidebar():
     import os
     st.markdown("""
@@ -356,6 +364,8 @@ def render_big_controller(offset_px: int, api_base: str, pwm_val: int, hz_val: i
       </div>
       <div class="hint">이 영역을 클릭(포커스 ON) 후 <b>↑ / ← / → / ↓</b> 를 꾹 누르면 연속 전송 • <b>Space/Enter</b>=정지</div>
       <div id="revWarn" class="warn">후진 API(/cmd/throttle)가 서버에 없어요. 먼저 백엔드를 업데이트 해주세요.</div>
+      <div id="link" class="hint" style="margin-top:2px;font-size:12px;">링크: HTTP</div>
+      <div id="latchBox" class="warn">비상 정지 래치됨 · <button id="btnRel" type="button">해제</button></div>
     </div>
 
     <script>
@@ -385,6 +395,7 @@ def render_big_controller(offset_px: int, api_base: str, pwm_val: int, hz_val: i
       }}
 
       function sendThrottle(val){{
+        if (sendFrame(val, 0, F_THR, val===0)) return;
         if(!hasThrottle){{
           if (val===0) post('/cmd/pwm', {{duty:0}});
           return;
@@ -397,18 +408,73 @@ def render_big_controller(offset_px: int, api_base: str, pwm_val: int, hz_val: i
         }});
       }}
 
+      // ── /cmd/ws: 연결 하나로 throttle+steer 를 7바이트 프레임에 묶어 전송 (seq/ACK) ──
+      //    연결 안 되면(구버전 서버 등) 기존 HTTP POST 로 폴백
+      const WS_URL=API_BASE.replace(/^http/,'ws')+'/cmd/ws';
+      const F_THR=1, F_STEER=2;
+      const linkEl=document.getElementById('link');
+      let ws=null, wsReady=false, wsFails=0, wsEverOpen=false, seq=0, rtt=null;
+      const sentAt=new Map();
+      function openWs(){{
+        try{{ ws=new WebSocket(WS_URL); }}catch(e){{ return; }}
+        ws.binaryType='arraybuffer';
+        ws.onopen=()=>{{ wsReady=true; wsEverOpen=true; wsFails=0; linkEl.textContent='링크: WebSocket'; }};
+        ws.onmessage=(ev)=>{{
+          const dv=new DataView(ev.data); const s=dv.getUint32(0,true);
+          const t=sentAt.get(s); if (t!==undefined){{ rtt=performance.now()-t; sentAt.delete(s); }}
+          if (rtt!==null) linkEl.textContent='링크: WebSocket · RTT '+rtt.toFixed(0)+' ms';
+        }};
+        ws.onclose=()=>{{
+          wsReady=false; linkEl.textContent='링크: HTTP';
+          // 한 번도 못 붙었으면 몇 번만 시도하고 HTTP 로 고정
+          if (wsEverOpen || ++wsFails < 3) setTimeout(openWs, 1000);
+        }};
+      }}
+      function sendFrame(thr, steer, flags, must){{
+        if (!wsReady) return false;
+        if (!must && ws.bufferedAmount > 256) return true;   // 느린 링크: 밀린 프레임 위에 또 쌓지 않음 (정지는 항상 보냄)
+        seq=(seq+1)>>>0;
+        const buf=new ArrayBuffer(7), dv=new DataView(buf);
+        dv.setUint32(0,seq,true); dv.setInt8(4,thr); dv.setInt8(5,steer); dv.setUint8(6,flags);
+        sentAt.set(seq, performance.now()); if (sentAt.size>64) sentAt.delete(sentAt.keys().next().value);
+        ws.send(buf); return true;
+      }}
+      openWs();
+
       function tick(){{
-        if (st.up)    sendThrottle(+PWM);
-        if (st.down)  sendThrottle(-PWM);
-        if (st.left)  post('/cmd/steer', {{dir:'left'}});
-        if (st.right) post('/cmd/steer', {{dir:'right'}});
+        if (wsReady){{
+          let flags=0, thr=0, steer=0;
+          if (st.up||st.down){{ flags|=F_THR; thr=st.up?+PWM:-PWM; }}
+          if (st.left||st.right){{ flags|=F_STEER; steer=st.left?-1:1; }}
+          if (flags) sendFrame(thr, steer, flags);
+        }} else {{
+          if (st.up)    sendThrottle(+PWM);
+          if (st.down)  sendThrottle(-PWM);
+          if (st.left)  post('/cmd/steer', {{dir:'left'}});
+          if (st.right) post('/cmd/steer', {{dir:'right'}});
+        }}
         if (!st.up && !st.down && !st.left && !st.right){{ clearInterval(timer); timer=null; }}
       }}
       function start(){{ if (!timer) timer=setInterval(tick, INTERVAL); }}
       
+      // STOP/Space/Enter = 비상 정지(서버에서 래치, '해제' 전까지 추진 명령 무시)
+      //   웹소켓 brake 프레임 + HTTP POST 를 둘 다 보냄 (어느 쪽이 먼저 닿아도 같은 결과)
+      const latchBox=document.getElementById('latchBox');
       function stopAll(){{
         st.up=st.left=st.right=st.down=false; paint();
-        post('/cmd/emergency_brake', {{}});
+        sendFrame(0, 0, 4, true);
+        post('/cmd/emergency_brake', {{}}, (ok)=>{{ if (ok) latchBox.style.display='block'; }});
+        if (timer){{ clearInterval(timer); timer=null; }}
+      }}
+      document.getElementById('btnRel').addEventListener('click', ()=>{{
+        post('/cmd/emergency_release', {{}}, (ok)=>{{ if (ok) latchBox.style.display='none'; }});
+        box.focus();
+      }});
+      // 포커스 이탈/탭 숨김은 래치 없이 추진만 0 으로
+      function softStop(){{
+        const moving=st.up||st.down;
+        st.up=st.left=st.right=st.down=false; paint();
+        if (moving || SEND_ZERO) sendThrottle(0);
         if (timer){{ clearInterval(timer); timer=null; }}
       }}
 
@@ -447,8 +513,8 @@ def render_big_controller(offset_px: int, api_base: str, pwm_val: int, hz_val: i
         }}
       }});
 
-      document.addEventListener('visibilitychange', ()=>{{ if (document.hidden) stopAll(); }});
-      box.addEventListener('blur', stopAll);
+      document.addEventListener('visibilitychange', ()=>{{ if (document.hidden) softStop(); }});
+      box.addEventListener('blur', (e)=>{{ if (e.relatedTarget!==document.getElementById('btnRel')) softStop(); }});
       setTimeout(()=>box.focus(), 100);
     </script>
     """
@@ -578,33 +644,30 @@ def render_map():
 # (D) LiDAR 패널(자율운항 모드에서 리모컨 자리에 표시)
 #  - 더미/실시간 모드 선택
 # ──────────────────────────────────────────────────────────────────────────────
-def _simulate_lidar_scan(t: float, n: int, rmax: float, sigma: float,
-                         dropout_rate: float, moving_obstacles: bool) -> Tuple[np.ndarray, np.ndarray]:
-    theta = np.linspace(0, 2*np.pi, n, endpoint=False)
-    base = 6.5 + 0.9*np.cos(theta - 0.3) + 0.6*np.cos(2*theta + 0.6) + 0.25*np.sin(3*theta + 0.5*t)
-    r = base + np.random.normal(0.0, sigma, size=n)
-    if moving_obstacles:
-        ang_a = (0.8*t) % (2*np.pi); idx_a = int(ang_a / (2*np.pi) * n)
-        for k in range(-2, 3): r[(idx_a + k) % n] = 1.6 + 0.2*np.random.randn()
-        ang_b = (0.8*t + np.pi) % (2*np.pi); idx_b = int(ang_b / (2*np.pi) * n)
-        for k in range(-3, 4): r[(idx_b + k) % n] = 3.0 + 0.2*np.random.randn()
-    if dropout_rate > 0:
-        mask = np.random.rand(n) < (dropout_rate / 100.0); r[mask] = np.nan
-    r = np.clip(r, 0.2, rmax)
+def _simulate_lidar_scan(sigma: float, dropout_rate: float) -> Tuple[np.ndarray, np.ndarray]:
+    # 풀장 시뮬레이터(rpi/pool_sim.py): 세션마다 보트 1척이 내장 자동조종으로 돌아다님
+    ss = st.session_state
+    if "pool_sim" not in ss:
+        ss.pool_sim = PoolSim(sigma=sigma, dropout=dropout_rate / 100.0)
+        ss.pool_sim_t = time.time()
+    sim = ss.pool_sim
+    now = time.time()
+    sim.advance(min(1.0, max(1e-3, now - ss.pool_sim_t)), autopilot=True)
+    ss.pool_sim_t = now
+    theta, r = sim.scan()
+    r = np.where(r > 0, r, np.nan)        # 무효점(0)은 그리지 않음
     return theta, r
 
 def _render_polar(theta: np.ndarray, r: np.ndarray, rmax: float, title: str):
-    import matplotlib.pyplot as plt
-    fig = plt.figure(figsize=(6.2, 6.2))
-    ax = fig.add_subplot(111, projection="polar")
-    ax.set_theta_zero_location("E"); ax.set_theta_direction(-1); ax.set_rmax(rmax)
-    ax.grid(True, alpha=0.35)
-    ax.set_rticks([rmax*0.25, rmax*0.5, rmax*0.75, rmax])
-    ax.scatter(theta, r, s=9, c="#1f77b4", alpha=0.9)
-    ax.set_title(title, pad=20, fontsize=14, fontweight="bold")
-    st.pyplot(fig, clear_figure=True); plt.close(fig)
+    # 브라우저 canvas 로 그림 (서버는 포인트 4바이트씩만 보냄, 선수 = 위, 시계방향 +)
+    lidar_canvas.scan_view(theta, r, rmax, zero="N", clockwise=True, title=title, height=460, key="lidar11_scan")
 
 def _fetch_real_frame(api_base: str, timeout: float) -> Optional[Tuple[np.ndarray, np.ndarray, float]]:
+    # lidar_server 의 /lidar/latest.bin 이 있으면 바이너리로 바로 받음
+    got = lidar_client.fetch_bin_frame(api_base, timeout=timeout)
+    if got is not None:
+        ang_deg, rr, ts = got
+        return np.deg2rad(ang_deg), rr, ts
     try:
         r = requests.get(f"{api_base}/lidar/latest", timeout=timeout)
         if r.status_code != 200: return None
@@ -614,6 +677,8 @@ def _fetch_real_frame(api_base: str, timeout: float) -> Optional[Tuple[np.ndarra
                 th = np.array(js["theta"], dtype=float); rr = np.array(js["r"], dtype=float)
             elif "angles_deg" in js and "ranges_m" in js:
                 th = np.deg2rad(np.array(js["angles_deg"], dtype=float)); rr = np.array(js["ranges_m"], dtype=float)
+            elif "angles" in js and "ranges" in js:   # lidar_server /lidar/latest (도, m)
+                th = np.deg2rad(np.array(js["angles"], dtype=float)); rr = np.array(js["ranges"], dtype=float)
             else:
                 return None
         elif isinstance(js, list) and js and isinstance(js[0], dict):
@@ -636,35 +701,25 @@ def render_lidar_panel_center(api_base: str):
         hz_l = st.slider("갱신 주기(Hz)", 1, 30, 10, key="lidar_hz5")
 
     # 고정 파라미터(실제 센서처럼 보이는 기본값)
-    POINTS      = 360     # 스캔 해상도(포인트 수) 고정
-    R_MAX       = 20.0    # 최대거리(m) 고정
-    SIGMA       = 0.06    # 노이즈 표준편차(m) 고정
+    R_MAX       = 3.0     # 최대거리(m) 고정 (2.6×1.75m 풀장)
+    SIGMA       = 0.01    # 노이즈 표준편차(m) 고정
     DROPOUT     = 3       # 드롭아웃(%) 고정
-    SHOW_OBS    = True    # 이동 물체 표현 고정
-
-    placeholder = st.empty()
-    stats = st.empty()
 
     def draw_once():
-        t = time.time()
-        th, rr = _simulate_lidar_scan(t, POINTS, R_MAX, SIGMA, DROPOUT, SHOW_OBS)
+        th, rr = _simulate_lidar_scan(SIGMA, DROPOUT)
         _render_polar(th, rr, R_MAX, "실시간 LiDAR")
-        stats.caption(f"프레임: {time.strftime('%H:%M:%S')} | pts={POINTS}, Rmax={R_MAX:.1f}m")
-
-    if run:
-        # 최초 1프레임
-        with placeholder.container():
-            draw_once()
-        # 주기 갱신 루프
-        interval = 1.0 / max(1, hz_l)
-        while st.session_state.get("lidar_run5", False):
-            time.sleep(interval)
-            with placeholder.container():
-                draw_once()
+        sim = st.session_state.pool_sim.state()
+        st.caption(f"프레임: {time.strftime('%H:%M:%S')} | pts={th.size}, Rmax={R_MAX:.1f}m | "
+                   f"시뮬레이터 보트 ({sim['x']:.2f}, {sim['y']:.2f}) 충돌 {sim['collisions']}회")
+
+    # fragment 타이머로 이 패널만 주기 갱신 (정지 상태에서도 한 프레임은 보여줌)
+    _fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    if _fragment is not None:
+        _fragment(run_every=1.0 / max(1, hz_l) if run else None)(draw_once)()
     else:
-        # 정지 상태에서도 한 프레임은 보여줌
-        with placeholder.container():
-            draw_once()
+        draw_once()
+        if run:
+            time.sleep(1.0 / max(1, hz_l)); st.rerun()
 
 # ──────────────────────────────────────────────────────────────────────────────
 # 3-열 배치: 왼쪽=Live Cam / 가운데=리모컨 또는 LiDAR / 오른쪽=지도
@@ -2,14 +2,22 @@
 # C:\Users\82102\eco-ship\pages\1_2. 위치_모니터링_LiDAR.py
 # 📡 LiDAR 실시간 모니터링 + 2D SLAM(간소화) + DBSCAN 군집 박스(탑뷰)
 
-import time, importlib, requests
-from typing import Tuple
+import time, importlib, threading
 import numpy as np
 import streamlit as st
-import matplotlib.pyplot as plt
-import matplotlib, matplotlib.font_manager as fm
 from sklearn.cluster import DBSCAN
 
+import lidar_client
+import lidar_canvas
+from slam2d import SubmapSLAM
+from occ_grid import OccGrid
+
+# 라즈베리파이 코드(rpi/)의 스캔 변환 모듈을 그대로 재사용
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "rpi"))
+from scan_convert import ScanConverter
+from pool_sim import PoolSim
+
 # ---------- 페이지/테마 ----------
 st.set_page_config(page_title="위치 모니터링 LiDAR", page_icon="📡", layout="wide")
 st.markdown("""
@@ -110,16 +118,6 @@ def custom_sidebar():
 
 custom_sidebar()
 
-# ---------- 한글 폰트 ----------
-def _use_korean_font():
-    candidates = ["Malgun Gothic","MalgunGothic","NanumGothic","AppleGothic"]
-    installed = {f.name for f in fm.fontManager.ttflist}
-    for name in candidates:
-        if name in installed:
-            matplotlib.rcParams["font.family"] = name; break
-    matplotlib.rcParams["axes.unicode_minus"] = False
-_use_korean_font()
-
 st.markdown("<h1 style='margin:0'>📡 위치 모니터링 LiDAR (실시간)</h1>", unsafe_allow_html=True)
 
 # ---------- 기본 파라미터 ----------
@@ -128,7 +126,7 @@ BAUDRATE  = 128000
 HZ        = 10
 INTERVAL  = max(1e-3, 1.0/HZ)
 RES_M     = 0.05
-DECAY_PCT = 5
+OCC_HALF_LIFE_S = 10.0     # 점유 격자 감쇠 반감기(s). 갱신/읽을 때만 적용 (움직인 물체는 빈 공간 광선이 지움)
 
 # ---------- 상단 컨트롤 (본문에 배치: 라즈베리파이 IP/포트 포함) ----------
 top1, top2, top3, top4 = st.columns([0.9, 0.9, 0.9, 1.3])
@@ -150,149 +148,19 @@ with top3:
 with top4:
     run      = st.toggle("실시간 시작", value=False, key="live_toggle")
     do_reset = st.button("맵 초기화", type="secondary")
+    use_pgo  = st.checkbox("루프 클로저(포즈 그래프)", value=False, key="use_pgo",
+                           help="옛 키프레임 근처로 돌아오면 백그라운드에서 포즈 그래프 최적화")
 
 map_size_m = st.slider("맵 크기(한 변, m)", 2, 20, 4, 1, key="map_size_slider")
 
-# ---------- 레이아웃 ----------
-c_left, c_right = st.columns(2)
-ph_scan = c_left.empty()
-ph_map  = c_right.empty()
-
-# ---------- 세션 상태 ----------
-ss = st.session_state
-def _init_map():
-    px = int(ss.map_size/ss.res)
-    ss.occ_map = np.zeros((px, px), np.float32)
-    ss.T       = np.eye(3, dtype=np.float64)
-    ss.traj    = [(0.0,0.0)]
-    ss.icp_prev = None
-    ss.last_world = None
-
-if "map_size" not in ss: ss.map_size = map_size_m
-if "res" not in ss: ss.res = RES_M
-if ("occ_map" not in ss) or (ss.map_size != map_size_m) or (ss.res != RES_M):
-    ss.map_size = map_size_m; ss.res = RES_M; _init_map()
-if do_reset: _init_map()
-
-if "ydlidar_L" not in ss: ss.ydlidar_L = None
-if "lidar_open" not in ss: ss.lidar_open = False
-if "lidar_fail_until" not in ss: ss.lidar_fail_until = 0.0
-
-# ---------- LiDAR 제어 ----------
-def stop_lidar():
-    try:
-        if ss.ydlidar_L is not None:
-            ss.ydlidar_L.turnOff()
-            ss.ydlidar_L.disconnecting()
-    except Exception:
-        pass
-    ss.ydlidar_L = None
-    ss.lidar_open = False
-
-if not run and ss.ydlidar_L is not None:
-    stop_lidar()
-
-# ---------- 데이터 소스 ----------
-def fetch_remote_frame(host: str, port: int) -> Tuple[np.ndarray, np.ndarray, float]:
-    url = f"http://{host}:{port}/lidar/latest"
-    try:
-        r = requests.get(url, timeout=2.5); r.raise_for_status()
-        js = r.json()
-        ang = np.deg2rad(np.asarray(js.get("angles", []), dtype=np.float32))
-        rng = np.asarray(js.get("ranges", []), dtype=np.float32)
-        ts  = float(js.get("ts", 0.0))
-        return ang, rng, ts
-    except Exception:
-        return np.array([]), np.array([]), time.time()
-
-def fetch_pc_frame(port: str, baud: int) -> Tuple[np.ndarray, np.ndarray, float]:
-    now = time.time()
-    if now < ss.lidar_fail_until: return np.array([]), np.array([]), now
-    try:
-        ydlidar = importlib.import_module("ydlidar")
-    except Exception:
-        if not ss.get("warned_no_sdk", False):
-            st.error("ydlidar 모듈이 없습니다. (SDK 설치 필요)")
-            ss.warned_no_sdk = True
-        ss.lidar_fail_until = now + 5.0
-        return np.array([]), np.array([]), now
-
-    if not run: return np.array([]), np.array([]), now
-
-    if ss.ydlidar_L is None and not ss.lidar_open:
-        ydlidar.os_init()
-        L = ydlidar.CYdLidar()
-        L.setlidaropt(ydlidar.LidarPropLidarType, ydlidar.TYPE_TRIANGLE)
-        L.setlidaropt(ydlidar.LidarPropSerialPort, port)
-        ok = False
-        for b in (int(baud), 115200):
-            L.setlidaropt(ydlidar.LidarPropSerialBaudrate, b)
-            L.setlidaropt(ydlidar.LidarPropDeviceType, ydlidar.YDLIDAR_TYPE_SERIAL)
-            L.setlidaropt(ydlidar.LidarPropAutoReconnect, True)
-            L.setlidaropt(ydlidar.LidarPropFixedResolution, True)
-            if hasattr(ydlidar, "LidarPropSupportMotorDtrCtrl"):
-                L.setlidaropt(ydlidar.LidarPropSupportMotorDtrCtrl, True)
-            if L.initialize() and L.turnOn():
-                ss.ydlidar_L = L; ss.lidar_open = True; ok = True; break
-            try: L.turnOff(); L.disconnecting()
-            except Exception: pass
-        if not ok:
-            ss.lidar_fail_until = now + 5.0
-            st.error("LiDAR init 실패 (포트 점유/보레이트 문제)")
-            return np.array([]), np.array([]), now
-
-    L = ss.ydlidar_L
-    if L is None: return np.array([]), np.array([]), now
-
-    scan = ydlidar.LaserScan()
-    ok = L.doProcessSimple(scan)
-    ts = time.time()
-    if not ok: return np.array([]), np.array([]), ts
-
-    if hasattr(scan, "points") and scan.points:
-        ang = np.array([p.angle for p in scan.points], float)
-        rng = np.array([p.range for p in scan.points], float)
-        return ang, rng, ts
-
-    if hasattr(scan, "ranges") and scan.ranges:
-        rng = np.array(list(scan.ranges), float)
-        a0 = getattr(scan, "angle_min", None)
-        inc = getattr(scan, "angle_increment", None)
-        if a0 is not None and inc is not None:
-            n = len(rng); ang = a0 + inc*np.arange(n, dtype=float)
-            return ang, rng, ts
-    return np.array([]), np.array([]), ts
-
 # ---------- 유틸/SLAM ----------
-def pol2xy(theta, r):
+def pol2xy(theta, r, max_r):
     if r.size == 0 or theta.size == 0: return np.empty((0,2), np.float32)
-    m = np.isfinite(r) & (r > 0.05) & (r < ss.map_size*0.9)
+    m = np.isfinite(r) & (r > 0.05) & (r < max_r)
     theta = theta[m]; r = r[m]
     x = r*np.cos(theta); y = r*np.sin(theta)
     return np.stack([x,y], axis=1).astype(np.float32)
 
-try:
-    import open3d as o3d
-    HAS_O3D = True
-except Exception:
-    HAS_O3D = False
-
-def icp_step(curr_xy):
-    if not HAS_O3D: return 0.0,0.0,0.0
-    if ss.icp_prev is None or curr_xy.shape[0] < 50 or ss.icp_prev.shape[0] < 50:
-        return 0.0,0.0,0.0
-    src = o3d.geometry.PointCloud(); src.points = o3d.utility.Vector3dVector(np.c_[curr_xy, np.zeros(len(curr_xy))])
-    tgt = o3d.geometry.PointCloud(); tgt.points = o3d.utility.Vector3dVector(np.c_[ss.icp_prev, np.zeros(len(ss.icp_prev))])
-    reg = o3d.pipelines.registration.registration_icp(
-        src, tgt, 0.30, np.eye(4),
-        o3d.pipelines.registration.TransformationEstimationPointToPoint(),
-        o3d.pipelines.registration.ICPConvergenceCriteria(max_iteration=30)
-    )
-    T4 = reg.transformation
-    dx, dy = float(T4[0,3]), float(T4[1,3])
-    dth    = float(np.arctan2(T4[1,0], T4[0,0]))
-    return dx, dy, dth
-
 def se2(dx, dy, dth):
     c,s = np.cos(dth), np.sin(dth)
     return np.array([[c,-s,dx],[s,c,dy],[0,0,1]], np.float64)
@@ -303,87 +171,279 @@ def apply_se2(T, pts):
     out = hom @ T.T
     return out[:,:2]
 
-def update_occ(world_xy):
-    m = ss.occ_map; half = ss.map_size/2.0; res = ss.res; px = m.shape[0]
-    if world_xy.size == 0: return
-    ix = ((world_xy[:,0] + half)/res).astype(int)
-    iy = ((half - world_xy[:,1])/res).astype(int)
-    inb = (ix>=0)&(iy>=0)&(ix<px)&(iy<px)
-    if np.any(inb):
-        m[iy[inb], ix[inb]] = np.clip(m[iy[inb], ix[inb]] + 0.35, 0.0, 1.0)
-    if DECAY_PCT>0: m[:] *= (1.0 - DECAY_PCT/100.0)
+def cluster_boxes(pts, half):
+    """DBSCAN 군집 → [(xmin, ymin, xmax, ymax, cx, cy)]"""
+    if pts is None or pts.size == 0: return []
+    mask = (pts[:,0] > -half) & (pts[:,0] < half) & (pts[:,1] > -half) & (pts[:,1] < half)
+    pts = pts[mask]
+    if pts.shape[0] < 20: return []
+    labels = DBSCAN(eps=0.25, min_samples=8).fit(pts).labels_
+    boxes = []
+    for c in np.unique(labels):
+        if c == -1: continue
+        cluster = pts[labels==c]
+        if cluster.shape[0] < 8: continue
+        (xmin, ymin), (xmax, ymax) = cluster.min(axis=0), cluster.max(axis=0)
+        cx, cy = cluster.mean(axis=0)
+        boxes.append((float(xmin), float(ymin), float(xmax), float(ymax), float(cx), float(cy)))
+    return boxes
+
+# ---------- 수신 + SLAM 백그라운드 워커 (세션당 1개) ----------
+class LidarSlamWorker:
+    """
+    수신 → ICP → 점유맵 → 군집 을 백그라운드 스레드에서 계속 돌리고 결과만 보관.
+    화면은 fragment 타이머로 snapshot() 을 읽어 그리기만 함 → 센서 I/O·ICP 가 렌더와 겹쳐서 돌고,
+    스크립트 실행 하나가 while 루프로 계속 붙잡혀 있지 않음.
+    스레드 안에서는 st.* 를 쓰지 않음 (세션 컨텍스트 없음) → 오류는 self.error 문자열로 넘김.
+    화면이 idle_s 동안 snapshot() 을 안 부르면(탭 닫힘) 스스로 정지.
+    """
+    def __init__(self, map_size, res, idle_s: float = 15.0):
+        self.idle_s = idle_s
+        self.source = None             # ("remote", host, port) | ("pc", port, baud)
+        self.error = None
+        self.frames = 0; self.loop_ms = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._th = None
+        self._seen = time.monotonic()
+        # 센서 핸들 (워커 스레드만 만지고 닫음)
+        self._open_src = None
+        self._L = None; self._yd = None; self._stream = None
+        self._fail_until = 0.0
+        self._conv = ScanConverter(degrees=False, drop_invalid=False)
+        # 키프레임 + 서브맵 정합 (slam2d.py): 직전 스캔이 아니라 최근 키프레임들을 합친 서브맵에 ICP
+        self._mapper = SubmapSLAM()
+        self._mapper_gen = None
+        self.map_size = self.res = None
+        self._gen = 0                  # 맵 초기화 세대 (계산 중 초기화되면 결과 버림)
+        self.configure(map_size, res)
+
+    # ----- 화면 쪽에서 부르는 것 -----
+    def configure(self, map_size, res):
+        if (map_size, res) != (self.map_size, self.res):
+            self.map_size, self.res = map_size, res
+            self.reset_map()
+
+    def reset_map(self):
+        # 로그 오즈 격자 (occ_grid.py): 광선 추적으로 빈 공간도 반영, 감쇠는 갱신/읽을 때만
+        grid = OccGrid(self.map_size, self.res, half_life_s=OCC_HALF_LIFE_S, t0=time.monotonic())
+        occ  = grid.image(time.monotonic())
+        with self._lock:
+            self._gen    += 1
+            self.grid     = grid        # 워커 스레드만 갱신 (잠금 밖에서)
+            self.occ      = occ         # 화면용 uint8 그림 (워커가 새 배열로 바꿔 끼움, 고치지 않음)
+            self.T        = np.eye(3, dtype=np.float64)
+            self.traj     = [(0.0,0.0)]
+            self.scan     = (np.array([]), np.array([]))
+            self.boxes    = []
+
+    def set_pgo(self, on: bool):
+        self._mapper.pgo = bool(on)
+
+    def set_source(self, source):
+        self.source = source           # 바뀌면 워커가 다음 주기에 기존 연결을 닫고 새로 엶
+
+    @property
+    def running(self) -> bool:
+        return self._th is not None and self._th.is_alive() and not self._stop.is_set()
+
+    def start(self):
+        self._seen = time.monotonic()
+        if self.running: return
+        if self._th is not None: self._th.join(timeout=2.0)   # 정지 중인 이전 스레드 정리
+        self._stop.clear()
+        self._th = threading.Thread(target=self._run, daemon=True)
+        self._th.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def snapshot(self) -> dict:
+        self._seen = time.monotonic()
+        with self._lock:
+            return {"theta": self.scan[0], "r": self.scan[1], "occ": self.occ,
+                    "traj": np.array(self.traj), "boxes": list(self.boxes), "map_size": self.map_size,
+                    "frames": self.frames, "loop_ms": self.loop_ms, "error": self.error,
+                    "slam": self._mapper.stats(),
+                    "running": self.running}
+
+    # ----- 워커 스레드 -----
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() - self._seen > self.idle_s:
+                    break
+                t0 = time.monotonic()
+                src = self.source
+                if src != self._open_src:
+                    self._close(); self._open_src = src
+                th, rr = self._fetch(src)
+                if rr.size:
+                    self._slam(th, rr)
+                else:
+                    self._publish_occ()         # 스캔이 없어도 감쇠는 화면에 반영
+                self.loop_ms = (time.monotonic() - t0) * 1000.0
+                self._stop.wait(max(0.0, INTERVAL - (time.monotonic() - t0)))
+        except Exception as e:
+            self.error = f"워커 오류: {e}"
+        finally:
+            self._stop.set()
+            self._close()
+
+    def _close(self):
+        if self._L is not None:
+            try: self._L.turnOff(); self._L.disconnecting()
+            except Exception: pass
+        self._L = None
+        if self._stream is not None:
+            self._stream.close()
+        self._stream = None
+
+    def _fetch(self, src):
+        empty = (np.array([]), np.array([]))
+        if src is None: return empty
+        if src[0] == "remote":
+            return self._fetch_remote(src[1], src[2]) or empty
+        return self._fetch_pc(src[1], src[2]) or empty
+
+    def _fetch_remote(self, host: str, port: int):
+        # /lidar/stream push 구독 우선 → 연결 전/구버전 서버면 /lidar/latest.bin, JSON 순으로 폴백
+        if self._stream is None and lidar_client.HAS_WS:
+            self._stream = lidar_client.LidarStream.for_host(host, port)
+        stream = self._stream
+        if stream is not None and stream.unsupported:      # 서버가 /lidar/stream 없음 → HTTP 만
+            stream = None
+        got = None
+        if stream is not None and stream.connected:          # 연결 전/재연결 대기 중엔 기다리지 않고 HTTP 로
+            got = stream.next(timeout=max(INTERVAL*2, 0.2))
+        if got is None and (stream is None or not stream.connected):
+            got = lidar_client.fetch_frame(f"http://{host}:{port}", timeout=2.5)
+        if got is None:
+            return None
+        self.error = None
+        ang_deg, rng, _ = got
+        return np.deg2rad(ang_deg), rng
+
+    def _fetch_pc(self, port: str, baud: int):
+        now = time.time()
+        if now < self._fail_until: return None
+        if self._yd is None:
+            try:
+                if os.getenv("BOAT_SIM"):
+                    # 센서 없이: 풀장 시뮬레이터를 ydlidar 자리에 (보트는 내장 자동조종으로 이동)
+                    self._yd = PoolSim.from_env().ydlidar(realtime=True, autopilot=True)
+                else:
+                    self._yd = importlib.import_module("ydlidar")
+            except Exception:
+                self.error = "ydlidar 모듈이 없습니다. (SDK 설치 필요)"
+                self._fail_until = now + 5.0
+                return None
+        ydlidar = self._yd
+
+        if self._L is None:
+            ydlidar.os_init()
+            L = ydlidar.CYdLidar()
+            L.setlidaropt(ydlidar.LidarPropLidarType, ydlidar.TYPE_TRIANGLE)
+            L.setlidaropt(ydlidar.LidarPropSerialPort, port)
+            for b in (int(baud), 115200):
+                L.setlidaropt(ydlidar.LidarPropSerialBaudrate, b)
+                L.setlidaropt(ydlidar.LidarPropDeviceType, ydlidar.YDLIDAR_TYPE_SERIAL)
+                L.setlidaropt(ydlidar.LidarPropAutoReconnect, True)
+                L.setlidaropt(ydlidar.LidarPropFixedResolution, True)
+                if hasattr(ydlidar, "LidarPropSupportMotorDtrCtrl"):
+                    L.setlidaropt(ydlidar.LidarPropSupportMotorDtrCtrl, True)
+                if L.initialize() and L.turnOn():
+                    self._L = L; break
+                try: L.turnOff(); L.disconnecting()
+                except Exception: pass
+            if self._L is None:
+                self._fail_until = now + 5.0
+                self.error = "LiDAR init 실패 (포트 점유/보레이트 문제)"
+                return None
+
+        scan = ydlidar.LaserScan()
+        if not self._L.doProcessSimple(scan): return None
+        self.error = None
+        # points / ranges 두 형식 모두 rpi/scan_convert 에서 한 번에 변환 (라디안, 무효점 포함)
+        ang, rng = self._conv.convert(scan)
+        return ang.copy(), rng.copy()
+
+    def _slam(self, th, rr):
+        with self._lock:
+            gen, map_size, grid = self._gen, self.map_size, self.grid
+        xy = pol2xy(th, rr, map_size*0.9)
+        if self._mapper_gen != gen:          # 맵 초기화 → 키프레임/포즈 그래프도 처음부터
+            self._mapper.reset(); self._mapper_gen = gen
+        px,py,pth = self._mapper.update(xy)               # 느린 부분은 잠금 밖에서
+        T = se2(px,py,pth)
+        world = apply_se2(T, xy)
+        boxes = cluster_boxes(world, map_size/2.0)
+        grid.update((px, py), world, time.monotonic())   # 격자는 이 스레드만 만짐 → 잠금 밖에서
+        occ = grid.image(time.monotonic())                # 맵 전체 계산은 감쇠 틱마다 한 번, 나머지는 바뀐 셀만
+        with self._lock:
+            if gen != self._gen:             # 계산 중 맵이 초기화/크기 변경됨 → 이번 결과 버림
+                return
+            self.T = T
+            self.occ = occ
+            self.traj = self._mapper.trajectory()     # 키프레임 자세 + 현재 자세 (자르지 않음)
+            self.scan = (th, rr); self.boxes = boxes
+            self.frames += 1
+
+    def _publish_occ(self):
+        with self._lock:
+            gen, grid = self._gen, self.grid
+        occ = grid.image(time.monotonic())
+        with self._lock:
+            if gen == self._gen:
+                self.occ = occ
+
+# ---------- 세션 워커 ----------
+ss = st.session_state
+if "lidar_worker" not in ss:
+    ss.lidar_worker = LidarSlamWorker(map_size_m, RES_M)
+worker = ss.lidar_worker
+worker.configure(map_size_m, RES_M)
+if do_reset: worker.reset_map()
+if src == "라즈베리파이 원격(TCP)":
+    worker.set_source(("remote", rpi_ip, int(rpi_port)))
+else:
+    worker.set_source(("pc", COM_PORT, BAUDRATE))
+worker.set_pgo(use_pgo)
+if run: worker.start()
+else: worker.stop()
 
 # ---------- 렌더 ----------
-def render_polar(theta, r):
-    R_VIEW = max(2.0, ss.map_size/2.0 + 0.5)
-    fig = plt.figure(figsize=(6.4,6.4))
-    ax = fig.add_subplot(111, projection="polar")
-    ax.set_theta_zero_location("E"); ax.set_theta_direction(-1)
-    ax.set_rmax(R_VIEW); ax.grid(True, alpha=0.35)
-    if r.size and theta.size:
-        ax.scatter(theta, r, s=8, c="#1f77b4", alpha=0.9)
-    ax.set_title("실시간 스캔")
-    ph_scan.pyplot(fig, clear_figure=True); plt.close(fig)
-
-def render_map():
-    half = ss.map_size/2.0; m = ss.occ_map
-    fig, ax = plt.subplots(figsize=(6.8,6.8))
-    ax.imshow(m, cmap="viridis", origin="upper",
-              extent=[-half, half, -half, half], vmin=0, vmax=1)
-    ax.set_aspect("equal"); ax.set_xlabel("X (m)"); ax.set_ylabel("Y (m)")
-    ax.set_title("누적 맵")
-    if ss.traj:
-        tx,ty = np.array(ss.traj).T
-        ax.plot(tx, ty, color="w", lw=1.5, alpha=0.9)
-        ax.plot(tx[-1], ty[-1], "ro", ms=5)
-    try:
-        if ss.get("last_world") is not None and ss.last_world.size > 0:
-            pts = ss.last_world
-            mask = (pts[:,0] > -half) & (pts[:,0] < half) & (pts[:,1] > -half) & (pts[:,1] < half)
-            pts = pts[mask]
-            if pts.shape[0] >= 20:
-                db = DBSCAN(eps=0.25, min_samples=8).fit(pts)
-                labels = db.labels_; uniq = [c for c in np.unique(labels) if c != -1]
-                import matplotlib.patches as patches
-                for c in uniq:
-                    cluster = pts[labels==c]
-                    if cluster.shape[0] < 8: continue
-                    xmin, ymin = cluster.min(axis=0); xmax, ymax = cluster.max(axis=0)
-                    rect = patches.Rectangle((xmin, ymin), xmax-xmin, ymax-ymin,
-                                             fill=False, ec="orange", lw=1.5, alpha=0.9)
-                    ax.add_patch(rect)
-                    cx, cy = cluster.mean(axis=0); ax.plot(cx, cy, marker="x", ms=6, color="orange", alpha=0.9)
-    except Exception:
-        pass
-    ph_map.pyplot(fig, clear_figure=True); plt.close(fig)
-
-def draw_once(active: bool):
-    if not active:
-        render_polar(np.array([]), np.array([])); render_map(); return
-    if st.session_state.get("lidar_source") == "라즈베리파이 원격(TCP)":
-        th, rr, _ = fetch_remote_frame(st.session_state["rpi_ip"], int(st.session_state["rpi_port"]))
-    else:
-        th, rr, _ = fetch_pc_frame(COM_PORT, BAUDRATE)
-    render_polar(th, rr)
-    xy = pol2xy(th, rr)
-    dx,dy,dth = icp_step(xy)
-    ss.T = ss.T @ se2(dx,dy,dth)
-    world = apply_se2(ss.T, xy); ss.last_world = world
-    update_occ(world)
-    ss.traj.append((float(ss.T[0,2]), float(ss.T[1,2])))
-    if len(ss.traj) > 4000: ss.traj = ss.traj[-4000:]
-    ss.icp_prev = xy
-    render_map()
-
-# 최초 표시
-draw_once(False)
-
-# 루프
-if run:
-    try:
-        while st.session_state.get("live_toggle", False):
-            t0 = time.time()
-            draw_once(True)
-            time.sleep(max(0.0, INTERVAL - (time.time()-t0)))
-    finally:
-        stop_lidar()
+# 브라우저 canvas 컴포넌트(lidar_canvas)로 그림: 서버는 스캔 포인트와 바뀐 맵 셀만 바이너리로 보냄
+def render_polar(theta, r, map_size):
+    R_VIEW = max(2.0, map_size/2.0 + 0.5)
+    lidar_canvas.scan_view(theta, r, R_VIEW, zero="E", clockwise=True, title="실시간 스캔",
+                           height=480, key="lidar12_scan")
+
+def render_map(snap):
+    lidar_canvas.map_view(snap["occ"], snap["map_size"], traj=snap["traj"], boxes=snap["boxes"],
+                          title="누적 맵", height=480, key="lidar12_map")
+
+def live_view():
+    # 워커가 만든 최신 결과만 읽어서 그림 (수신/ICP 는 기다리지 않음)
+    snap = worker.snapshot()
+    if snap["error"]:
+        st.warning(snap["error"])
+    c_left, c_right = st.columns(2)
+    with c_left:  render_polar(snap["theta"], snap["r"], snap["map_size"])
+    with c_right: render_map(snap)
+    state = "수신 중" if snap["running"] else "정지"
+    sl = snap["slam"]; icp = sl["icp"]
+    st.caption(f"{state} · 처리 프레임 {snap['frames']} · 워커 주기 {snap['loop_ms']:.0f} ms · "
+               f"ICP {'OK' if icp['ok'] else '실패'} (반복 {icp['iters']}, 정합 {icp['fitness']:.0%}, "
+               f"잔차 {icp['rmse']*100:.1f} cm) · 키프레임 {sl['keyframes']} (서브맵 {sl['submap_pts']}점) · "
+               f"루프 {sl['loops']} · 최적화 {sl['pgo_runs']}회")
+
+# ---------- 레이아웃 (fragment 타이머로 이 부분만 다시 그림) ----------
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+if _fragment is not None:
+    _fragment(run_every=INTERVAL if run else None)(live_view)()
+else:
+    # 구버전 Streamlit: 한 번 그리고 전체 rerun
+    live_view()
+    if run:
+        time.sleep(INTERVAL); st.rerun()
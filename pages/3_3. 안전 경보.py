@@ -45,6 +45,29 @@ def fetch_ultra_distance(seconds: int = 10, device_id: str = "arduinoA"):
         return None
 # ====================================================================
 
+# === 카메라 전방 장애물 감지 (Pi: cam_api /cam/detect) ================
+import requests
+
+def fetch_cam_detect(max_age_s: float = 5.0):
+    """
+    Pi 카메라 감지 결과 {score, bbox, obstacle, ts, age_s} 를 가져옵니다.
+    서버가 없거나 감지가 꺼져 있으면 None. 결과가 max_age_s 보다 오래됐으면 d["stale"]=True (→ 시나리오 값 사용, 화면에 표시).
+    신선도는 서버가 계산한 age_s 로 판정 (Pi 와 대시보드 시계가 달라도 됨).
+    """
+    api = os.getenv("API_BASE") or st.session_state.get("api_input", "http://172.20.10.3:8000")
+    base = os.getenv("CAM_API_BASE") or api.replace(":8000", ":8002")
+    try:
+        r = requests.get(f"{base}/cam/detect", timeout=0.3); r.raise_for_status()
+        d = r.json()
+    except Exception:
+        return None
+    if not d.get("enabled") or d.get("ts") is None:
+        return None
+    age = d.get("age_s")
+    d["stale"] = age is None or float(age) > max_age_s
+    return d
+# ====================================================================
+
 # --- 페이지 기본 설정 ---
 st.set_page_config(
     page_title="안전/경보 대시보드",
@@ -340,11 +363,22 @@ def read_latest(prev=None):
     else:
         ultra_dist = float(lidar_min)             # DB 없으면 더미값 유지
 
+    # 카메라 감지 결과가 있으면 실제 값 사용 (없으면 시나리오 값 유지)
+    cam = fetch_cam_detect(max_age_s=THRESH["data_timeout_s"])
+    cam_stale, cam_stale_s = False, None
+    if cam is not None and cam["stale"]:           # 서버는 응답하지만 감지 결과가 오래됨 → 시나리오 값 + 화면 표시
+        cam_stale, cam_stale_s = True, cam.get("age_s"); cam = None
+    if cam is not None:
+        cam_obstacle_center = bool(cam["obstacle"])
+
     return {
         "ts": now,
         "lidar_min": lidar_min,                   # m
         "ultra_dist": ultra_dist,                 # m (새 키)
         "cam_obstacle_center": cam_obstacle_center,
+        "cam_score": cam["score"] if cam else None,
+        "cam_stale": cam_stale,
+        "cam_stale_s": cam_stale_s,
         "gps_speed": gps_speed,
         "motor_i": motor_i,
         "pi_temp": pi_temp,
@@ -439,6 +473,14 @@ def stat_card(icon: str, title: str, value: str, sub: str | None = None,
     """
     st.markdown(html, unsafe_allow_html=True)
 
+def cam_tag(x):
+    if x.get("cam_score") is not None:
+        return f"(score {x['cam_score']:.2f})"
+    if x.get("cam_stale"):
+        age = x.get("cam_stale_s")
+        return f"(카메라 결과 오래됨 {age:.0f}s → 시뮬레이션)" if age is not None else "(카메라 결과 없음 → 시뮬레이션)"
+    return "(시뮬레이션)"
+
 # 그대로 사용
 TH = THRESH
 c1, c2, c3, c4, c5 = st.columns(5)
@@ -448,7 +490,8 @@ with c1:
     stat_card("📡", "LiDAR 최소거리", f"{sample['lidar_min']:.2f} m")
 
 with c2:
-    stat_card("🎥", "카메라 전방", "감지됨" if sample["cam_obstacle_center"] else "정상")
+    stat_card("🎥", "카메라 전방", "감지됨" if sample["cam_obstacle_center"] else "정상",
+              title_tag=cam_tag(sample))
 
 with c3:
     stat_card("🚤", "선박 속도", f"{sample['gps_speed']:.2f} m/s")
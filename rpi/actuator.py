@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# actuator.py
+# pigpio 출력 전담 스레드 (main.py)
+#  - HTTP 핸들러는 submit()으로 명령만 넣고 바로 응답 → 스레드풀/이벤트 루프를 붙잡지 않음
+#  - 채널(throttle / steer)마다 "최신 값 1칸" 메일박스: 밀린 명령은 가장 최근 것만 남기고 버림
+#  - 명령 접수 → PWM 출력 완료까지 지연을 히스토그램으로 기록
+
+import time, threading
+from loop_sched import LatencyHistogram
+
+class Actuator:
+    CHANNELS = ("throttle", "steer")
+
+    def __init__(self, motor):
+        self.motor = motor
+        self._cv = threading.Condition()
+        self._pending = {}                 # 채널 → (값, 접수 시각 perf_counter)
+        self._stop = False
+        self._th = threading.Thread(target=self._run, name="actuator", daemon=True)
+        self.latency = {ch: LatencyHistogram() for ch in self.CHANNELS}
+        self.counts = {"submitted": 0, "applied": 0, "coalesced": 0, "errors": 0}
+
+    def start(self):
+        self._th.start()
+        return self
+
+    def stop(self, timeout: float = 1.0):
+        with self._cv:
+            self._stop = True
+            self._cv.notify()
+        self._th.join(timeout)
+
+    def submit(self, throttle=None, steer=None, t0=None):
+        """논블로킹. 아직 출력 안 된 같은 채널 명령은 새 값으로 덮어씀."""
+        t0 = time.perf_counter() if t0 is None else t0
+        with self._cv:
+            for ch, val in (("throttle", throttle), ("steer", steer)):
+                if val is None: continue
+                if ch in self._pending:
+                    self.counts["coalesced"] += 1
+                self._pending[ch] = (val, t0)
+                self.counts["submitted"] += 1
+            self._cv.notify()
+
+    def clear_pending(self, channel=None):
+        """아직 출력 안 된 명령 버리기 (비상 정지 직후 밀린 추진 명령이 뒤늦게 나가지 않도록)."""
+        with self._cv:
+            if channel is None: self._pending.clear()
+            else: self._pending.pop(channel, None)
+
+    def _run(self):
+        while True:
+            with self._cv:
+                self._cv.wait_for(lambda: self._pending or self._stop)
+                if self._stop:
+                    return
+                batch, self._pending = self._pending, {}
+            for ch, (val, t0) in batch.items():
+                try:
+                    self._apply(ch, val)
+                except Exception as e:
+                    self.counts["errors"] += 1
+                    print(f"[actuator] {ch}={val} 출력 실패: {e}")
+                    continue
+                self.latency[ch].record(time.perf_counter() - t0)
+                self.counts["applied"] += 1
+
+    def _apply(self, ch, val):
+        if ch == "throttle":
+            self.motor.control_dc_motors(val)
+        else:
+            self.motor.control_servo_angle(val)
+
+    def summary(self) -> dict:
+        return {
+            "counts": dict(self.counts),
+            "latency": {ch: h.summary() for ch, h in self.latency.items()},
+            "motor": dict(getattr(self.motor, "stats", {})),
+        }
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# avoid_logic.py
+# 회피 상태기계 (하드웨어 없음 → avoidance_control.main 과 bench_avoidance.py 가 같은 코드로 판단)
+#   CRUISE ⇄ SLOW ⇄ AVOID, 진입/해제 임계를 따로 둔 히스테리시스 + 조향 EMA
+#   update(L, C, R) → (throttle %, servo 각도)
+
+import numpy as np
+
+# 임계 (히스테리시스)
+AVOID_IN  = 0.50
+AVOID_OUT = 0.60
+SLOW_IN   = 0.90
+SLOW_OUT  = 1.00
+
+# 속도/조향
+V_CRUISE  = 40                 # 순항
+V_AVOID   = 30                 # 회피
+STEER_MAX = 25                 # 회피 조향(±deg)
+STEER_CTR = 90                 # 서보 중립
+
+# 부드럽게(EMA)
+STEER_ALPHA = 0.3
+
+class AvoidanceController:
+    def __init__(self, avoid_in=AVOID_IN, avoid_out=AVOID_OUT, slow_in=SLOW_IN, slow_out=SLOW_OUT,
+                 v_cruise=V_CRUISE, v_avoid=V_AVOID, steer_max=STEER_MAX, steer_ctr=STEER_CTR,
+                 steer_alpha=STEER_ALPHA):
+        self.avoid_in, self.avoid_out = avoid_in, avoid_out
+        self.slow_in, self.slow_out = slow_in, slow_out
+        self.v_cruise, self.v_avoid = v_cruise, v_avoid
+        self.steer_max, self.steer_ctr, self.steer_alpha = steer_max, steer_ctr, steer_alpha
+        self.reset()
+
+    def reset(self):
+        self.state = "CRUISE"
+        self.steer_ema = float(self.steer_ctr)
+        self.transitions = 0
+
+    def params(self) -> dict:
+        return {k: getattr(self, k) for k in ("avoid_in", "avoid_out", "slow_in", "slow_out", "v_cruise",
+                                              "v_avoid", "steer_max", "steer_ctr", "steer_alpha")}
+
+    def update(self, Lm, Cm, Rm):
+        """섹터 최소거리(좌/중/우, 점 없으면 inf) → (throttle, steer)."""
+        prev = state = self.state
+        # 상태 전이
+        if state != "AVOID" and Cm < self.avoid_in: state = "AVOID"
+        elif state == "AVOID" and Cm > self.avoid_out: state = "SLOW"
+        if state != "SLOW" and (self.avoid_out < Cm < self.slow_in): state = "SLOW"
+        elif state == "SLOW" and Cm > self.slow_out: state = "CRUISE"
+        if state != prev: self.transitions += 1
+        self.state = state
+
+        # 제어
+        if state == "AVOID":
+            v = self.v_avoid
+            steer = self.steer_ctr + (self.steer_max if Lm < Rm else -self.steer_max)
+        elif state == "SLOW":
+            if np.isfinite(Cm):
+                k = max(0.0, min(1.0, (Cm - self.avoid_out) / (self.slow_in - self.avoid_out)))
+                v = self.v_avoid + (self.v_cruise - self.v_avoid) * k
+            else:
+                v = self.v_avoid
+            steer = self.steer_ctr
+        else:
+            v = self.v_cruise; steer = self.steer_ctr
+
+        self.steer_ema = (1-self.steer_alpha)*self.steer_ema + self.steer_alpha*steer
+        return v, float(self.steer_ema)
@@ -1,165 +1,245 @@
 # -*- coding: utf-8 -*-
 # 🚤 LiDAR 회피 기동 (간단/튼튼: DBSCAN 없음, 섹터 최소거리 기반)
-import time, math, importlib, os, threading
-import numpy as np
-from motor_control import setup, cleanup, control_dc_motors, control_servo_angle
+import time, importlib, os
+if os.getenv("BOAT_SIM"):
+    # 노트북 폐루프: 풀장 시뮬레이터(pool_sim.py)가 모터와 LiDAR 를 대신함
+    from pool_sim import PoolSim
+    SIM = PoolSim.from_env()
+    _sim_motors = SIM.motors()
+    setup, cleanup = _sim_motors.setup, _sim_motors.cleanup
+    control_dc_motors, control_servo_angle = _sim_motors.control_dc_motors, _sim_motors.control_servo_angle
+else:
+    SIM = None
+    from motor_control import setup, cleanup, control_dc_motors, control_servo_angle
+from scan_convert import ScanConverter
+from sectors import SectorEngine, split_lcr
+from avoid_logic import AvoidanceController, V_CRUISE, STEER_CTR
+from frame_store import FrameStore
+from scan_bus import ScanBus, BusReader
+from scan_log import ScanRecorder, ScanReplay
+from lidar_acq import open_lidar
+from loop_sched import LoopScheduler, StageTimer, Watchdog
 
 # ===== 설정값 (2.6×1.75m 풀장 기준) =====
 LIDAR_PORT   = os.getenv("LIDAR_PORT", "/dev/ttyUSB0")  # 윈도우면 \\.\COM10
 BAUDRATE     = int(os.getenv("LIDAR_BAUD", "128000"))
 HZ           = 10
-INTERVAL     = 1.0 / HZ
+SIM_SPEED    = float(os.getenv("BOAT_SIM_SPEED", "1.0"))   # BOAT_SIM 일 때 실시간 대비 배속
 
 FOV_DEG      = 120             # 전방 ±60°
 DECISION_CAP = 1.6             # 판단용 최대거리
 WALL_TOL     = 0.10            # 벽 기준치 대비 ±10%면 벽으로 간주
 
-# 임계 (히스테리시스)
-AVOID_IN  = 0.50
-AVOID_OUT = 0.60
-SLOW_IN   = 0.90
-SLOW_OUT  = 1.00
+# 섹터 (도, 오름차순 경계 → 섹터 N개). 기본은 좌(-60~-20) / 중(-20~20) / 우(20~60)
+SECTOR_EDGES = (-FOV_DEG/2, -20, 20, FOV_DEG/2)
+BIN_RES_DEG  = 1.0             # 벽 기준치/섹터 계산용 각도 빈 간격
 
-# 속도/조향
-V_CRUISE  = 40                 # 순항
-V_AVOID   = 30                 # 회피
-STEER_MAX = 25                 # 회피 조향(±deg)
-STEER_CTR = 90                 # 서보 중립
+# 벽 기준치 모델 파일 (있으면 시작 시 바로 불러오고, 순항 중 갱신한 것을 주기적으로 저장)
+BASELINE_PATH   = os.getenv("WALL_BASELINE", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "wall_baseline_sim.npy" if SIM else "wall_baseline.npy"))
+BASELINE_SAVE_S = 30.0
 
-# 부드럽게(EMA)
-STEER_ALPHA = 0.3
+# 임계/속도/조향/EMA 값은 avoid_logic.py (벤치마크 하네스와 공용)
 
 # 워치독(루프 정지 방지)
 WATCHDOG_S = 2.0
 
+# 기록/재생 (scan_log.py)
+#   AVOID_RECORD=폴더  : 루프가 받은 스캔(원본, 라디안)을 그대로 기록 → 현장 문제 재현용
+#   LIDAR_REPLAY=폴더  : 센서 대신 기록 재생 (LIDAR_REPLAY_SPEED 배속)
+RECORD_PATH  = os.getenv("AVOID_RECORD")
+REPLAY_PATH  = os.getenv("LIDAR_REPLAY")
+REPLAY_SPEED = float(os.getenv("LIDAR_REPLAY_SPEED", "1.0"))
+
 # ===== 라이다 최신 프레임을 대시보드/다른 프로세스도 읽을 수 있게 공유 =====
-# FastAPI(lidar_api.py)와 같은 프로세스에서 쓰면 공유 가능하지만,
-# 여기선 간단히 "로컬 HTTP 서버"가 별도 파일에서 같은 센서를 다시 열지 않도록
-# 본 스크립트에서 최신 프레임을 메모리에 저장하고, lidar_api.py가 같은 프로세스에서 함께 실행되게 구성.
-latest_frame = {"ts":0.0, "angles":[], "ranges":[]}
-latest_lock = threading.Lock()
+# 별도 프로세스로 돌릴 때는 lidar_acq.py 가 센서를 혼자 열고 공유 메모리 버스(scan_bus)에 쓰며,
+# 이 스크립트와 lidar_server.py 는 LIDAR_BUS 환경변수로 같은 버스에 붙어서 읽기만 함.
+# 같은 프로세스에서 쓸 때는 아래 저장소를 그대로 노출.
+# 저장소는 frame_store.FrameStore (참조 교체 방식) → 읽는 쪽이 제어 루프를 막지 않음
+latest_store = FrameStore(capacity=1024)
 
 def publish_frame(ang, rng):
-    with latest_lock:
-        latest_frame["ts"] = time.time()
-        latest_frame["angles"] = ang.tolist() if isinstance(ang, np.ndarray) else list(ang)
-        latest_frame["ranges"] = rng.tolist() if isinstance(rng, np.ndarray) else list(rng)
+    latest_store.publish(ang, rng)
 
 def get_latest_frame():
-    with latest_lock:
-        return dict(latest_frame)
+    return latest_store.read(lambda f: {
+        "ts": f.ts,
+        "angles": f.angles.tolist(),
+        "ranges": f.ranges.tolist(),
+    })
+
+# ===== 루프 지표 (/metrics) =====
+# 10Hz 가 파이에서 실제로 유지되는지 확인용: 주기 지터/오버런, 구간별 지연(acquire/sectors/actuate)
+METRICS_PORT = int(os.getenv("AVOID_METRICS_PORT", "8003"))   # 0 이면 끔
+metrics = {"state": None, "sched": None, "stages": None, "watchdog": None}
+
+def metrics_snapshot():
+    out = {"state": metrics["state"], "frames": latest_store.stats()}
+    if SIM is not None:
+        out["sim"] = SIM.state()
+    for k in ("sched", "stages", "watchdog"):
+        if metrics[k] is not None:
+            out[k] = metrics[k].summary()
+    return out
+
+def start_metrics_server():
+    if METRICS_PORT <= 0:
+        return
+    import threading, uvicorn
+    from fastapi import FastAPI
+    api = FastAPI()
+
+    @api.get("/metrics")
+    def _metrics():
+        return metrics_snapshot()
+
+    @api.get("/metrics/histograms")
+    def _histograms():
+        stages = metrics["stages"]; sched = metrics["sched"]
+        out = {n: h.buckets() for n, h in stages.hist.items()} if stages else {}
+        if sched:
+            out["jitter"] = sched.jitter.buckets(); out["cycle"] = sched.cycle.buckets()
+        return out
+
+    server = uvicorn.Server(uvicorn.Config(api, host="0.0.0.0", port=METRICS_PORT, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    print(f"📈 루프 지표: http://0.0.0.0:{METRICS_PORT}/metrics")
+
+# ===== 스캔 소스 =====
+# 모두 read() → (angles_rad, ranges_m) float32 뷰 (무효점 포함, 센서 순서), 없으면 None
+# (기록 재생은 scan_log.ScanReplay 가 같은 모양으로 동작)
+class _LidarSource:
+    """이 프로세스가 시리얼 포트를 직접 엶 (단독 실행)"""
+    def __init__(self, ydlidar=None):
+        self.ydlidar = ydlidar or importlib.import_module("ydlidar")
+        self.L = open_lidar(self.ydlidar, LIDAR_PORT, BAUDRATE)
+        if self.L is None:
+            raise RuntimeError(f"{LIDAR_PORT}@{BAUDRATE} 열기 실패")
+        self.scan = self.ydlidar.LaserScan()
+        self.conv = ScanConverter(degrees=False, drop_invalid=False)
+
+    def read(self):
+        if not self.L.doProcessSimple(self.scan):
+            return None
+        return self.conv.convert(self.scan)
+
+    def close(self):
+        try:
+            self.L.turnOff()
+        except Exception:
+            pass
+
+class _BusSource:
+    """lidar_acq.py 가 쓰는 공유 메모리 버스를 복사 없이 읽음 (링 8슬롯 → 한 주기 안에는 덮이지 않음)"""
+    def __init__(self, name):
+        self.bus = ScanBus.attach(name)
+        self.reader = BusReader(self.bus)
+
+    def read(self):
+        got = self.reader.read(timeout=0.5)
+        return None if got is None else (got[2], got[3])
+
+    def close(self):
+        self.reader.close()
+        self.bus.close()
+
+def open_scan_source():
+    if REPLAY_PATH:
+        return ScanReplay(REPLAY_PATH, speed=REPLAY_SPEED)
+    if SIM is not None:
+        # 스캔 한 번 = 시뮬레이션 1/scan_hz 초. 대기는 LoopScheduler 가 함 (SIM_SPEED 배속)
+        return _LidarSource(SIM.ydlidar(realtime=False))
+    bus_name = os.getenv("LIDAR_BUS")
+    return _BusSource(bus_name) if bus_name else _LidarSource()
 
 # ===== 메인 =====
 def main():
     setup()
     print("✅ [avoidance_simple] 시작")
 
-    # LiDAR
-    ydlidar = importlib.import_module("ydlidar")
-    ydlidar.os_init()
-    L = ydlidar.CYdLidar()
-    L.setlidaropt(ydlidar.LidarPropLidarType, ydlidar.TYPE_TRIANGLE)
-    L.setlidaropt(ydlidar.LidarPropSerialPort, LIDAR_PORT)
-    L.setlidaropt(ydlidar.LidarPropSerialBaudrate, BAUDRATE)
-    L.setlidaropt(ydlidar.LidarPropDeviceType, ydlidar.YDLIDAR_TYPE_SERIAL)
-    L.setlidaropt(ydlidar.LidarPropAutoReconnect, True)
-    L.setlidaropt(ydlidar.LidarPropFixedResolution, True)
-    if hasattr(ydlidar, "LidarPropSupportMotorDtrCtrl"):
-        L.setlidaropt(ydlidar.LidarPropSupportMotorDtrCtrl, True)
-    if not L.initialize() or not L.turnOn():
-        print("❌ LiDAR 초기화 실패")
+    # LiDAR (LIDAR_REPLAY 면 기록 재생, LIDAR_BUS 가 있으면 lidar_acq.py 의 공유 메모리 버스, 없으면 포트 직접)
+    try:
+        src = open_scan_source()
+    except Exception as e:
+        print(f"❌ LiDAR 초기화 실패: {e}")
         cleanup(); raise SystemExit
 
-    # 벽 기준치 학습
-    print("🧭 벽 기준치 측정 중...")
-    baseline = None; t0 = time.time()
-    while time.time() - t0 < 2.0:
-        scan = ydlidar.LaserScan(); L.doProcessSimple(scan)
-        if hasattr(scan, "points") and scan.points:
-            rng = np.array([p.range for p in scan.points], float)
-            baseline = rng if baseline is None else (0.8*baseline + 0.2*rng)
-        time.sleep(0.1)
-    print("✅ 벽 기준치 학습 완료")
-
-    def sector_mins(angles_rad, ranges_m):
-        fov = math.radians(FOV_DEG/2)
-        mask = (angles_rad > -fov) & (angles_rad < fov)
-        a = angles_rad[mask]; r = ranges_m[mask]
-        if a.size == 0: return np.inf, np.inf, np.inf
-        r = np.clip(r, 0, DECISION_CAP)
-        valid = np.isfinite(r) & (r > 0.05)
-        a, r = a[valid], r[valid]
-        if baseline is not None and baseline.size >= r.size:
-            b = baseline[:r.size]
-            diff = np.abs(r - b) / np.maximum(b, 1e-6)
-            r[diff <= WALL_TOL] = np.nan
-            m2 = np.isfinite(r) & (r > 0.05)
-            a, r = a[m2], r[m2]
-        if r.size == 0: return np.inf, np.inf, np.inf
-        a_deg = np.degrees(a)
-        Lm = np.nanmin(r[(a_deg < -20)]) if np.any(a_deg < -20) else np.inf
-        Cm = np.nanmin(r[(a_deg >= -20) & (a_deg <= 20)]) if np.any((a_deg >= -20) & (a_deg <= 20)) else np.inf
-        Rm = np.nanmin(r[(a_deg > 20)]) if np.any(a_deg > 20) else np.inf
-        return Lm, Cm, Rm
-
-    state = "CRUISE"
-    steer_ema = STEER_CTR
+    recorder = ScanRecorder(RECORD_PATH, source="avoidance_control") if RECORD_PATH else None
+
+    sectors = SectorEngine(SECTOR_EDGES, res_deg=BIN_RES_DEG, cap=DECISION_CAP, wall_tol=WALL_TOL)
+    baseline = sectors.baseline
+
+    if baseline.load(BASELINE_PATH):
+        print(f"✅ 벽 기준치 불러옴: {BASELINE_PATH} ({baseline.known}/{baseline.nbins} 빈)")
+    else:
+        # 저장된 모델이 없을 때만 처음 한 번 학습 (각도 빈 단위)
+        print("🧭 벽 기준치 측정 중...")
+        t0 = time.time()
+        while time.time() - t0 < 2.0:
+            got = src.read()
+            if got is not None:
+                sectors.observe_baseline(*got)
+            time.sleep(0.1)
+        baseline.save(BASELINE_PATH)
+        print("✅ 벽 기준치 학습 완료")
+    last_save = time.time()
+
+    ctrl = AvoidanceController()
     control_dc_motors(V_CRUISE); control_servo_angle(STEER_CTR)
-    last_loop = time.time()
+
+    sched = LoopScheduler(HZ * SIM_SPEED if SIM else HZ)
+    stages = StageTimer("acquire", "sectors", "actuate")
+    # 루프가 WATCHDOG_S 동안 한 바퀴도 못 돌면(센서/버스 멈춤 등) 별도 스레드에서 정지
+    wd = Watchdog(WATCHDOG_S, lambda: (control_dc_motors(0), control_servo_angle(STEER_CTR, force=True))).start()
+    metrics.update(sched=sched, stages=stages, watchdog=wd)
+    start_metrics_server()
 
     try:
         while True:
-            t_loop = time.time()
-            scan = ydlidar.LaserScan()
-            ok = L.doProcessSimple(scan)
-            if not ok or not hasattr(scan, "points"):
-                control_dc_motors(0); time.sleep(0.1); continue
+            sched.wait()
+            wd.kick()
 
-            ang = np.array([p.angle for p in scan.points], float)
-            rng = np.array([p.range for p in scan.points], float)
+            with stages.time("acquire"):
+                got = src.read()
+            if got is None:
+                control_dc_motors(0)
+                if getattr(src, "done", False):      # 기록 재생 끝 (loop 아님) → 정상 종료
+                    print("⏹️ 기록 재생 끝 → 종료"); break
+                continue
+
+            ang, rng = got
+            if recorder is not None:
+                recorder.write(ang, rng)
 
             # 최신 프레임 publish → FastAPI가 그대로 노출
             publish_frame(ang, rng)
 
-            Lm, Cm, Rm = sector_mins(ang, rng)
-
-            # 상태 전이
-            if state != "AVOID" and Cm < AVOID_IN: state = "AVOID"
-            elif state == "AVOID" and Cm > AVOID_OUT: state = "SLOW"
-            if state != "SLOW" and (AVOID_OUT < Cm < SLOW_IN): state = "SLOW"
-            elif state == "SLOW" and Cm > SLOW_OUT: state = "CRUISE"
-
-            # 제어
-            if state == "AVOID":
-                control_dc_motors(V_AVOID)
-                steer = STEER_CTR + (STEER_MAX if Lm < Rm else -STEER_MAX)
-            elif state == "SLOW":
-                if np.isfinite(Cm):
-                    v = V_AVOID + (V_CRUISE - V_AVOID) * max(0.0, min(1.0, (Cm - AVOID_OUT) / (SLOW_IN - AVOID_OUT)))
-                else:
-                    v = V_AVOID
-                control_dc_motors(v); steer = STEER_CTR
-            else:
-                control_dc_motors(V_CRUISE); steer = STEER_CTR
-
-            steer_ema = (1-STEER_ALPHA)*steer_ema + STEER_ALPHA*steer
-            control_servo_angle(float(steer_ema))
-
-            last_loop = time.time()
-            dt = last_loop - t_loop
-            time.sleep(max(0.0, INTERVAL - dt))
-
-            # 워치독
-            if time.time() - last_loop > WATCHDOG_S:
-                control_dc_motors(0); control_servo_angle(STEER_CTR)
+            with stages.time("sectors"):
+                Lm, Cm, Rm = split_lcr(sectors.sector_mins(ang, rng))
+
+            # 상태 전이 + 제어 (avoid_logic.AvoidanceController)
+            with stages.time("actuate"):
+                v, steer = ctrl.update(Lm, Cm, Rm)
+                metrics["state"] = ctrl.state
+                control_dc_motors(v)
+                control_servo_angle(steer)
+
+            # 순항 중에만 벽 기준치 온라인 갱신 (방금 계산한 빈 최소값 재사용)
+            if ctrl.state == "CRUISE":
+                baseline.update(sectors.last_bins)
+                if time.time() - last_save > BASELINE_SAVE_S:
+                    baseline.save(BASELINE_PATH); last_save = time.time()
 
     except KeyboardInterrupt:
         print("\n🛑 종료")
     finally:
-        try:
-            L.turnOff()
-        except Exception:
-            pass
+        if baseline.dirty:
+            try: baseline.save(BASELINE_PATH)
+            except OSError: pass
+        wd.stop()
+        src.close()
+        if recorder is not None:
+            recorder.close()
         cleanup()
 
 if __name__ == "__main__":
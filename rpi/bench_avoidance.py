@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+# bench_avoidance.py
+# 회피 제어 폐루프 벤치마크 (하드웨어 없음, 실시간보다 빠르게)
+#   python bench_avoidance.py                               # 전체 시나리오
+#   python bench_avoidance.py --only center,crossing
+#   python bench_avoidance.py --set avoid_in=0.55 --set steer_alpha=0.5    # 임계값 튜닝
+#   python bench_avoidance.py --save-baseline base.json     # 현재 결과를 기준으로 저장
+#   python bench_avoidance.py --baseline base.json          # 기준과 비교 (악화 시 종료코드 1)
+#
+# 시나리오마다: pool_sim 보트를 출발점에서 띄우고, avoidance_control 과 같은 섹터 설정 + avoid_logic 상태기계로
+# 10Hz(시뮬레이션 시간) 루프를 돌려 반대편 목표선(goal_x) 도달까지 측정
+#   cycle_ms  : 스캔 변환 + 섹터 계산 + 상태기계 (판단 지연) p50/p99/max
+#   collisions / min_clearance(m) / time_to_goal(s, 미도달이면 null) / transitions
+
+import os, sys, json, time, argparse
+os.environ.setdefault("BOAT_SIM", "1")     # avoidance_control 의 설정값만 가져옴 (모터 대신 시뮬레이터)
+import avoidance_control as ac
+from avoid_logic import AvoidanceController
+from pool_sim import PoolSim, POOL_W, POOL_H
+from scan_convert import ScanConverter
+from sectors import SectorEngine, split_lcr
+from loop_sched import LatencyHistogram
+
+MID = POOL_H / 2
+# 장애물: (x, y, r, vx, vy)  — 보트는 (0.35, MID) 에서 +x 방향 출발, +y 가 왼쪽
+SCENARIOS = {
+    "empty":       dict(obstacles=[]),
+    "center":      dict(obstacles=[(1.30, MID, 0.10, 0, 0)]),
+    "offset_left": dict(obstacles=[(1.30, MID + 0.18, 0.10, 0, 0)]),
+    "offset_right": dict(obstacles=[(1.30, MID - 0.18, 0.10, 0, 0)]),
+    "gate":        dict(obstacles=[(1.40, MID + 0.38, 0.10, 0, 0), (1.40, MID - 0.38, 0.10, 0, 0)]),
+    "crossing":    dict(obstacles=[(1.35, 0.20, 0.09, 0, 0.10)]),
+    "head_on":     dict(obstacles=[(2.20, MID + 0.05, 0.09, -0.08, 0)]),
+    "noisy":       dict(obstacles=[(1.30, MID, 0.10, 0, 0)], sigma=0.03, dropout=0.10),
+}
+
+def run_scenario(spec, params, seed=0, timeout_s=40.0, goal_x=POOL_W - 0.45, calib_scans=20):
+    sim = PoolSim(obstacles=spec["obstacles"], seed=seed,
+                  sigma=spec.get("sigma", 0.01), dropout=spec.get("dropout", 0.02), scan_hz=ac.HZ)
+    mod = sim.ydlidar(realtime=False)
+    lidar = mod.CYdLidar(); lidar.turnOn()
+    scan = mod.LaserScan()
+    conv = ScanConverter(degrees=False, drop_invalid=False)
+    sectors = SectorEngine(ac.SECTOR_EDGES, res_deg=ac.BIN_RES_DEG, cap=ac.DECISION_CAP, wall_tol=ac.WALL_TOL)
+    ctrl = AvoidanceController(**params)
+    hist = LatencyHistogram()
+
+    # 출발 전 벽 기준치 학습 (avoidance_control.main 과 같은 2초, 보트는 정지 상태)
+    for _ in range(calib_scans):
+        lidar.doProcessSimple(scan)
+        sectors.observe_baseline(*conv.convert(scan))
+    t_start = sim.t
+
+    t_goal = None
+    while sim.t - t_start < timeout_s:
+        lidar.doProcessSimple(scan)             # 시뮬레이션 1/HZ 초 진행 + 스캔
+        t0 = time.perf_counter()
+        ang, rng = conv.convert(scan)
+        Lm, Cm, Rm = split_lcr(sectors.sector_mins(ang, rng))
+        v, steer = ctrl.update(Lm, Cm, Rm)
+        if ctrl.state == "CRUISE":
+            sectors.baseline.update(sectors.last_bins)
+        hist.record(time.perf_counter() - t0)
+        sim.command(throttle=v, servo=steer)
+        if sim.x >= goal_x:
+            t_goal = sim.t - t_start; break
+
+    s = hist.summary()
+    return {
+        "cycles": s["count"],
+        "cycle_ms": {"p50": s["p50_ms"], "p99": s["p99_ms"], "max": s["max_ms"]},
+        "collisions": sim.collisions,
+        "min_clearance": round(float(sim.min_clearance), 3),
+        "time_to_goal": None if t_goal is None else round(t_goal, 2),
+        "transitions": ctrl.transitions,
+    }
+
+# ----- 기준 비교 -----
+def compare(cur, base, time_tol=0.10, clear_tol=0.03, cpu_tol=0.50):
+    """악화 항목 목록 [(시나리오, 설명)]"""
+    bad = []
+    for name, r in cur.items():
+        b = base.get(name)
+        if b is None: continue
+        if r["collisions"] > b["collisions"]:
+            bad.append((name, f"collisions {b['collisions']} → {r['collisions']}"))
+        if b["time_to_goal"] is not None:
+            if r["time_to_goal"] is None:
+                bad.append((name, "goal 미도달"))
+            elif r["time_to_goal"] > b["time_to_goal"] * (1 + time_tol):
+                bad.append((name, f"time_to_goal {b['time_to_goal']} → {r['time_to_goal']}s"))
+        if r["min_clearance"] < b["min_clearance"] - clear_tol:
+            bad.append((name, f"min_clearance {b['min_clearance']} → {r['min_clearance']}m"))
+        if r["cycle_ms"]["p99"] > b["cycle_ms"]["p99"] * (1 + cpu_tol) + 0.05:
+            bad.append((name, f"cycle p99 {b['cycle_ms']['p99']} → {r['cycle_ms']['p99']}ms"))
+    return bad
+
+def _parse_set(items):
+    out = {}
+    for it in items:
+        k, _, v = it.partition("=")
+        out[k.strip()] = float(v)
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--only", help="쉼표로 구분한 시나리오 이름")
+    ap.add_argument("--set", action="append", default=[], help="AvoidanceController 파라미터 (예: avoid_in=0.55)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--timeout", type=float, default=40.0, help="시나리오당 시뮬레이션 시간 상한(s)")
+    ap.add_argument("--baseline", help="비교할 기준 JSON")
+    ap.add_argument("--save-baseline", help="결과를 기준 JSON 으로 저장")
+    args = ap.parse_args()
+
+    params = _parse_set(args.set)
+    names = args.only.split(",") if args.only else list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"알 수 없는 시나리오: {unknown} (가능: {', '.join(SCENARIOS)})")
+
+    results = {}
+    t0 = time.perf_counter()
+    print(f"{'scenario':<13} {'goal s':>7} {'coll':>4} {'min clr':>8} {'trans':>5} {'p50 ms':>7} {'p99 ms':>7} {'max ms':>7}")
+    for n in names:
+        r = results[n] = run_scenario(SCENARIOS[n], params, seed=args.seed, timeout_s=args.timeout)
+        goal = "-" if r["time_to_goal"] is None else f"{r['time_to_goal']:.1f}"
+        c = r["cycle_ms"]
+        print(f"{n:<13} {goal:>7} {r['collisions']:>4} {r['min_clearance']:>8.3f} {r['transitions']:>5} "
+              f"{c['p50']:>7.3f} {c['p99']:>7.3f} {c['max']:>7.3f}")
+    sim_s = sum(r["cycles"] for r in results.values()) / ac.HZ
+    wall = time.perf_counter() - t0
+    print(f"시뮬레이션 {sim_s:.0f}s / 실제 {wall:.1f}s (×{sim_s / max(wall, 1e-9):.0f})")
+
+    doc = {"params": AvoidanceController(**params).params(), "seed": args.seed, "results": results}
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as fp:
+            json.dump(doc, fp, indent=2, ensure_ascii=False)
+        print(f"기준 저장: {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as fp:
+            base = json.load(fp)
+        bad = compare(results, base["results"])
+        if bad:
+            print("\n❌ 기준 대비 악화:")
+            for n, msg in bad: print(f"  {n}: {msg}")
+            sys.exit(1)
+        print("\n✅ 기준 대비 악화 없음")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+# bench_camera.py
+# JPEG 인코딩 벤치마크 (synthetic 프레임, 카메라 불필요)
+#   python bench_camera.py                      # 기본: 1280x720 / 640x480 / 320x240 × 품질 50/70/90
+#   python bench_camera.py --sizes 640x360 --qualities 40,70 --frames 200
+# 인코더(turbo / cv2) × 해상도 × 품질마다 프레임당 인코딩 시간(p50/p90)과 평균 크기, 가능한 최대 fps 출력
+
+import argparse, time
+import numpy as np
+from camera import JpegEncoder, HAS_TURBO, HAS_CV2, _SyntheticSource
+from loop_sched import LatencyHistogram
+
+def bench(encoder, frames, quality):
+    h = LatencyHistogram(); total = 0
+    for f in frames:
+        t0 = time.perf_counter()
+        buf = encoder.encode(f, quality)
+        h.record(time.perf_counter() - t0)
+        total += len(buf)
+    return h.summary(), total / len(frames)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1280x720,640x480,320x240")
+    ap.add_argument("--qualities", default="50,70,90")
+    ap.add_argument("--frames", type=int, default=100)
+    args = ap.parse_args()
+
+    kinds = [k for k, ok in (("turbo", HAS_TURBO), ("cv2", HAS_CV2)) if ok]
+    encoders = []
+    for k in kinds:
+        try: encoders.append(JpegEncoder(k))
+        except Exception as e: print(f"[bench] {k} 사용 불가: {e}")
+    if not encoders:
+        raise SystemExit("JPEG 인코더 없음 (PyTurboJPEG 또는 OpenCV 필요)")
+
+    print(f"{'enc':>5} {'size':>9} {'q':>3} {'p50 ms':>8} {'p90 ms':>8} {'KB/frame':>9} {'max fps':>8}")
+    for size in args.sizes.split(","):
+        w, h = (int(v) for v in size.lower().split("x"))
+        src = _SyntheticSource(w, h)
+        frames = [src.read() for _ in range(args.frames)]
+        # 실제 카메라처럼 노이즈를 섞어 압축이 너무 쉽지 않게 (uint8 에 바로 더하면 255→0 으로 넘어감 → 넓혀서 더하고 자름)
+        rng = np.random.default_rng(0)
+        frames = [np.clip(f.astype(np.int16) + rng.integers(0, 8, f.shape, dtype=np.int16), 0, 255).astype(np.uint8)
+                  for f in frames]
+        for q in (int(v) for v in args.qualities.split(",")):
+            for enc in encoders:
+                enc.encode(frames[0], q)   # 워밍업
+                s, avg = bench(enc, frames, q)
+                fps = 1000.0 / s["mean_ms"] if s["mean_ms"] else float("inf")
+                print(f"{enc.kind:>5} {size:>9} {q:>3} {s['p50_ms']:>8.2f} {s['p90_ms']:>8.2f} "
+                      f"{avg/1024:>9.1f} {fps:>8.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# bench_detect.py
+# 전방 장애물 감지기 벤치마크 (녹화 프레임)
+#   python bench_detect.py --video run1.mp4              # 동영상 파일
+#   python bench_detect.py --frames ./frames             # 이미지 폴더 (jpg/png, 이름순)
+#   python bench_detect.py                               # 입력 없으면 synthetic 프레임
+#   옵션: --every 3 --fps 15 --csv out.csv
+# 프레임당 감지 시간(p50/p90/max), 감지 비율, 카메라 fps·every 기준 CPU 점유율 추정 출력
+
+import argparse, glob, os, time
+import numpy as np
+from cam_detect import CenterObstacleDetector
+from camera import _SyntheticSource, HAS_CV2
+from loop_sched import LatencyHistogram
+
+def load_frames(args):
+    if args.video or args.frames:
+        if not HAS_CV2:
+            raise SystemExit("녹화 프레임을 읽으려면 OpenCV 필요")
+        import cv2
+    if args.video:
+        cap = cv2.VideoCapture(args.video); frames = []
+        while len(frames) < args.limit:
+            ok, f = cap.read()
+            if not ok: break
+            frames.append(f)
+        cap.release()
+        return frames
+    if args.frames:
+        paths = sorted(p for ext in ("jpg", "jpeg", "png") for p in glob.glob(os.path.join(args.frames, f"*.{ext}")))
+        return [cv2.imread(p) for p in paths[:args.limit]]
+    src = _SyntheticSource(640, 480)
+    return [src.read() for _ in range(min(args.limit, 300))]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--video"); ap.add_argument("--frames")
+    ap.add_argument("--limit", type=int, default=1000)
+    ap.add_argument("--every", type=int, default=3)
+    ap.add_argument("--fps", type=float, default=15.0)
+    ap.add_argument("--csv")
+    args = ap.parse_args()
+
+    frames = [f for f in load_frames(args) if f is not None]
+    if not frames:
+        raise SystemExit("프레임 없음")
+    det = CenterObstacleDetector()
+    det.detect(frames[0])   # 워밍업
+
+    h = LatencyHistogram(); rows = []
+    for i, f in enumerate(frames):
+        t0 = time.perf_counter()
+        rec = det.detect(f)
+        h.record(time.perf_counter() - t0)
+        rows.append((i, rec["score"], int(rec["obstacle"])))
+
+    s = h.summary()
+    hit = np.mean([r[2] for r in rows])
+    cpu = s["mean_ms"] / 1000.0 * args.fps / max(1, args.every)
+    print(f"frames={len(frames)} size={frames[0].shape[1]}x{frames[0].shape[0]}")
+    print(f"detect ms: mean={s['mean_ms']} p50={s['p50_ms']} p90={s['p90_ms']} max={s['max_ms']}")
+    print(f"obstacle 비율={hit:.1%}  score 평균={np.mean([r[1] for r in rows]):.3f}")
+    print(f"CPU 점유 추정 (1코어 기준, {args.fps:g}fps, {args.every}프레임마다) = {cpu:.1%}")
+    if args.csv:
+        with open(args.csv, "w") as fp:
+            fp.write("frame,score,obstacle\n")
+            fp.writelines(f"{i},{sc},{ob}\n" for i, sc, ob in rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+# broadcast.py
+# 수집 스레드(라이다/카메라 루프) → asyncio 구독자(웹소켓/스트리밍 응답) 팬아웃
+#  - publish()는 어떤 경우에도 블로킹하지 않음 (call_soon_threadsafe 로 넘기기만 함)
+#  - 구독자마다 크기 1짜리 큐 → 느린 구독자는 이전 프레임을 버리고 최신 것만 받음
+
+import asyncio, threading
+
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=1)
+        self.delivered = 0
+        self.dropped = 0
+
+    def _offer(self, item):
+        # 이벤트 루프 스레드에서만 호출됨
+        if self.queue.full():
+            try:
+                self.queue.get_nowait(); self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(item)
+
+    async def get(self):
+        item = await self.queue.get()
+        self.delivered += 1
+        return item
+
+class Broadcaster:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs = set()
+        self.latest = None
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subs)
+
+    def subscribe(self) -> Subscription:
+        """이벤트 루프 안(웹소켓 핸들러 등)에서 호출. 직전 최신 값이 있으면 바로 한 번 받음."""
+        sub = Subscription(asyncio.get_running_loop())
+        if self.latest is not None:
+            sub._offer(self.latest)
+        with self._lock:
+            self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subs.discard(sub)
+
+    def publish(self, item):
+        """아무 스레드에서나 호출 가능. 구독자 수와 관계없이 즉시 반환."""
+        self.latest = item
+        with self._lock:
+            subs = list(self._subs)
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub._offer, item)
+            except RuntimeError:   # 이벤트 루프가 이미 닫힘
+                self.unsubscribe(sub)
+
+    def subscriptions(self) -> list:
+        with self._lock:
+            return list(self._subs)
+
+    def stats(self):
+        with self._lock:
+            subs = list(self._subs)
+        return {
+            "subscribers": len(subs),
+            "delivered": sum(s.delivered for s in subs),
+            "dropped": sum(s.dropped for s in subs),
+        }
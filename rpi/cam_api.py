@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# cam_api.py
+# 카메라 스트리밍 API (main.py 가 /cam 에 마운트. 단독 실행 시 8002번 포트 /cam/…)
+#  - /mjpeg : multipart/x-mixed-replace. 프레임은 camera.py 에서 한 번만 인코딩,
+#             모든 클라이언트가 같은 bytes 를 받음 (Broadcaster 팬아웃, 느린 클라이언트는 중간 프레임 건너뜀)
+#  - /snapshot.jpg?max_width=N : 최신 프레임 한 장 (ETag/If-None-Match → 같은 프레임이면 304, 폭별 캐시)
+#  - /mjpeg?fps=N : 저속 스트림 (서버에서 프레임을 솎아 보냄 → 업링크 절약)
+#  - /detect : 전방 중앙 장애물 감지 결과 {score, bbox, obstacle, ts, seq} (cam_detect.py, CAM_DETECT=0 이면 끔)
+#  - /stats : 수집/인코딩(프레임당 ms, bytes/s)/클라이언트별 전송량 통계
+#  - 적응형 품질: ADAPT_WINDOW_S 마다 가장 느린 클라이언트의 수신 비율로 AdaptiveQuality 갱신 (CAM_ADAPT=0 이면 끔)
+#
+# 단독 실행: python cam_api.py   (CAM_SOURCE=synthetic 이면 카메라 없이 동작)
+
+import os, time
+from typing import Optional
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
+from broadcast import Broadcaster
+from camera import Camera, AdaptiveQuality, SnapshotCache, MJPEG_BOUNDARY
+from cam_detect import DetectWorker
+
+app = FastAPI()
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+
+cam = Camera.from_env()
+_bcast = Broadcaster()
+cam.add_listener(lambda f: _bcast.publish(f.part))
+snapshots = SnapshotCache(cam)
+_BOOT = f"{int(time.time()):x}"      # 재시작하면 seq 가 1부터 다시 시작 → ETag 충돌 방지
+
+# 감지 스레드 (N 프레임마다 한 장, 밀리면 버림. 대기 중에는 CPU 사용 없음)
+# 스레드는 import 때가 아니라 앱 시작(start) 때 띄움
+DETECT = os.getenv("CAM_DETECT", "1") != "0"
+detector = DetectWorker.from_env()
+if DETECT:
+    cam.add_listener(detector.offer)
+
+def start():
+    """앱 startup 에서 호출: 카메라 수집 스레드 + 감지 스레드."""
+    cam.start()
+    if DETECT:
+        detector.start()
+
+def stop():
+    """앱 shutdown 에서 호출."""
+    if DETECT:
+        detector.stop()
+    cam.stop()
+
+# 클라이언트별 전송량: Subscription → [보낸 bytes, 접속 시각(monotonic)]
+_clients = {}
+
+# ===== 적응형 품질 (수집 스레드에서 프레임마다 호출, 창이 끝날 때만 계산) =====
+ADAPT = os.getenv("CAM_ADAPT", "1") != "0"
+ADAPT_WINDOW_S = 1.0
+adapt = AdaptiveQuality(cam)
+_win = {"t": None, "encoded": 0, "delivered": {}}
+
+def _adapt_tick(_frame):
+    now = time.monotonic()
+    if _win["t"] is not None and now - _win["t"] < ADAPT_WINDOW_S:
+        return
+    subs = _bcast.subscriptions()
+    encoded = cam.counts["encoded"]
+    if _win["t"] is not None and encoded > _win["encoded"]:
+        prev = _win["delivered"]
+        # 이번 창 시작 전부터 있던 클라이언트만 비교 (새로 붙은 클라이언트는 다음 창부터)
+        ratios = [(s.delivered - prev[s]) / (encoded - _win["encoded"]) for s in subs if s in prev]
+        if ratios:
+            adapt.update(min(ratios))
+    _win.update(t=now, encoded=encoded, delivered={s: s.delivered for s in subs})
+
+if ADAPT:
+    cam.add_listener(_adapt_tick)
+
+@app.get("/mjpeg")
+async def mjpeg(fps: Optional[float] = None):
+    sub = _bcast.subscribe()
+    _clients[sub] = [0, time.monotonic()]
+    min_dt = 1.0 / fps if fps and fps > 0 else 0.0
+
+    async def parts():
+        t_next = 0.0
+        try:
+            while True:
+                part = await sub.get()
+                if min_dt:
+                    now = time.monotonic()
+                    if now < t_next: continue
+                    t_next = max(t_next + min_dt, now)
+                _clients[sub][0] += len(part)
+                yield part
+        finally:
+            _bcast.unsubscribe(sub)
+            _clients.pop(sub, None)
+
+    return StreamingResponse(parts(), media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}",
+                             headers={"Cache-Control": "no-store", "Pragma": "no-cache"})
+
+def _etag_matches(inm: str, etag: str) -> bool:
+    """If-None-Match 판정 (RFC 9110 약한 비교): "*" 이거나 목록 중 하나가 같으면 True. W/ 접두어는 무시."""
+    tags = [t.strip() for t in inm.split(",") if t.strip()]
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+
+@app.get("/snapshot.jpg")
+def snapshot(request: Request, max_width: Optional[int] = None):
+    # 동기 핸들러 → 축소/인코딩은 스레드풀에서 (이벤트 루프를 붙잡지 않음)
+    got = snapshots.get(max_width)
+    if got is None:
+        return Response(status_code=503, headers={"Retry-After": "1"})
+    seq, width, jpeg = got
+    etag = f'"{_BOOT}-{seq}-{width}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=jpeg, media_type="image/jpeg", headers=headers)
+
+@app.get("/detect")
+def detect():
+    # 대시보드가 자주 폴링 → 마지막 결과 dict 를 그대로 반환 (계산은 감지 스레드에서 이미 끝남)
+    if not DETECT:
+        return {"enabled": False}
+    rec = detector.latest
+    # age_s 는 Pi 시계 기준 → 대시보드와 시계가 안 맞아도(RTC/NTP 없음) 신선도 판정 가능
+    age = round(time.time() - rec["ts"], 3) if rec.get("ts") is not None else None
+    return {"enabled": True, **rec, "age_s": age}
+
+@app.get("/stats")
+def stats():
+    now = time.monotonic()
+    clients = [{"bytes_per_s": round(b / max(1e-3, now - t0), 1), "frames": s.delivered, "skipped": s.dropped}
+               for s, (b, t0) in list(_clients.items())]
+    return {**cam.stats(), "stream": _bcast.stats(), "clients": clients,
+            "adapt": adapt.state() if ADAPT else None, "snapshot": dict(snapshots.counts),
+            "detect": detector.stats() if DETECT else None}
+
+if __name__ == "__main__":
+    import uvicorn
+    # 대시보드는 {CAM_API_BASE}/cam/mjpeg 로 접속 → main.py 와 같은 경로가 되도록 /cam 아래에 마운트
+    root = FastAPI()
+    root.mount("/cam", app)
+    root.add_event_handler("startup", start)
+    root.add_event_handler("shutdown", stop)
+    uvicorn.run(root, host="0.0.0.0", port=8002)
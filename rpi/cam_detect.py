@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# cam_detect.py
+# 카메라 전방 중앙 장애물 감지 (CPU 전용, cam_api.py 의 /detect 로 공개)
+#  - 중앙 ROI 만 정수 간격으로 솎아냄(복사 없는 슬라이스) → 약 64×48 픽셀에서만 계산
+#  - 판정: ROI 대표 색(중앙값, 보통 물)과의 색 차이 + 밝기 기울기 → 마스크 → 셀(8×8) 단위 점유율
+#    score = 점유 셀 비율, bbox = 점유 셀 외곽 (전체 프레임 기준 0~1 정규화 좌표)
+#  - DetectWorker: 카메라 리스너는 N 프레임마다 최신 프레임 참조만 넘기고, 계산은 별도 스레드에서
+#    (밀린 프레임은 버림 → 카메라/제어 루프를 붙잡지 않음)
+
+import os, time, threading
+import numpy as np
+from loop_sched import LatencyHistogram
+
+class CenterObstacleDetector:
+    def __init__(self, roi=(0.30, 0.25, 0.70, 0.85), target_w=64, cell=8,
+                 color_thr=40.0, edge_thr=28.0, cell_frac=0.35, score_thr=0.08):
+        """
+        roi       : (x0, y0, x1, y1) 프레임 비율. 기본은 가로 가운데 40%, 세로 25~85%
+        target_w  : ROI 를 솎아낸 뒤 폭 (대략)
+        color_thr : ROI 중앙값 색과의 BGR 거리 임계
+        edge_thr  : 밝기 기울기 임계
+        cell_frac : 셀 안 마스크 비율이 이 이상이면 점유 셀
+        score_thr : score 가 이 이상이면 obstacle=True
+        """
+        self.roi = roi; self.target_w = int(target_w); self.cell = int(cell)
+        self.color_thr = float(color_thr); self.edge_thr = float(edge_thr)
+        self.cell_frac = float(cell_frac); self.score_thr = float(score_thr)
+
+    def _roi_view(self, frame):
+        h, w = frame.shape[:2]
+        x0, y0, x1, y1 = (int(self.roi[0]*w), int(self.roi[1]*h), int(self.roi[2]*w), int(self.roi[3]*h))
+        step = max(1, (x1 - x0) // self.target_w)
+        return frame[y0:y1:step, x0:x1:step], (x0, y0, step, w, h)
+
+    def detect(self, frame) -> dict:
+        """frame: BGR uint8 (H, W, 3) → {score, bbox, obstacle}"""
+        small, (x0, y0, step, w, h) = self._roi_view(frame)
+        px = small.astype(np.float32)
+        ref = np.median(px.reshape(-1, 3), axis=0)
+        color = np.sqrt(((px - ref) ** 2).sum(axis=-1))
+        gray = px.mean(axis=-1)
+        grad = np.zeros_like(gray)
+        grad[:, 1:] = np.abs(np.diff(gray, axis=1))
+        grad[1:, :] = np.maximum(grad[1:, :], np.abs(np.diff(gray, axis=0)))
+        mask = (color > self.color_thr) | (grad > self.edge_thr)
+
+        # 셀 단위 점유 (잡음 한두 픽셀은 셀 비율에서 걸러짐)
+        c = self.cell
+        gh, gw = mask.shape[0] // c, mask.shape[1] // c
+        if gh == 0 or gw == 0:
+            return {"score": 0.0, "bbox": None, "obstacle": False}
+        occ = mask[:gh*c, :gw*c].reshape(gh, c, gw, c).mean(axis=(1, 3)) >= self.cell_frac
+        score = float(occ.mean())
+        bbox = None
+        if occ.any():
+            rows = np.flatnonzero(occ.any(axis=1)); cols = np.flatnonzero(occ.any(axis=0))
+            bx0 = x0 + cols[0]*c*step;  bx1 = x0 + (cols[-1] + 1)*c*step
+            by0 = y0 + rows[0]*c*step;  by1 = y0 + (rows[-1] + 1)*c*step
+            bbox = [round(bx0 / w, 3), round(by0 / h, 3), round(min(bx1, w) / w, 3), round(min(by1, h) / h, 3)]
+        return {"score": round(score, 3), "bbox": bbox, "obstacle": score >= self.score_thr}
+
+class DetectWorker:
+    """camera.add_listener(worker.offer) 로 연결. N 프레임마다 한 장만 감지 스레드로 넘김 (N = CAM_DETECT_EVERY).
+    스레드는 앱 시작/종료 때 start()/stop()."""
+    def __init__(self, detector=None, every: int = 3):
+        self.detector = detector or CenterObstacleDetector()
+        self.every = max(1, int(every))
+        self.latest = {"score": 0.0, "bbox": None, "obstacle": False, "ts": None, "seq": 0}
+        self.latency = LatencyHistogram()
+        self.counts = {"offered": 0, "processed": 0, "skipped": 0}
+        self._cv = threading.Condition()
+        self._pending = None
+        self._stop = False
+        self._th = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(every=int(os.getenv("CAM_DETECT_EVERY", "3")))
+
+    def start(self):
+        if self._th is not None and self._th.is_alive():
+            return self
+        self._stop = False
+        self._th = threading.Thread(target=self._run, name="cam-detect", daemon=True)
+        self._th.start()
+        return self
+
+    def stop(self, timeout: float = 1.0):
+        with self._cv:
+            self._stop = True
+            self._cv.notify()
+        if self._th is not None:
+            self._th.join(timeout); self._th = None
+
+    def offer(self, f):
+        """카메라 수집 스레드에서 호출. 참조만 넘기고 바로 반환."""
+        self.counts["offered"] += 1
+        if f.seq % self.every:
+            return
+        with self._cv:
+            if self._pending is not None:
+                self.counts["skipped"] += 1
+            self._pending = f
+            self._cv.notify()
+
+    def _run(self):
+        while True:
+            with self._cv:
+                self._cv.wait_for(lambda: self._pending is not None or self._stop)
+                if self._stop:
+                    return
+                f, self._pending = self._pending, None
+            t0 = time.perf_counter()
+            try:
+                rec = self.detector.detect(f.raw)
+            except Exception as e:
+                print(f"[cam_detect] 감지 오류: {e}")
+                continue
+            self.latency.record(time.perf_counter() - t0)
+            self.counts["processed"] += 1
+            rec.update(ts=f.ts, seq=f.seq)
+            self.latest = rec              # 참조 교체만 → 읽는 쪽은 락 불필요
+
+    def stats(self) -> dict:
+        return {"every": self.every, "counts": dict(self.counts), "latency": self.latency.summary()}
@@ -1,20 +1,359 @@
-import cv2
+# -*- coding: utf-8 -*-
+# camera.py
+# 카메라 수집 + JPEG 인코딩 (cam_api.py 가 사용)
+#  - 수집 스레드 1개: 프레임 읽기 → JPEG 인코딩 1번 → 최신 프레임(CamFrame) 교체 → 리스너 호출
+#    (뷰어가 몇 명이든 인코딩은 프레임당 한 번. MJPEG 파트 바이트도 여기서 한 번만 만듦)
+#  - 소스: 카메라 장치 번호("0") / 동영상 파일 경로(끝나면 처음부터 반복) / "synthetic"(카메라 없이 테스트)
+#  - 설정(환경변수): CAM_SOURCE, CAM_WIDTH, CAM_HEIGHT, CAM_FPS, CAM_QUALITY, CAM_ENCODER(auto/turbo/cv2)
+#    대시보드는 360px 높이 박스에 띄우므로 센서 최대 해상도가 아니라 CAM_WIDTH×CAM_HEIGHT 로 캡처
+#  - 인코더: TurboJPEG(libjpeg-turbo SIMD)가 있으면 사용, 없으면 OpenCV
+#  - AdaptiveQuality: 클라이언트가 프레임을 못 따라오면 품질 → 해상도 순으로 낮추고, 여유가 생기면 되돌림
+#
+# 단독 실행: python camera.py → 미리보기 창 (q 로 종료)
 
-cap = cv2.VideoCapture(0)  
-if not cap.isOpened():
-    print("camera not open")
-    exit()
+import os, time, threading
+import numpy as np
+from loop_sched import LatencyHistogram, LoopScheduler
 
-while True:
-    ret, frame = cap.read()
-    if not ret:
-        print("frame not loading")
-        break
+try:
+    import cv2
+    HAS_CV2 = True
+except Exception:
+    HAS_CV2 = False
 
-    cv2.imshow('Camera', frame)
+try:
+    from turbojpeg import TurboJPEG
+    HAS_TURBO = True
+except Exception:
+    HAS_TURBO = False
 
-    if cv2.waitKey(1) & 0xFF == ord('q'):  # q
-        break
+MJPEG_BOUNDARY = "frame"
 
-cap.release()
-cv2.destroyAllWindows()
+class CamFrame:
+    __slots__ = ("seq", "ts", "raw", "jpeg", "width", "part")
+
+    def __init__(self, seq, ts, raw, jpeg, width=None):
+        self.seq = seq; self.ts = ts
+        self.raw = raw                     # BGR uint8 (H, W, 3) — 인코딩 전 원본 (읽기 전용으로 취급)
+        self.jpeg = jpeg
+        self.width = raw.shape[1] if width is None else width   # jpeg 의 실제 폭 (scale 적용 후)
+        # multipart/x-mixed-replace 한 파트 (모든 /mjpeg 클라이언트가 같은 bytes 를 그대로 보냄)
+        self.part = b"".join((
+            f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\nContent-Length: {len(jpeg)}\r\n\r\n".encode(),
+            jpeg, b"\r\n"))
+
+# ===== 프레임 소스 =====
+class _SyntheticSource:
+    """카메라 없이 돌려보기 위한 가짜 영상 (움직이는 그라디언트 + 사각형 + 시각)."""
+    live = False
+
+    def __init__(self, width, height):
+        self.w, self.h = width, height
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+        self._bg = np.stack([np.broadcast_to(x, (height, width)),
+                             np.broadcast_to(y, (height, width)),
+                             np.full((height, width), 96, np.float32)], axis=-1).astype(np.uint8)
+        self._buf = np.empty_like(self._bg)
+        self._n = 0
+
+    def read(self):
+        self._n += 1
+        shift = (self._n * 4) % self.w
+        np.copyto(self._buf[:, :self.w - shift], self._bg[:, shift:])
+        np.copyto(self._buf[:, self.w - shift:], self._bg[:, :shift])
+        s = max(8, self.h // 6)
+        cx = int((self.w - s) * (0.5 + 0.4 * np.sin(self._n * 0.05)))
+        cy = (self.h - s) // 2
+        self._buf[cy:cy + s, cx:cx + s] = (30, 30, 220)
+        if HAS_CV2:
+            cv2.putText(self._buf, time.strftime("%H:%M:%S") + f" #{self._n}", (10, self.h - 12),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1, cv2.LINE_AA)
+        return self._buf.copy()
+
+    def release(self):
+        pass
+
+class _CvSource:
+    """cv2.VideoCapture (장치 번호 또는 동영상 파일). 파일은 끝나면 처음으로 되감음."""
+    def __init__(self, spec, width, height, fps):
+        self.live = spec.isdigit()
+        self.cap = cv2.VideoCapture(int(spec) if self.live else spec)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"카메라/영상 열기 실패: {spec}")
+        if self.live:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            self.cap.set(cv2.CAP_PROP_FPS, fps)
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)   # 밀린 프레임 대신 최신 프레임
+        self.size = (width, height)
+
+    def read(self):
+        ok, frame = self.cap.read()
+        if not ok and not self.live:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self.cap.read()
+        if not ok:
+            return None
+        return resize(frame, *self.size)     # 장치가 요청 해상도를 무시한 경우
+
+    def release(self):
+        self.cap.release()
+
+def open_source(spec, width, height, fps):
+    if spec == "synthetic" or not HAS_CV2:
+        if spec != "synthetic":
+            print("⚠️ [camera] OpenCV 없음 → synthetic 소스로 동작")
+        return _SyntheticSource(width, height)
+    try:
+        return _CvSource(spec, width, height, fps)
+    except RuntimeError as e:
+        print(f"⚠️ [camera] {e} → synthetic 소스로 동작")
+        return _SyntheticSource(width, height)
+
+# ===== JPEG 인코더 =====
+class JpegEncoder:
+    """encode(BGR 프레임, 품질) → bytes. kind: auto(turbo 우선) / turbo / cv2"""
+    def __init__(self, kind="auto"):
+        self.kind = None
+        if kind in ("auto", "turbo") and HAS_TURBO:
+            try:
+                self._tj = TurboJPEG()
+                self.kind = "turbo"
+            except Exception as e:             # 파이썬 모듈은 있는데 libturbojpeg 가 없는 경우
+                if kind == "turbo":
+                    raise
+                print(f"⚠️ [camera] TurboJPEG 초기화 실패 → OpenCV 인코더 ({e})")
+        if self.kind is None:
+            if kind == "turbo":
+                raise RuntimeError("TurboJPEG(PyTurboJPEG) 가 없습니다")
+            if not HAS_CV2:
+                raise RuntimeError("JPEG 인코더가 없습니다 (PyTurboJPEG 또는 OpenCV 필요)")
+            self.kind = "cv2"
+
+    def encode(self, frame, quality):
+        if self.kind == "turbo":
+            return self._tj.encode(frame, quality=int(quality))
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+        return buf.tobytes() if ok else None
+
+def resize(frame, width, height):
+    """축소는 INTER_AREA (OpenCV 없으면 정수 간격 솎아내기)."""
+    if (frame.shape[1], frame.shape[0]) == (width, height):
+        return frame
+    if HAS_CV2:
+        return cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+    ys = (np.arange(height) * frame.shape[0] // height)
+    xs = (np.arange(width) * frame.shape[1] // width)
+    return frame[ys[:, None], xs]
+
+# ===== 적응형 품질/해상도 =====
+class AdaptiveQuality:
+    """
+    주기적으로(cam_api: 1초마다) update(ratio) — ratio = 가장 느린 클라이언트가 실제로 받은 프레임 / 인코딩한 프레임.
+    ratio < low 이면 한 단계 내림 (품질을 q_min 까지 q_step 씩 → 그다음 해상도 scales 순서대로)
+    ratio ≥ high 가 up_after 번 연속이면 한 단계 올림 (해상도 먼저 → 품질)
+    """
+    def __init__(self, cam, q_min=35, q_step=10, scales=(1.0, 0.75, 0.5),
+                 low=0.80, high=0.95, up_after=3):
+        self.cam = cam
+        self.q_max = cam.quality; self.q_min = min(q_min, cam.quality); self.q_step = q_step
+        self.scales = tuple(scales); self.level = 0     # scales 인덱스
+        self.low, self.high, self.up_after = low, high, up_after
+        self._good = 0
+        self.changes = 0
+
+    def update(self, ratio):
+        cam = self.cam
+        if ratio < self.low:
+            self._good = 0
+            if cam.quality > self.q_min:
+                cam.quality = max(self.q_min, cam.quality - self.q_step)
+            elif self.level + 1 < len(self.scales):
+                self.level += 1; cam.scale = self.scales[self.level]
+            else:
+                return
+        elif ratio >= self.high:
+            self._good += 1
+            if self._good < self.up_after:
+                return
+            self._good = 0
+            if self.level > 0:
+                self.level -= 1; cam.scale = self.scales[self.level]
+            elif cam.quality < self.q_max:
+                cam.quality = min(self.q_max, cam.quality + self.q_step)
+            else:
+                return
+        else:
+            self._good = 0
+            return
+        self.changes += 1
+
+    def state(self) -> dict:
+        return {"quality": self.cam.quality, "scale": self.cam.scale, "changes": self.changes}
+
+# ===== 스냅샷 (폭별 캐시) =====
+class SnapshotCache:
+    """
+    최신 프레임을 요청 폭으로 줄인 JPEG. 폭마다 프레임당 한 번만 인코딩 (원본 raw 에서 축소).
+    프레임(seq)이 바뀌면 캐시를 비움. 폭은 16px 단위로 내림 → 클라이언트마다 폭이 조금씩 달라도 캐시 공유.
+    """
+    def __init__(self, cam):
+        self.cam = cam
+        self._lock = threading.Lock()
+        self._seq = None
+        self._by_width = {}
+        self.counts = {"hits": 0, "encodes": 0}
+
+    def get(self, max_width=None):
+        """→ (seq, width, jpeg) / 프레임이 아직 없으면 None"""
+        f = self.cam.latest
+        if f is None:
+            return None
+        h, w = f.raw.shape[:2]
+        width = w if not max_width else max(32, min(w, int(max_width)) // 16 * 16)
+        if width == f.width:                  # 스트림용으로 이미 인코딩한 것과 같은 크기
+            self.counts["hits"] += 1
+            return f.seq, width, f.jpeg
+        with self._lock:
+            if self._seq != f.seq:
+                self._seq = f.seq; self._by_width = {}
+            jpeg = self._by_width.get(width)
+            if jpeg is None:
+                height = max(2, int(round(h * width / w)) & ~1)
+                jpeg = self.cam.encoder.encode(resize(f.raw, width, height), self.cam.quality)
+                self._by_width[width] = jpeg
+                self.counts["encodes"] += 1
+            else:
+                self.counts["hits"] += 1
+        return f.seq, width, jpeg
+
+# ===== 카메라 =====
+class Camera:
+    def __init__(self, source="0", width=640, height=480, fps=15, quality=70, encoder="auto"):
+        self.source = str(source)
+        self.width, self.height = int(width), int(height)
+        self.fps = float(fps); self.quality = int(quality)
+        self.scale = 1.0                   # 인코딩 해상도 배율 (AdaptiveQuality 가 조정)
+        self.encoder_kind = encoder
+        self.encoder = None
+        self.latest = None                 # 마지막 CamFrame (참조 교체만 하므로 락 없이 읽어도 됨)
+        self._listeners = []
+        self._stop = threading.Event()
+        self._th = None
+        self._seq = 0
+        self.encode_time = LatencyHistogram()
+        self.counts = {"captured": 0, "encoded": 0, "read_fail": 0, "encode_fail": 0, "bytes": 0}
+        self.last_encode_ms = 0.0
+        self.bytes_per_s = 0.0             # 인코딩 출력 bytes/s (EMA)
+        self._t_last = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(source=os.getenv("CAM_SOURCE", "0"),
+                   width=int(os.getenv("CAM_WIDTH", "640")),
+                   height=int(os.getenv("CAM_HEIGHT", "480")),
+                   fps=float(os.getenv("CAM_FPS", "15")),
+                   quality=int(os.getenv("CAM_QUALITY", "70")),
+                   encoder=os.getenv("CAM_ENCODER", "auto"))
+
+    def add_listener(self, fn):
+        """fn(CamFrame) 을 새 프레임마다 수집 스레드에서 호출 (블로킹 금지 — Broadcaster.publish 처럼)."""
+        self._listeners.append(fn)
+
+    @property
+    def running(self) -> bool:
+        return self._th is not None and self._th.is_alive()
+
+    def start(self):
+        if self.running:
+            return self
+        if self.encoder is None:
+            self.encoder = JpegEncoder(self.encoder_kind)
+        self._stop.clear()
+        self._th = threading.Thread(target=self._run, name="camera", daemon=True)
+        self._th.start()
+        return self
+
+    def stop(self, timeout: float = 1.0):
+        self._stop.set()
+        if self._th is not None:
+            self._th.join(timeout)
+            self._th = None
+
+    def out_size(self):
+        s = self.scale
+        return (max(16, int(self.width * s)) & ~1, max(16, int(self.height * s)) & ~1)
+
+    def encode(self, frame, size=None):
+        """size(기본: 현재 scale 적용 크기)/현재 quality 로 인코딩 (원본 프레임은 그대로 둠)."""
+        return self.encoder.encode(resize(frame, *(size or self.out_size())), self.quality)
+
+    def _account(self, nbytes, seconds):
+        self.last_encode_ms = seconds * 1000.0
+        self.encode_time.record(seconds)
+        self.counts["encoded"] += 1; self.counts["bytes"] += nbytes
+        now = time.monotonic()
+        if self._t_last is not None:
+            dt = max(1e-3, now - self._t_last)
+            self.bytes_per_s += 0.1 * (nbytes / dt - self.bytes_per_s)
+        self._t_last = now
+
+    def _run(self):
+        src = open_source(self.source, self.width, self.height, self.fps)
+        # 장치는 자기 속도로 프레임을 줌. 파일/synthetic 은 목표 FPS 로 맞춤
+        sched = None if src.live else LoopScheduler(self.fps)
+        print(f"✅ [camera] {self.source} {self.width}x{self.height} @{self.fps:g}fps q={self.quality} ({self.encoder.kind})")
+        try:
+            while not self._stop.is_set():
+                if sched: sched.wait()
+                frame = src.read()
+                if frame is None:
+                    self.counts["read_fail"] += 1
+                    time.sleep(0.05); continue
+                self.counts["captured"] += 1
+                t0 = time.perf_counter()
+                size = self.out_size()
+                jpeg = self.encode(frame, size)
+                if jpeg is None:
+                    self.counts["encode_fail"] += 1; continue
+                self._account(len(jpeg), time.perf_counter() - t0)
+                self._seq += 1
+                f = self.latest = CamFrame(self._seq, time.time(), frame, jpeg, size[0])
+                for fn in self._listeners:
+                    try: fn(f)
+                    except Exception as e: print(f"[camera] 리스너 오류: {e}")
+        finally:
+            src.release()
+
+    def stats(self) -> dict:
+        f = self.latest
+        return {
+            "running": self.running,
+            "source": self.source,
+            "size": [self.width, self.height], "fps_target": self.fps,
+            "encoder": self.encoder.kind if self.encoder else None,
+            "quality": self.quality, "scale": self.scale, "out_size": list(self.out_size()),
+            "last_encode_ms": round(self.last_encode_ms, 3),
+            "bytes_per_s": round(self.bytes_per_s, 1),
+            "seq": f.seq if f else 0,
+            "age_s": round(time.time() - f.ts, 3) if f else None,
+            "jpeg_bytes": len(f.jpeg) if f else 0,
+            "counts": dict(self.counts),
+            "encode": self.encode_time.summary(),
+        }
+
+if __name__ == "__main__":
+    cam = Camera.from_env().start()
+    last = 0
+    try:
+        while True:
+            f = cam.latest
+            if f is not None and f.seq != last:
+                last = f.seq
+                cv2.imshow("Camera", f.raw)
+            if cv2.waitKey(10) & 0xFF == ord('q'):  # q
+                break
+    finally:
+        cam.stop()
+        cv2.destroyAllWindows()
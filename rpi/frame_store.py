@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+# frame_store.py
+# 최신 LiDAR 프레임 보관소 (lidar_server / avoidance_control 공용)
+#  - 쓰기: 미리 잡아둔 슬롯(링, 기본 3개)에 복사한 뒤 self._current 참조만 교체 → 락 없음
+#  - 읽기: latest()로 참조만 가져감. 직렬화 도중 슬롯이 재사용됐는지는 세대(gen) 번호로 확인
+#  - 쓰는 쪽은 스레드 1개(수집 루프)라고 가정
+
+import time
+import numpy as np
+
+class Frame:
+    __slots__ = ("gen", "ts", "t_mono", "angles", "ranges", "meta", "slot", "read")
+
+    def __init__(self, gen, ts, t_mono, angles, ranges, meta, slot):
+        self.gen = gen; self.ts = ts; self.t_mono = t_mono
+        self.angles = angles; self.ranges = ranges
+        self.meta = meta; self.slot = slot
+        self.read = False
+
+    def age(self) -> float:
+        return time.monotonic() - self.t_mono
+
+class FrameStore:
+    def __init__(self, capacity: int = 1024, depth: int = 3, **meta):
+        self.depth = max(2, int(depth))
+        self._slots = [(np.empty(capacity, np.float32), np.empty(capacity, np.float32))
+                       for _ in range(self.depth)]
+        self._slot_gen = [0]*self.depth     # 슬롯별 현재 세대 (쓰는 중이면 -gen)
+        self._gen = 0
+        self.published = 0
+        self.dropped = 0                    # 아무도 읽기 전에 다음 프레임으로 덮인 수
+        self._interval_ema = 0.0
+        self._current = Frame(0, 0.0, time.monotonic(),
+                              self._slots[0][0][:0], self._slots[0][1][:0], dict(meta), 0)
+
+    # ----- 쓰기 (수집 루프 1개) -----
+    def publish(self, angles, ranges, ts=None, **meta) -> Frame:
+        gen = self._gen + 1
+        i = gen % self.depth
+        n = int(min(np.size(angles), np.size(ranges)))
+        a, r = self._slots[i]
+        if n > a.size:
+            a = np.empty(max(n, 2*a.size), np.float32); r = np.empty_like(a)
+            self._slots[i] = (a, r)
+        self._slot_gen[i] = -gen            # 복사 중 표시 → 이 슬롯을 보던 리더는 무효 처리
+        np.copyto(a[:n], np.asarray(angles)[:n], casting="unsafe")
+        np.copyto(r[:n], np.asarray(ranges)[:n], casting="unsafe")
+        now = time.monotonic()
+        prev = self._current
+        frame = Frame(gen, time.time() if ts is None else ts, now,
+                      a[:n], r[:n], {**prev.meta, **meta}, i)
+        self._slot_gen[i] = gen
+        self._current = frame               # 참조 교체 = 발행 (GIL 하에서 원자적)
+        self._gen = gen
+
+        self.published += 1
+        if prev.gen and not prev.read:
+            self.dropped += 1
+        if prev.gen:
+            dt = now - prev.t_mono
+            self._interval_ema = dt if not self._interval_ema else 0.9*self._interval_ema + 0.1*dt
+        return frame
+
+    # ----- 읽기 (몇 개든, 블로킹 없음) -----
+    @property
+    def generation(self) -> int:
+        return self._gen
+
+    def latest(self) -> Frame:
+        f = self._current
+        f.read = True
+        return f
+
+    def is_valid(self, frame: Frame) -> bool:
+        """frame 의 배열이 아직 덮어써지지 않았는지 (읽은 뒤에 확인해야 의미가 있음)."""
+        return self._slot_gen[frame.slot] == frame.gen
+
+    def read(self, fn, retries: int = 3):
+        """fn(frame) 결과(리스트/bytes 등 분리된 값)를 돌려줌. 도중에 슬롯이 재사용되면 다시 시도."""
+        for _ in range(retries):
+            f = self.latest()
+            out = fn(f)
+            if f.gen == 0 or self.is_valid(f):
+                return out
+        return fn(self.snapshot())
+
+    def snapshot(self) -> Frame:
+        """배열을 복사한 독립 Frame (오래 보관할 때)."""
+        while True:
+            f = self.latest()
+            a, r = f.angles.copy(), f.ranges.copy()
+            if f.gen == 0 or self.is_valid(f):
+                out = Frame(f.gen, f.ts, f.t_mono, a, r, dict(f.meta), f.slot)
+                out.read = True
+                return out
+
+    def reader(self) -> "FrameReader":
+        return FrameReader(self)
+
+    def stats(self) -> dict:
+        f = self._current
+        return {
+            "generation": self._gen,
+            "published": self.published,
+            "dropped": self.dropped,
+            "age_s": round(f.age(), 4) if f.gen else None,
+            "rate_hz": round(1.0/self._interval_ema, 2) if self._interval_ema > 0 else 0.0,
+        }
+
+class FrameReader:
+    """리더별 커서. poll()은 새 프레임이 있을 때만 돌려주고, 건너뛴 세대 수를 셉니다."""
+    def __init__(self, store: FrameStore):
+        self.store = store
+        self.last_gen = 0
+        self.skipped = 0
+
+    def poll(self):
+        f = self.store.latest()
+        if f.gen == self.last_gen:
+            return None
+        if self.last_gen:
+            self.skipped += max(0, f.gen - self.last_gen - 1)
+        self.last_gen = f.gen
+        return f
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# lidar_acq.py
+# LiDAR 수집 전용 프로세스: 시리얼 포트(CYdLidar)를 혼자 열고 스캔을 공유 메모리 버스(scan_bus)에 씀
+#   python3 lidar_acq.py          ← 먼저 실행
+#   LIDAR_BUS=eco_lidar_bus python3 avoidance_control.py
+#   LIDAR_BUS=eco_lidar_bus python3 lidar_server.py
+# 제어 루프와 HTTP 서버가 같은 포트를 두 번 열지 않고, HTTP 부하가 제어 루프에 영향을 주지 않음
+
+import os, time, importlib
+from scan_bus import ScanBus, BUS_NAME
+from scan_convert import ScanConverter
+
+LIDAR_PORT = os.getenv("LIDAR_PORT", "/dev/ttyUSB0")
+BAUDRATE   = int(os.getenv("LIDAR_BAUD", "128000"))
+
+def open_lidar(ydlidar, port, baud):
+    ydlidar.os_init()
+    L = ydlidar.CYdLidar()
+    L.setlidaropt(ydlidar.LidarPropLidarType, ydlidar.TYPE_TRIANGLE)
+    L.setlidaropt(ydlidar.LidarPropSerialPort, port)
+    L.setlidaropt(ydlidar.LidarPropSerialBaudrate, baud)
+    L.setlidaropt(ydlidar.LidarPropDeviceType, ydlidar.YDLIDAR_TYPE_SERIAL)
+    L.setlidaropt(ydlidar.LidarPropAutoReconnect, True)
+    L.setlidaropt(ydlidar.LidarPropFixedResolution, True)
+    if hasattr(ydlidar, "LidarPropSupportMotorDtrCtrl"):
+        L.setlidaropt(ydlidar.LidarPropSupportMotorDtrCtrl, True)
+    if not (L.initialize() and L.turnOn()):
+        return None
+    return L
+
+def main():
+    ydlidar = importlib.import_module("ydlidar")
+    L = open_lidar(ydlidar, LIDAR_PORT, BAUDRATE)
+    if L is None:
+        print("❌ [lidar_acq] LiDAR 초기화 실패"); raise SystemExit(1)
+
+    bus = ScanBus.create(BUS_NAME)
+    print(f"✅ [lidar_acq] {LIDAR_PORT}@{BAUDRATE} → 공유 메모리 '{BUS_NAME}' ({bus.nslots}슬롯)")
+
+    # 버스에는 센서 원본 순서 그대로(라디안, 무효점 포함) 기록 → 리더가 용도에 맞게 거름
+    conv = ScanConverter(degrees=False, drop_invalid=False, capacity=bus.capacity)
+    scan = ydlidar.LaserScan()
+    try:
+        while True:
+            if L.doProcessSimple(scan):
+                ang, rng = conv.convert(scan)
+                bus.write(ang, rng)
+            else:
+                time.sleep(0.01)
+    except KeyboardInterrupt:
+        print("\n🛑 [lidar_acq] 종료")
+    finally:
+        try: L.turnOff(); L.disconnecting()
+        except Exception: pass
+        bus.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,25 @@
-import os, math, time, threading
+import os, time, struct
 import numpy as np
-from fastapi import FastAPI
+from broadcast import Broadcaster
+from scan_convert import ScanConverter
+from frame_store import FrameStore
+from scan_bus import ScanBus, BusReader
+from scan_log import ScanRecorder, ScanReplay
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response
 
-try:
-    import ydlidar
+if os.getenv("BOAT_SIM"):
+    # 풀장 시뮬레이터(pool_sim.py)를 ydlidar 자리에 꽂음 — 보트는 내장 자동조종으로 돌아다님
+    from pool_sim import PoolSim
+    ydlidar = PoolSim.from_env().ydlidar(realtime=True, autopilot=True)
     HAS_LIDAR = True
-except Exception:
-    HAS_LIDAR = False
+else:
+    try:
+        import ydlidar
+        HAS_LIDAR = True
+    except Exception:
+        HAS_LIDAR = False
 
 app = FastAPI()
 app.add_middleware(
@@ -17,25 +28,87 @@ app.add_middleware(
     allow_methods=["*"], allow_headers=["*"],
 )
 
-_lock = threading.Lock()
-# 라이다 "각도(도), 거리(m)" 를 보관
-_latest = {"ts": 0.0, "angles": [], "ranges": [], "source": "sim"}
+# 라이다 "각도(도), 거리(m)" 최신 프레임 (float32, 락 없는 링 버퍼 — frame_store.py)
+_store = FrameStore(capacity=1024, source="sim")
+
+# /lidar/latest.bin 프레임 형식 (little-endian)
+#   헤더: magic(4s)="LDR1", seq(uint32), ts(float64), n(uint32)  → 20바이트
+#   본문: angles float32[n] (도), ranges float32[n] (m)
+# 클라이언트는 np.frombuffer(buf, "<f4", count=n, offset=20) 로 복사 없이 읽을 수 있음
+BIN_MAGIC = b"LDR1"
+BIN_HDR = struct.Struct("<4sIdI")
+
+# /lidar/stream 구독자 팬아웃 (스캔마다 한 번 패킹 → 모든 구독자에게 같은 bytes 전달)
+_bcast = Broadcaster()
+
+# 기록/재생 (scan_log.py)
+#   LIDAR_RECORD=폴더        : 내보내는 스캔을 모두 기록
+#   LIDAR_REPLAY=폴더        : 센서/시뮬레이터 대신 기록을 반복 재생 (LIDAR_REPLAY_SPEED 배속, 기본 1)
+RECORD_PATH  = os.getenv("LIDAR_RECORD")
+REPLAY_PATH  = os.getenv("LIDAR_REPLAY")
+REPLAY_SPEED = float(os.getenv("LIDAR_REPLAY_SPEED", "1.0"))
+_recorder = None
+
+def _publish(ang_deg, rng, source, ts=None):
+    # 스토어가 자기 슬롯으로 복사하므로 호출 쪽 버퍼는 바로 재사용해도 됨
+    f = _store.publish(ang_deg, rng, ts=ts, source=source)
+    if _recorder is not None:
+        _recorder.write(np.radians(f.angles), f.ranges, ts=f.ts)
+    if _bcast.has_subscribers:
+        _bcast.publish(pack_frame(f.gen & 0xFFFFFFFF, f.ts, f.angles, f.ranges))
+    else:
+        # /lidar/stream 구독자가 없으면 묶지 않음. 새 구독자가 오래된 프레임을 먼저 받지 않도록 latest 도 비움
+        _bcast.latest = None
+
+def pack_frame(seq, ts, ang_deg, rng):
+    """헤더 + float32 각도/거리 배열을 하나의 bytes로 묶습니다."""
+    n = int(min(ang_deg.size, rng.size))
+    return b"".join((BIN_HDR.pack(BIN_MAGIC, seq, ts, n),
+                     ang_deg[:n].astype("<f4", copy=False).tobytes(),
+                     rng[:n].astype("<f4", copy=False).tobytes()))
 
 def _sim_loop():
     ang = np.arange(720, dtype=float)  # 0.5도 간격
     while True:
         t = time.time()
         rng = 6.0 + 1.5*np.sin(np.deg2rad(ang*0.5) + t*0.6)
-        with _lock:
-            _latest["ts"] = t
-            _latest["angles"] = (ang*0.5).tolist()
-            _latest["ranges"] = rng.astype(float).tolist()
-            _latest["source"] = "sim"
+        _publish(ang*0.5, rng, "sim", ts=t)
         time.sleep(0.05)
 
+def _replay_loop(path, speed):
+    # 기록 시각 간격을 speed 배로 줄여 재생, 끝나면 처음부터. ts 는 지금 시각으로 (대시보드에는 라이브처럼 보임)
+    rp = ScanReplay(path, speed=speed if speed > 0 else 1.0, loop=True)
+    print(f"[lidar_server] 기록 재생: {path} ({len(rp.log)}스캔, {rp.log.duration:.1f}s, ×{rp.speed:g})")
+    name = f"replay:{os.path.basename(os.path.normpath(path))}"
+    for _, ang, rng in rp:
+        keep = rng > 0
+        _publish(np.degrees(ang[keep]), rng[keep], name, ts=time.time())
+    print("[lidar_server] 기록이 비어 있음 → 시뮬레이터로 동작")
+    _sim_loop()
+
+def _bus_loop(name):
+    # lidar_acq.py 가 포트를 소유 → 여기서는 공유 메모리 버스를 읽기만 함
+    bus = ScanBus.attach(name)
+    reader = BusReader(bus)
+    print(f"[lidar_server] 공유 메모리 버스 '{name}' 에서 수신")
+    try:
+        while True:
+            got = reader.read(timeout=1.0)
+            if got is None: continue
+            _, ts, ang, rng = got
+            keep = rng > 0
+            _publish(np.degrees(ang[keep]), rng[keep], f"bus:{name}", ts=ts)
+    finally:
+        reader.close()
+
 def _lidar_loop():
     port = os.getenv("LIDAR_PORT", "/dev/ttyUSB0")
     baud = int(os.getenv("LIDAR_BAUD", "128000"))
+    bus_name = os.getenv("LIDAR_BUS")
+    if REPLAY_PATH:
+        return _replay_loop(REPLAY_PATH, REPLAY_SPEED)
+    if bus_name:
+        return _bus_loop(bus_name)
     if not HAS_LIDAR:
         print("[lidar_server] ydlidar 모듈 없음 → 시뮬레이터로 동작")
         return _sim_loop()
@@ -54,49 +127,63 @@ def _lidar_loop():
 
     print(f"[lidar_server] LiDAR 연결: {port}@{baud}")
     scan = ydlidar.LaserScan()
+    conv = ScanConverter(degrees=True, drop_invalid=True)
     while True:
         if L.doProcessSimple(scan):
-            ang_deg, rng = [], []
-            if hasattr(scan, "points") and scan.points:
-                for p in scan.points:
-                    if p.range > 0:
-                        ang_deg.append(math.degrees(p.angle))
-                        rng.append(float(p.range))
-            elif hasattr(scan, "ranges") and scan.ranges:
-                a0 = getattr(scan, "angle_min", 0.0)
-                inc = getattr(scan, "angle_increment", 0.0)
-                for i, d in enumerate(list(scan.ranges)):
-                    if d > 0:
-                        ang_deg.append(math.degrees(a0 + inc*i))
-                        rng.append(float(d))
-            with _lock:
-                _latest["ts"] = time.time()
-                _latest["angles"] = ang_deg
-                _latest["ranges"] = rng
-                _latest["source"] = port
+            ang_deg, rng = conv.convert(scan)
+            _publish(ang_deg, rng, port)
         time.sleep(0.03)
 
 @app.get("/health")
 def health():
-    with _lock:
-        return {
-            "ok": True,
-            "source": _latest["source"],
-            "points": len(_latest["ranges"]),
-            "ts": _latest["ts"],
-        }
+    f = _store.latest()
+    return {
+        "ok": True,
+        "source": f.meta.get("source"),
+        "points": int(f.ranges.size),
+        "ts": f.ts,
+        "seq": f.gen,
+        "frames": _store.stats(),
+        "stream": _bcast.stats(),
+    }
 
 @app.get("/lidar/latest")
 def lidar_latest():
-    with _lock:
-        # 대시보드가 기대하는 형식 그대로 반환
-        return {
-            "ts": _latest["ts"],
-            "angles": _latest["angles"],
-            "ranges": _latest["ranges"],
-        }
+    # 대시보드가 기대하는 형식 그대로 반환 (수집 루프는 기다리지 않음)
+    return _store.read(lambda f: {
+        "ts": f.ts,
+        "angles": f.angles.tolist(),
+        "ranges": f.ranges.tolist(),
+    })
+
+@app.get("/lidar/latest.bin")
+def lidar_latest_bin():
+    buf = _store.read(lambda f: pack_frame(f.gen & 0xFFFFFFFF, f.ts, f.angles, f.ranges))
+    return Response(content=buf,
+                    media_type="application/octet-stream",
+                    headers={"Cache-Control": "no-store"})
+
+@app.websocket("/lidar/stream")
+async def lidar_stream(ws: WebSocket):
+    """새 스캔마다 /lidar/latest.bin 과 같은 바이너리 프레임을 push. 느린 클라이언트는 중간 프레임을 건너뜀."""
+    await ws.accept()
+    sub = _bcast.subscribe()
+    try:
+        while True:
+            await ws.send_bytes(await sub.get())
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        _bcast.unsubscribe(sub)
 
 if __name__ == "__main__":
     import uvicorn, threading
+    if RECORD_PATH and not REPLAY_PATH:
+        _recorder = ScanRecorder(RECORD_PATH, source="lidar_server")
+        print(f"[lidar_server] 기록: {RECORD_PATH} (기존 {_recorder.count}스캔)")
     threading.Thread(target=_lidar_loop, daemon=True).start()
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    try:
+        uvicorn.run(app, host="0.0.0.0", port=8001)
+    finally:
+        if _recorder is not None:
+            _recorder.close()
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+# loop_sched.py
+# 실시간 제어 루프용 도구 (avoidance_control 등)
+#  - LoopScheduler : monotonic 절대 마감시각 기반 주기 실행 + 오버런/지터 집계
+#  - Watchdog      : 별도 스레드. kick()이 timeout 동안 없으면 on_stall() 한 번 호출
+#  - LatencyHistogram / StageTimer : 구간별(acquire, sectors, actuate …) 지연 히스토그램
+
+import time, threading
+from contextlib import contextmanager
+import numpy as np
+
+# 0.05ms ~ 2s 로그 간격 버킷 (ms)
+_EDGES_MS = np.concatenate([[0.0], np.logspace(np.log10(0.05), np.log10(2000.0), 40)])
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = np.zeros(_EDGES_MS.size, np.int64)   # 마지막 버킷 = 2s 초과
+        self.n = 0; self.total = 0.0; self.max = 0.0
+
+    def record(self, seconds: float):
+        ms = seconds * 1000.0
+        self.counts[int(np.searchsorted(_EDGES_MS, ms, side="right")) - 1] += 1
+        self.n += 1; self.total += ms
+        if ms > self.max: self.max = ms
+
+    def quantile(self, q: float) -> float:
+        """버킷 안에서 선형 보간 + 관측 최대값으로 자름 (버킷 상한을 그대로 쓰면 p99 > max 가 될 수 있음)."""
+        if self.n == 0: return 0.0
+        c = np.cumsum(self.counts)
+        target = q * self.n
+        i = min(int(np.searchsorted(c, target)), c.size - 1)
+        lo = _EDGES_MS[i]
+        hi = _EDGES_MS[i + 1] if i + 1 < _EDGES_MS.size else self.max   # 마지막 버킷(2s 초과)은 max 까지
+        below = c[i - 1] if i else 0
+        frac = (target - below) / self.counts[i] if self.counts[i] else 1.0
+        return float(min(lo + frac * (hi - lo), self.max))
+
+    def summary(self) -> dict:
+        return {
+            "count": self.n,
+            "mean_ms": round(self.total / self.n, 3) if self.n else 0.0,
+            "p50_ms": round(self.quantile(0.50), 3),
+            "p90_ms": round(self.quantile(0.90), 3),
+            "p99_ms": round(self.quantile(0.99), 3),
+            "max_ms": round(self.max, 3),
+        }
+
+    def buckets(self) -> list:
+        """[[상한 ms, 개수], …] (0인 버킷 제외)"""
+        upper = np.r_[_EDGES_MS[1:], np.inf]
+        return [[float(u), int(c)] for u, c in zip(upper, self.counts) if c]
+
+class StageTimer:
+    """with stages.time("acquire"): ...  → 구간별 히스토그램"""
+    def __init__(self, *names):
+        self.hist = {n: LatencyHistogram() for n in names}
+
+    @contextmanager
+    def time(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t0)
+
+    def record(self, name: str, seconds: float):
+        h = self.hist.get(name)
+        if h is None:
+            h = self.hist[name] = LatencyHistogram()
+        h.record(seconds)
+
+    def summary(self) -> dict:
+        return {n: h.summary() for n, h in self.hist.items()}
+
+class LoopScheduler:
+    """
+    절대 마감시각(monotonic) 기준으로 주기를 맞춤. sleep(INTERVAL - dt) 방식과 달리 오차가 누적되지 않음.
+    wait()이 이미 지난 마감을 만나면 오버런으로 세고 다음 격자 시각으로 건너뜀(밀린 주기를 몰아서 돌지 않음).
+    """
+    def __init__(self, hz: float, clock=time.monotonic, sleep=time.sleep):
+        self.period = 1.0 / hz
+        self.clock = clock; self.sleep = sleep
+        self.next = None
+        self.cycles = 0
+        self.overruns = 0
+        self.missed = 0            # 오버런으로 건너뛴 주기 수
+        self.jitter = LatencyHistogram()   # 마감 대비 실제 깨어난 지연
+        self.cycle = LatencyHistogram()    # 주기 시작 → 다음 wait() 호출까지 (실제 일한 시간)
+        self._t_start = None
+
+    def wait(self):
+        now = self.clock()
+        if self._t_start is not None:
+            self.cycle.record(now - self._t_start)
+        if self.next is None:
+            self.next = now
+        elif now > self.next:
+            self.overruns += 1
+            skip = int((now - self.next) // self.period)
+            self.missed += skip
+            self.next += skip * self.period
+        else:
+            self.sleep(self.next - now)
+            now = self.clock()
+        self.jitter.record(max(0.0, now - self.next))
+        self._t_start = now
+        self.next += self.period
+        self.cycles += 1
+        return now
+
+    def summary(self) -> dict:
+        return {
+            "hz_target": round(1.0 / self.period, 3),
+            "cycles": self.cycles,
+            "overruns": self.overruns,
+            "missed_cycles": self.missed,
+            "jitter": self.jitter.summary(),
+            "cycle": self.cycle.summary(),
+        }
+
+class Watchdog:
+    """제어 루프가 timeout 동안 kick() 하지 않으면 on_stall()을 (멈춘 동안 한 번) 호출."""
+    def __init__(self, timeout: float, on_stall, clock=time.monotonic):
+        self.timeout = timeout
+        self.on_stall = on_stall
+        self.clock = clock
+        self.stalls = 0
+        self.stalled = False
+        self._last = clock()
+        self._stop = threading.Event()
+        self._th = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._last = self.clock()
+        self._th.start()
+        return self
+
+    def kick(self):
+        self._last = self.clock()
+        self.stalled = False
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            remaining = self._last + self.timeout - self.clock()
+            if remaining > 0:
+                self._stop.wait(remaining)
+                continue
+            if not self.stalled:
+                self.stalled = True
+                self.stalls += 1
+                try:
+                    self.on_stall()
+                except Exception as e:
+                    print(f"[watchdog] on_stall 오류: {e}")
+            self._stop.wait(self.timeout)
+
+    def summary(self) -> dict:
+        return {"timeout_s": self.timeout, "stalls": self.stalls, "stalled": self.stalled,
+                "since_kick_s": round(self.clock() - self._last, 3)}
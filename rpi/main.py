@@ -3,47 +3,84 @@
 # main.py
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
+import os
 import time
-import threading
+import struct
 
 # --- 1. module 불러오기 ---
 import motor_control
 import cam_api
+from actuator import Actuator
+from loop_sched import LatencyHistogram
+from timers import DeadlineTimer
 
 # --- 2. FastAPI 서버 및 전역 변수 설정 ---
 app = FastAPI()
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
-lock = threading.Lock()
-last_steer_time = time.time()
-servo_centered = True
+# pigpio 출력은 이 스레드 하나만 함 (핸들러는 명령만 넣고 바로 응답)
+actuator = Actuator(motor_control)
+
+STEER_ANGLES = {"left": 45, "right": 145}   # 그 외 방향은 중앙(90)
+STEER_HOLD_S = 0.5                          # 마지막 조향 명령 후 이 시간이 지나면 서보 중앙 복귀
+# 추진 데드맨: 0이 아닌 throttle 명령이 이 시간 동안 더 오지 않으면 정지 (0 이면 끔)
+THROTTLE_DEADMAN_S = float(os.getenv("THROTTLE_DEADMAN_S", "1.0"))
+
+# 조향/추진 타이머 (명령마다 다시 걸고, 만료 시 한 번만 실행. 유휴 시 CPU 사용 없음)
+timers = DeadlineTimer()
+
+def _recenter():
+    print("🕹️ [서보] 자동 중앙 복귀")
+    actuator.submit(steer=90)
+
+def _deadman():
+    print("🛑 [추진] throttle 명령 끊김 → 정지")
+    actuator.submit(throttle=0)
+
+def command_throttle(val, t0=None):
+    actuator.submit(throttle=val, t0=t0)
+    if val != 0 and THROTTLE_DEADMAN_S > 0:
+        timers.arm("deadman", THROTTLE_DEADMAN_S, _deadman)
+    else:
+        timers.cancel("deadman")
+
+def command_steer(direction, t0=None):
+    target_angle = STEER_ANGLES.get(direction, 90)
+    actuator.submit(steer=target_angle, t0=t0)
+    if target_angle != 90:
+        timers.arm("steer_center", STEER_HOLD_S, _recenter)
+    else:
+        timers.cancel("steer_center")
 
 # --- 3. 서버 시작/종료 이벤트 처리 (가장 중요한 수정 부분) ---
 @app.on_event("startup")
 def startup_event():
     """서버가 시작될 때 딱 한 번 실행됩니다."""
     motor_control.setup()
+    actuator.start()
 
     try:
-        cam_api.cam.start()
+        cam_api.start()
         print("✅ Camera has been started.")
     except Exception as e:
         print(f" FAILED to start camera: {e}")
-            
-    # 서보 자동 복귀 스레드 시작
-    watchdog_thread = threading.Thread(target=servo_watchdog, daemon=True)
-    watchdog_thread.start()
-    
+
+    # 서보 자동 복귀 / 추진 데드맨 타이머
+    timers.start()
+
     print("✅ API 서버가 시작되었고, 하드웨어가 초기화되었습니다.")
 
 @app.on_event("shutdown")
 def shutdown_event():
     """서버가 종료될 때 딱 한 번 실행됩니다."""
+    timers.stop()
+    actuator.stop()
     motor_control.cleanup()
-    cam_api.cam.stop()
+    cam_api.stop()
     print("⏹️ API 서버가 종료되었고, 하드웨어가 정리되었습니다.")
 
 # camera server app <- connect -> /cam route
@@ -58,44 +95,90 @@ class SteerRequest(BaseModel):
     dir: str
 
 @app.post("/cmd/throttle")
-def handle_throttle(req: ThrottleRequest):
-    with lock:
-        current_pwm = req.val
-    
-    print(f"🚢 [속도 설정] 값: {current_pwm}")
-    motor_control.control_dc_motors(current_pwm)
-    
-    return {"status": "ok", "pwm_set_to": current_pwm}
+async def handle_throttle(req: ThrottleRequest):
+    # 30Hz 키 입력 스트림: 출력 스레드에 넘기고 즉시 응답 (밀린 값은 최신 것만 반영)
+    command_throttle(req.val)
+    return {"status": "ok", "pwm_set_to": req.val}
 
 @app.post("/cmd/steer")
-def handle_steer(req: SteerRequest):
-    global last_steer_time
+async def handle_steer(req: SteerRequest):
     direction = req.dir
-    
-    print(f"🧭 [방향키 제어] 방향: {direction}")
-    
-    if direction == "left":
-        target_angle = 45
-    elif direction == "right":
-        target_angle = 145
-    else:
-        target_angle = 90
-
-    motor_control.control_servo_angle(target_angle)
-    last_steer_time = time.time()
+    command_steer(direction)
     return {"status": "ok", "steer": direction}
 
-# --- 5. 서보 자동 중앙 복귀 ---
-def servo_watchdog():
-    global last_steer_time, servo_centered
-    while True:
-        time.sleep(0.05)
-        with lock:
-            if time.time() - last_steer_time > 0.5 and not servo_centered:
-                print("🕹️ [서보] 자동 중앙 복귀")
-                motor_control.control_servo_angle(90)
-                servo_centered = True
-            elif time.time() - last_steer_time <= 0.5:
-                servo_centered = False
-
-    
+# --- 비상 정지: Actuator 큐/lock 을 건너뛰고 바로 GPIO 출력 ---
+# (pigpio 소켓 호출 + 스크립트 완료 대기는 블로킹 → 스레드풀에서 실행해 이벤트 루프를 잡지 않음)
+estop_latency = LatencyHistogram()   # 요청 처리 시작 → GPIO 출력 완료(스크립트 종료 확인)
+
+def _emergency_stop(t0):
+    t_gpio = motor_control.emergency_stop()
+    actuator.clear_pending("throttle")
+    timers.cancel("deadman"); timers.cancel("steer_center")
+    dt = t_gpio - t0
+    estop_latency.record(dt)
+    return dt
+
+@app.post("/cmd/emergency_brake")
+async def emergency_brake():
+    t0 = time.perf_counter()
+    dt = await run_in_threadpool(_emergency_stop, t0)
+    return {"status": "stopped", "latched": True, "gpio_latency_ms": round(dt*1000, 3)}
+
+@app.post("/cmd/emergency_release")
+async def emergency_release():
+    motor_control.emergency_release()
+    return {"status": "ok", "latched": False}
+
+# --- 리모컨 전용 웹소켓 (/cmd/ws) ---
+# 프레임(클라이언트→서버, 7바이트, little-endian): seq(uint32) throttle(int8) steer(int8: -1 좌/0/1 우) flags(uint8)
+#   flags bit0 = throttle 값 포함, bit1 = steer 값 포함, bit2 = 비상 정지(나머지 무시)
+# 응답(ACK, 5바이트): seq(uint32) status(uint8: 0 접수 / 1 오래된 seq 라서 버림 / 2 비상 정지 래치 중)
+WS_FRAME = struct.Struct("<IbbB")
+WS_ACK   = struct.Struct("<IB")
+F_THROTTLE, F_STEER, F_BRAKE = 0x01, 0x02, 0x04
+WS_STEER = {-1: "left", 1: "right"}
+ws_stats = {"clients": 0, "frames": 0, "stale": 0, "bad": 0}
+
+def _seq_newer(seq, last):
+    # uint32 랩어라운드 고려
+    return last is None or 0 < ((seq - last) & 0xFFFFFFFF) < 0x80000000
+
+@app.websocket("/cmd/ws")
+async def cmd_ws(ws: WebSocket):
+    await ws.accept()
+    ws_stats["clients"] += 1
+    last_seq = None
+    try:
+        while True:
+            msg = await ws.receive()
+            if msg["type"] == "websocket.disconnect":
+                break
+            data = msg.get("bytes")
+            t0 = time.perf_counter()
+            if not data or len(data) != WS_FRAME.size:
+                ws_stats["bad"] += 1; continue
+            seq, thr, steer, flags = WS_FRAME.unpack(data)
+            ws_stats["frames"] += 1
+            if flags & F_BRAKE:
+                # 비상 정지는 seq 순서와 관계없이 항상 처리
+                await run_in_threadpool(_emergency_stop, t0)
+                await ws.send_bytes(WS_ACK.pack(seq, 2)); continue
+            if not _seq_newer(seq, last_seq):
+                ws_stats["stale"] += 1
+                await ws.send_bytes(WS_ACK.pack(seq, 1)); continue
+            last_seq = seq
+            if flags & F_THROTTLE:
+                command_throttle(thr, t0)
+            if flags & F_STEER:
+                command_steer(WS_STEER.get(steer), t0)
+            await ws.send_bytes(WS_ACK.pack(seq, 2 if motor_control.is_latched() else 0))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        ws_stats["clients"] -= 1
+
+@app.get("/cmd/metrics")
+async def cmd_metrics():
+    """명령 접수 → PWM 출력 지연, 합쳐진(coalesced) 명령 수, pigpio 호출 수"""
+    return {**actuator.summary(), "ws": dict(ws_stats), "timers": dict(timers.fired),
+            "estop": {"latched": motor_control.is_latched(), "latency": estop_latency.summary()}}
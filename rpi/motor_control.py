@@ -2,6 +2,7 @@
 
 import pigpio
 import time
+import threading
 
 # --- 1. 하드웨어 핀 설정 (BCM 번호 기준) ---
 # pigpio는 BCM 핀 번호만 사용합니다.
@@ -9,9 +10,77 @@ ENA = 12; IN1 = 6;  IN2 = 5   # 왼쪽 모터
 ENB = 13; IN3 = 20; IN4 = 21  # 오른쪽 모터
 SERVO_PIN = 18                # 서보모터
 
+# 방향 핀 비트마스크 (bank 1 = GPIO 0~31)
+IN_MASK  = (1 << IN1) | (1 << IN2) | (1 << IN3) | (1 << IN4)
+DIR_BITS = {1: (1 << IN1) | (1 << IN3),    # 전진
+            -1: (1 << IN2) | (1 << IN4),   # 후진
+            0: 0}                          # 정지
+
+# 서보: 이보다 작은 펄스폭 변화는 무시(데드밴드), RATE_BAND 미만의 작은 변화는 최소 간격마다만 반영
+SERVO_DEADBAND_US    = 8       # ≈ 0.7°
+SERVO_RATE_BAND_US   = 60      # ≈ 5.4°
+SERVO_MIN_INTERVAL_S = 0.05
+
 # pigpio 인스턴스 생성
 pi = pigpio.pi()
 
+# --- 마지막으로 쓴 출력 상태 캐시 (같은 값이면 pigpio 소켓 호출 생략) ---
+_lock = threading.Lock()
+_state = {"dir": None, "duty": None, "pw": None, "pw_t": 0.0}
+stats = {"dc_calls": 0, "dc_writes": 0, "servo_calls": 0, "servo_writes": 0, "round_trips": 0,
+         "estops": 0, "estop_blocked": 0, "estop_script_fail": 0}
+
+# 방향 핀 4개 + PWM 2채널을 pigpio 스크립트 하나로 (소켓 왕복 1번)
+#   p0 = 내릴 비트, p1 = 올릴 비트, p2 = duty(0~255)
+_DC_SCRIPT = f"bc1 p0 bs1 p1 pwm {ENA} p2 pwm {ENB} p2".encode()
+_dc_script_id = None
+
+# 비상 정지: 방향 핀 전부 LOW + PWM 2채널 0 + 서보 중앙(1500us) 을 스크립트 하나로
+SERVO_CENTER_US = 1500
+_ESTOP_SCRIPT = f"bc1 {IN_MASK} pwm {ENA} 0 pwm {ENB} 0 servo {SERVO_PIN} {SERVO_CENTER_US}".encode()
+_estop_script_id = None
+ESTOP_WAIT_S = 0.05              # 비상 정지 스크립트 완료 대기 상한 (넘으면 개별 호출로 다시 씀)
+ESTOP_POLL_S = 0.0005            # 완료 확인 간격 (확인할 때마다 pigpio 소켓 왕복 1번)
+_latched = threading.Event()     # 비상 정지 래치 (emergency_release 전까지 추진 명령 무시)
+
+def _store_script(text):
+    try:
+        sid = pi.store_script(text)
+        if sid < 0:
+            raise RuntimeError(sid)
+        while pi.script_status(sid)[0] == pigpio.PI_SCRIPT_INITING:
+            time.sleep(0.001)
+        return sid
+    except Exception as e:
+        print(f"⚠️ [motor_control] pigpio 스크립트 등록 실패 → 개별 호출로 동작 ({e})")
+        return None
+
+def _write_dc(direction, duty):
+    """_lock 안에서 호출. 방향/듀티를 한 번에 쓰고 캐시 갱신."""
+    set_bits = DIR_BITS[direction]
+    clear_bits = IN_MASK & ~set_bits
+    if _dc_script_id is not None:
+        pi.run_script(_dc_script_id, [clear_bits, set_bits, duty])
+        stats["round_trips"] += 1
+    else:
+        pi.clear_bank_1(clear_bits)
+        if set_bits: pi.set_bank_1(set_bits)
+        pi.set_PWM_dutycycle(ENA, duty)
+        pi.set_PWM_dutycycle(ENB, duty)
+        stats["round_trips"] += 4 if set_bits else 3
+    _state["dir"] = direction; _state["duty"] = duty
+    stats["dc_writes"] += 1
+
+def _write_servo(pulsewidth):
+    pi.set_servo_pulsewidth(SERVO_PIN, pulsewidth)
+    _state["pw"] = pulsewidth; _state["pw_t"] = time.monotonic()
+    stats["servo_writes"] += 1; stats["round_trips"] += 1
+
+def invalidate():
+    """캐시를 비워 다음 호출은 무조건 실제로 쓰게 함 (외부에서 핀을 건드렸을 때)."""
+    with _lock:
+        _state.update(dir=None, duty=None, pw=None, pw_t=0.0)
+
 # --- 2. 초기 설정 및 정리 함수 ---
 def setup():
     """pigpio를 사용하여 GPIO 초기 설정을 수행합니다."""
@@ -23,12 +92,19 @@ def setup():
     # PWM 핀 설정 (주파수는 pigpio가 관리)
     for pin in [ENA, ENB]:
         pi.set_mode(pin, pigpio.OUTPUT)
-    
+
     # 서보 핀 설정
     pi.set_mode(SERVO_PIN, pigpio.OUTPUT)
-    
+
+    global _dc_script_id, _estop_script_id
+    _dc_script_id = _store_script(_DC_SCRIPT)
+    _estop_script_id = _store_script(_ESTOP_SCRIPT)
+    invalidate()
+    with _lock:
+        _write_dc(0, 0)
+
     print("✅ [motor_control] 하드웨어 초기화 완료 (pigpio).")
-    control_servo_angle(90) # 중앙에서 시작
+    control_servo_angle(90, force=True) # 중앙에서 시작
     time.sleep(1)
 
 def cleanup():
@@ -38,30 +114,92 @@ def cleanup():
     pi.set_PWM_dutycycle(ENA, 0)
     pi.set_PWM_dutycycle(ENB, 0)
     pi.set_servo_pulsewidth(SERVO_PIN, 0) # 서보 신호 끄기
+    for sid in (_dc_script_id, _estop_script_id):
+        if sid is None: continue
+        try: pi.delete_script(sid)
+        except Exception: pass
     pi.stop() # pigpio 연결 종료
 
 # --- 3. 핵심 제어 함수 ---
 def control_dc_motors(speed_percent):
-    """추진력을 제어합니다. (-100 ~ 100)"""
+    """추진력을 제어합니다. (-100 ~ 100) 직전과 같은 방향/듀티면 아무것도 쓰지 않습니다."""
     # pigpio의 Duty Cycle은 0~255 범위 사용
     duty_cycle = int(min(abs(speed_percent), 100) / 100.0 * 255)
-    
-    if speed_percent > 0: # 전진
-        pi.write(IN1, 1); pi.write(IN2, 0)
-        pi.write(IN3, 1); pi.write(IN4, 0)
-    elif speed_percent < 0: # 후진
-        pi.write(IN1, 0); pi.write(IN2, 1)
-        pi.write(IN3, 0); pi.write(IN4, 1)
-    else: # 정지
-        pi.write(IN1, 0); pi.write(IN2, 0)
-        pi.write(IN3, 0); pi.write(IN4, 0)
-        
-    pi.set_PWM_dutycycle(ENA, duty_cycle)
-    pi.set_PWM_dutycycle(ENB, duty_cycle)
-
-def control_servo_angle(angle):
-    """방향타의 각도를 제어합니다. (0 ~ 180)"""
+    direction = (speed_percent > 0) - (speed_percent < 0)   # 1 전진 / -1 후진 / 0 정지
+
+    with _lock:
+        stats["dc_calls"] += 1
+        if _latched.is_set() and direction != 0:
+            stats["estop_blocked"] += 1
+            return
+        if direction == _state["dir"] and duty_cycle == _state["duty"]:
+            return
+        _write_dc(direction, duty_cycle)
+
+def control_servo_angle(angle, force=False):
+    """방향타의 각도를 제어합니다. (0 ~ 180) 데드밴드/최소 간격 안의 작은 변화는 건너뜁니다."""
     # pigpio는 각도보다 더 정밀한 pulsewidth(500~2500)를 사용합니다.
-    pulsewidth = 500 + (angle / 180.0) * 2000
-    pi.set_servo_pulsewidth(SERVO_PIN, pulsewidth)
+    pulsewidth = int(round(500 + (angle / 180.0) * 2000))
+
+    with _lock:
+        stats["servo_calls"] += 1
+        last = _state["pw"]
+        if not force and last is not None:
+            delta = abs(pulsewidth - last)
+            if delta < SERVO_DEADBAND_US:
+                return
+            if delta < SERVO_RATE_BAND_US and time.monotonic() - _state["pw_t"] < SERVO_MIN_INTERVAL_S:
+                return
+        _write_servo(pulsewidth)
+
+# --- 4. 비상 정지 (락/캐시를 거치지 않는 최우선 경로) ---
+def _run_estop_script():
+    """
+    비상 정지 스크립트 실행 후 끝날 때까지(= 핀 출력 완료) 대기. run_script 는 시작만 시키고 바로 돌아오므로
+    script_status 를 짧게 쉬며 확인. 정상 종료면 True, 실패/시간 초과면 False (→ 호출 쪽에서 개별 호출로 다시 씀).
+    """
+    try:
+        pi.run_script(_estop_script_id)
+        deadline = time.perf_counter() + ESTOP_WAIT_S
+        while True:
+            status = pi.script_status(_estop_script_id)[0]
+            if status != pigpio.PI_SCRIPT_RUNNING or time.perf_counter() >= deadline:
+                break
+            time.sleep(ESTOP_POLL_S)
+    except Exception:
+        status = None
+    if status == pigpio.PI_SCRIPT_HALTED:
+        return True
+    stats["estop_script_fail"] += 1
+    return False
+
+def emergency_stop():
+    """
+    즉시 정지 + 서보 중앙. _lock 을 기다리지 않고 바로 쓰고, 해제 전까지 래치합니다.
+    반환값: GPIO 쓰기가 끝난 시각(perf_counter)
+    """
+    _latched.set()
+    if not (_estop_script_id is not None and _run_estop_script()):
+        pi.clear_bank_1(IN_MASK)
+        pi.set_PWM_dutycycle(ENA, 0)
+        pi.set_PWM_dutycycle(ENB, 0)
+        pi.set_servo_pulsewidth(SERVO_PIN, SERVO_CENTER_US)
+    t_done = time.perf_counter()
+
+    # 같은 순간 다른 스레드가 쓰던 추진/조향 명령이 위 출력 뒤에 반영됐을 수 있으므로, 락을 잡고 한 번 더 확인
+    with _lock:
+        if _state["dir"] != 0 or _state["duty"] != 0:
+            _write_dc(0, 0)
+        if _state["pw"] != SERVO_CENTER_US:
+            _write_servo(SERVO_CENTER_US)
+        _state["dir"] = 0; _state["duty"] = 0
+        _state["pw"] = SERVO_CENTER_US; _state["pw_t"] = time.monotonic()
+        stats["estops"] += 1
+    return t_done
+
+def emergency_release():
+    """비상 정지 래치 해제 (모터는 정지 상태 그대로, 다음 명령부터 반영)."""
+    _latched.clear()
 
+def is_latched():
+    return _latched.is_set()
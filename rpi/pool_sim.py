@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+# pool_sim.py
+# 2.6×1.75m 풀장 시뮬레이터 (노트북에서 센서/모터 없이 폐루프 실행)
+#  - 2D 레이캐스팅(벡터화): 사각 벽 + 움직이는 원형 장애물, 가우시안 노이즈 + 드롭아웃(거리 0)
+#  - 보트 운동: throttle(%) → 속도 1차 지연, 서보 각도 → 자전거 모델 선회, 충돌 시 정지/카운트
+#  - 기존 코드에 그대로 꽂히는 인터페이스
+#      sim.ydlidar()  : ydlidar 모듈 흉내 (CYdLidar / LaserScan / os_init / LidarProp* 상수)
+#      sim.motors()   : motor_control 흉내 (setup / control_dc_motors / control_servo_angle / emergency_stop …)
+#  - 시간: doProcessSimple() 한 번 = 스캔 주기(1/scan_hz) 만큼 시뮬레이션 진행
+#    realtime=False 면 기다리지 않음 → 제어 루프가 허용하는 만큼 실시간보다 빠르게 돎
+#
+# 환경변수 (from_env): BOAT_SIM_SEED, BOAT_SIM_OBSTACLES(개수), BOAT_SIM_NOISE(m), BOAT_SIM_DROPOUT(0~1)
+#
+# 좌표: 풀장 왼쪽 아래 모서리 (0,0), x 는 긴 변(2.6m), heading 은 반시계(+)
+# 라이다 각도: 0 = 선수, 시계방향(+) = 오른쪽 (avoidance_control 의 섹터 순서와 같음: 음수=왼쪽)
+
+import os, time, math
+import numpy as np
+
+POOL_W, POOL_H = 2.6, 1.75
+STEER_CTR = 90
+
+class PoolSim:
+    def __init__(self, width=POOL_W, height=POOL_H, obstacles=None, n_obstacles=2, seed=None,
+                 n_rays=720, max_range=8.0, min_range=0.05, sigma=0.01, dropout=0.02, scan_hz=10.0,
+                 boat_radius=0.12, v_max=0.45, tau=0.4, wheelbase=0.30, steer_max_deg=35.0,
+                 start=(0.35, POOL_H / 2, 0.0)):
+        self.W, self.H = float(width), float(height)
+        self.rng = np.random.default_rng(seed)
+        self.n_rays = int(n_rays); self.max_range = max_range; self.min_range = min_range
+        self.sigma = sigma; self.dropout = dropout
+        self.scan_dt = 1.0 / scan_hz
+        self.boat_r = boat_radius; self.v_max = v_max; self.tau = tau
+        self.wheelbase = wheelbase; self.steer_max = math.radians(steer_max_deg)
+        # 라이다 각도 (선수 기준, 시계방향 +) — FixedResolution 처럼 스캔마다 같음
+        self.angle_min = -math.pi; self.angle_inc = 2 * math.pi / self.n_rays
+        self.angles = (self.angle_min + self.angle_inc * np.arange(self.n_rays)).astype(np.float32)
+        self._cos = np.cos(self.angles.astype(np.float64)); self._sin = np.sin(self.angles.astype(np.float64))
+        # 장애물 [x, y, r, vx, vy]
+        if obstacles is None:
+            obstacles = self._random_obstacles(n_obstacles)
+        self.obs = np.asarray(obstacles, np.float64).reshape(-1, 5)
+        self.reset(start)
+
+    def reset(self, start=(0.35, POOL_H / 2, 0.0)):
+        self.x, self.y, self.heading = map(float, start)
+        self.v = 0.0
+        self.throttle = 0.0; self.servo = float(STEER_CTR)
+        self.t = 0.0
+        self.collisions = 0; self.in_contact = False
+        self.min_clearance = math.inf
+        self.distance = 0.0
+
+    @classmethod
+    def from_env(cls, **kw):
+        seed = os.getenv("BOAT_SIM_SEED")
+        kw.setdefault("seed", int(seed) if seed else None)
+        kw.setdefault("n_obstacles", int(os.getenv("BOAT_SIM_OBSTACLES", "2")))
+        kw.setdefault("sigma", float(os.getenv("BOAT_SIM_NOISE", "0.01")))
+        kw.setdefault("dropout", float(os.getenv("BOAT_SIM_DROPOUT", "0.02")))
+        return cls(**kw)
+
+    def _random_obstacles(self, n):
+        out = []
+        for _ in range(n):
+            r = self.rng.uniform(0.06, 0.12)
+            x = self.rng.uniform(1.0, self.W - r - 0.05); y = self.rng.uniform(r + 0.05, self.H - r - 0.05)
+            sp = self.rng.uniform(0.03, 0.12); a = self.rng.uniform(0, 2 * math.pi)
+            out.append((x, y, r, sp * math.cos(a), sp * math.sin(a)))
+        return out
+
+    # ----- 명령 -----
+    def command(self, throttle=None, servo=None):
+        if throttle is not None: self.throttle = float(max(-100.0, min(100.0, throttle)))
+        if servo is not None: self.servo = float(servo)
+
+    # ----- 물리 -----
+    def clearance(self, x=None, y=None) -> float:
+        """보트 외곽 ~ 가장 가까운 벽/장애물 표면 거리 (음수면 겹침)."""
+        x = self.x if x is None else x; y = self.y if y is None else y
+        d = min(x, self.W - x, y, self.H - y)
+        if len(self.obs):
+            d = min(d, float(np.min(np.hypot(self.obs[:, 0] - x, self.obs[:, 1] - y) - self.obs[:, 2])))
+        return d - self.boat_r
+
+    def step(self, dt):
+        # 장애물 이동 (벽에서 반사)
+        if len(self.obs):
+            o = self.obs
+            o[:, 0] += o[:, 3] * dt; o[:, 1] += o[:, 4] * dt
+            for i, lim in ((0, self.W), (1, self.H)):
+                lo = o[:, i] < o[:, 2]; hi = o[:, i] > lim - o[:, 2]
+                o[lo | hi, 3 + i] *= -1
+                o[:, i] = np.clip(o[:, i], o[:, 2], lim - o[:, 2])
+        # 보트 (속도 1차 지연 + 자전거 모델)
+        v_target = self.throttle / 100.0 * self.v_max
+        self.v += (v_target - self.v) * (1.0 - math.exp(-dt / self.tau))
+        delta = max(-self.steer_max, min(self.steer_max, math.radians(STEER_CTR - self.servo)))
+        self.heading += self.v * math.tan(delta) / self.wheelbase * dt
+        self.heading = (self.heading + math.pi) % (2 * math.pi) - math.pi
+        nx = self.x + self.v * math.cos(self.heading) * dt
+        ny = self.y + self.v * math.sin(self.heading) * dt
+        c = self.clearance(nx, ny)
+        if c < 0 and c <= self.clearance():      # 겹침이 더 깊어지는 이동만 막음 (빠져나가는 건 허용)
+            if not self.in_contact:
+                self.collisions += 1
+            self.in_contact = True; self.v = 0.0          # 부딪히면 제자리 정지
+        else:
+            self.in_contact = False
+            self.distance += math.hypot(nx - self.x, ny - self.y)
+            self.x, self.y = nx, ny
+        self.min_clearance = min(self.min_clearance, c)
+        self.t += dt
+
+    def advance(self, seconds, max_dt=0.05, autopilot=False):
+        """seconds 만큼 진행 (max_dt 간격으로 나눠서). autopilot=True 면 스캔 주기마다 wander()."""
+        n = max(1, int(math.ceil(seconds / max_dt)))
+        dt = seconds / n; acc = 0.0
+        for _ in range(n):
+            if autopilot and acc <= 0.0:
+                self.wander(); acc = self.scan_dt
+            self.step(dt); acc -= dt
+
+    # ----- 라이다 -----
+    def ray_ranges(self):
+        """노이즈 없는 거리 (n_rays,) float64."""
+        # 월드 방향 = heading - 라이다각 (시계방향 + → 월드 반시계). cos/sin 은 미리 계산한 값으로 합성
+        ch, sh = math.cos(self.heading), math.sin(self.heading)
+        dx = ch * self._cos + sh * self._sin
+        dy = sh * self._cos - ch * self._sin
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tx = np.where(dx > 0, (self.W - self.x) / dx, np.where(dx < 0, -self.x / dx, np.inf))
+            ty = np.where(dy > 0, (self.H - self.y) / dy, np.where(dy < 0, -self.y / dy, np.inf))
+        t = np.minimum(tx, ty)
+        if len(self.obs):
+            ox = self.x - self.obs[:, 0]; oy = self.y - self.obs[:, 1]          # (M,)
+            b = dx[:, None] * ox + dy[:, None] * oy                              # (N, M)
+            c = ox * ox + oy * oy - self.obs[:, 2] ** 2
+            disc = b * b - c
+            hit = disc >= 0
+            root = np.sqrt(np.where(hit, disc, 0.0))
+            tc = np.where(c > 0, -b - root, -b + root)                           # 밖이면 가까운 교점
+            tc = np.where(hit & (tc > 0), tc, np.inf)
+            t = np.minimum(t, tc.min(axis=1))
+        return t
+
+    def scan(self):
+        """→ (angles_rad float32, ranges float32). 범위 밖/드롭아웃은 0 (ydlidar 무효점과 같음)."""
+        r = self.ray_ranges()
+        if self.sigma > 0:
+            r = r + self.rng.normal(0.0, self.sigma, r.size)
+        bad = (r > self.max_range) | (r < self.min_range)
+        if self.dropout > 0:
+            bad |= self.rng.random(r.size) < self.dropout
+        return self.angles.copy(), np.where(bad, 0.0, r).astype(np.float32)
+
+    # ----- 내장 자동조종 (대시보드 데모/서버용: 앞이 막히면 넓은 쪽으로 선회) -----
+    def wander(self, cruise=35, near=0.45):
+        r = self.ray_ranges()
+        a = np.degrees(self.angles)
+        front = r[np.abs(a) < 25].min()
+        left = r[(a > -70) & (a < -25)].min(); right = r[(a > 25) & (a < 70)].min()
+        if self.in_contact:                    # 벽/장애물에 붙었으면 넓은 쪽으로 꺾으며 후진
+            self.command(throttle=-cruise, servo=STEER_CTR + (-35 if left < right else 35))
+        elif front < near:
+            self.command(throttle=cruise * 0.7, servo=STEER_CTR + (35 if left < right else -35))
+        else:
+            self.command(throttle=cruise, servo=STEER_CTR + (15 if left < near else -15 if right < near else 0))
+
+    def state(self) -> dict:
+        return {"t": round(self.t, 3), "x": round(self.x, 3), "y": round(self.y, 3),
+                "heading_deg": round(math.degrees(self.heading), 1), "v": round(self.v, 3),
+                "throttle": self.throttle, "servo": self.servo, "collisions": self.collisions,
+                "min_clearance": round(self.min_clearance, 3), "distance": round(self.distance, 3)}
+
+    # ----- 기존 코드용 어댑터 -----
+    def ydlidar(self, realtime=True, autopilot=False):
+        return FakeYdlidar(self, realtime, autopilot)
+
+    def motors(self):
+        return SimMotors(self)
+
+# ===== ydlidar 흉내 =====
+class _LaserScan:
+    """ScanConverter 의 배열 경로(angles/ranges)로 바로 변환됨 (포인트 객체 순회 없음)."""
+    def __init__(self):
+        self.angles = None; self.ranges = None
+        self.angle_min = 0.0; self.angle_increment = 0.0
+        self.stamp = 0
+
+class _FakeLidar:
+    def __init__(self, mod):
+        self.mod = mod; self.on = False
+        self._next = None
+
+    def setlidaropt(self, *args):
+        return True
+
+    def initialize(self):
+        return True
+
+    def turnOn(self):
+        self.on = True; self._next = time.monotonic()
+        return True
+
+    def turnOff(self):
+        self.on = False
+
+    def disconnecting(self):
+        self.on = False
+
+    def doProcessSimple(self, scan):
+        if not self.on:
+            return False
+        sim = self.mod.sim
+        if self.mod.realtime:
+            # 스캔 주기에 맞춰 대기 (절대 마감시각)
+            self._next += sim.scan_dt
+            wait = self._next - time.monotonic()
+            if wait > 0: time.sleep(wait)
+            else: self._next = time.monotonic()
+        if self.mod.autopilot:
+            sim.wander()
+        sim.step(sim.scan_dt)
+        scan.angles, scan.ranges = sim.scan()
+        scan.angle_min, scan.angle_increment = sim.angle_min, sim.angle_inc
+        scan.stamp = int(sim.t * 1e9)
+        return True
+
+class FakeYdlidar:
+    """import ydlidar 대신 쓰는 모듈 흉내. 설정 상수는 아무 값이나 받아들임."""
+    def __init__(self, sim, realtime=True, autopilot=False):
+        self.sim = sim; self.realtime = realtime; self.autopilot = autopilot
+
+    def __getattr__(self, name):
+        if name.startswith(("LidarProp", "TYPE_", "YDLIDAR_")):
+            return name
+        raise AttributeError(name)
+
+    def os_init(self):
+        pass
+
+    def CYdLidar(self):
+        return _FakeLidar(self)
+
+    def LaserScan(self):
+        return _LaserScan()
+
+# ===== motor_control 흉내 =====
+class SimMotors:
+    """motor_control 과 같은 함수 이름. 명령은 시뮬레이터 보트로 들어감."""
+    def __init__(self, sim):
+        self.sim = sim
+        self._latched = False
+        self.stats = {"dc_calls": 0, "servo_calls": 0, "estops": 0, "estop_blocked": 0}
+
+    def setup(self):
+        self.sim.command(0, STEER_CTR)
+        print("✅ [pool_sim] 시뮬레이터 모터 사용")
+
+    def cleanup(self):
+        self.sim.command(0, STEER_CTR)
+
+    def invalidate(self):
+        pass
+
+    def control_dc_motors(self, speed_percent):
+        self.stats["dc_calls"] += 1
+        if self._latched and speed_percent != 0:
+            self.stats["estop_blocked"] += 1; return
+        self.sim.command(throttle=speed_percent)
+
+    def control_servo_angle(self, angle, force=False):
+        self.stats["servo_calls"] += 1
+        self.sim.command(servo=angle)
+
+    def emergency_stop(self):
+        self._latched = True; self.stats["estops"] += 1
+        self.sim.command(0, STEER_CTR)
+        return time.perf_counter()
+
+    def emergency_release(self):
+        self._latched = False
+
+    def is_latched(self):
+        return self._latched
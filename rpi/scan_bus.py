@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+# scan_bus.py
+# 프로세스 간 LiDAR 스캔 공유 (multiprocessing.shared_memory 링 버퍼)
+#  - 쓰는 쪽 1개: lidar_acq.py (CYdLidar 핸들/시리얼 포트를 혼자 소유)
+#  - 읽는 쪽 여러 개: avoidance_control.py, lidar_server.py, 기록기 등 → attach 후 복사 없이 뷰로 읽음
+#  - 슬롯마다 seq 를 두는 seqlock 방식: 쓰기 전 0으로 지우고, 다 쓴 뒤 seq 기록
+#    리더는 읽기 전/후 seq 가 같을 때만 유효한 프레임으로 인정
+#  - 깨우기: 리더마다 유닉스 데이터그램 소켓을 {tmp}/{버스 이름}.wake/ 에 만들어 두고, 쓰는 쪽이 write 마다
+#    1바이트씩 보냄 → 리더는 recv 에서 잠들어 있다가 새 스캔에만 깸 (프로세스들이 따로 실행되므로
+#    multiprocessing.Event 는 못 씀). 소켓을 못 쓰면 스캔 주기에 맞춘 적응형 폴링
+#
+# 메모리 배치 (8바이트 정렬)
+#   header  uint64[4]          : magic, capacity(포인트/슬롯), nslots, head_seq
+#   meta    uint64[nslots, 3]  : seq, ts(float64 비트), n
+#   data    float32[nslots, 2, capacity] : [0]=angle(rad), [1]=range(m)  (무효점 포함, 센서 원본 순서)
+
+import os, time, socket, tempfile
+from multiprocessing import shared_memory
+import numpy as np
+
+BUS_NAME = os.getenv("LIDAR_BUS", "eco_lidar_bus")
+_MAGIC = int.from_bytes(b"LBUS0001", "little")
+_HDR_WORDS = 4
+
+def _wake_dir(name: str) -> str:
+    return os.path.join(tempfile.gettempdir(), f"{name}.wake")
+
+def _layout(capacity: int, nslots: int):
+    meta_off = 8*_HDR_WORDS
+    data_off = meta_off + 8*3*nslots
+    size = data_off + 4*2*capacity*nslots
+    return meta_off, data_off, size
+
+class ScanBus:
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        self.shm = shm
+        self.owner = owner
+        hdr = np.ndarray((_HDR_WORDS,), np.uint64, buffer=shm.buf)
+        if int(hdr[0]) != _MAGIC:
+            raise ValueError(f"scan bus '{shm.name}' 형식이 다릅니다")
+        self.capacity, self.nslots = int(hdr[1]), int(hdr[2])
+        meta_off, data_off, _ = _layout(self.capacity, self.nslots)
+        self._hdr = hdr
+        self._meta = np.ndarray((self.nslots, 3), np.uint64, buffer=shm.buf, offset=meta_off)
+        self._meta_ts = self._meta.view(np.float64)
+        self._data = np.ndarray((self.nslots, 2, self.capacity), np.float32, buffer=shm.buf, offset=data_off)
+        self.wake_dir = _wake_dir(shm.name.lstrip("/"))
+        self._wsock = None; self._peers = []; self._peers_t = 0.0
+        if owner and hasattr(socket, "AF_UNIX"):
+            try:
+                os.makedirs(self.wake_dir, exist_ok=True)
+                self._wsock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                self._wsock.setblocking(False)
+            except OSError:
+                self._wsock = None
+
+    # ----- 생성/연결 -----
+    @classmethod
+    def create(cls, name: str = BUS_NAME, capacity: int = 2048, nslots: int = 8) -> "ScanBus":
+        _, _, size = _layout(capacity, nslots)
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # 이전 실행이 비정상 종료하며 남긴 세그먼트 정리 후 재생성
+            old = shared_memory.SharedMemory(name=name); old.close(); old.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        hdr = np.ndarray((_HDR_WORDS,), np.uint64, buffer=shm.buf)
+        hdr[:] = (_MAGIC, capacity, nslots, 0)
+        np.ndarray((nslots, 3), np.uint64, buffer=shm.buf, offset=8*_HDR_WORDS)[:] = 0
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name: str = BUS_NAME) -> "ScanBus":
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)   # Python 3.13+
+        except TypeError:
+            shm = shared_memory.SharedMemory(name=name)
+            # 리더가 종료할 때 resource_tracker 가 세그먼트를 지워버리지 않도록 등록 해제
+            try:
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(shm._name, "shared_memory")
+            except Exception:
+                pass
+        return cls(shm, owner=False)
+
+    def close(self):
+        # numpy 뷰를 먼저 놓아야 close() 가 BufferError 없이 됨
+        self._hdr = self._meta = self._meta_ts = self._data = None
+        if self._wsock is not None:
+            self._wsock.close(); self._wsock = None
+        self.shm.close()
+        if self.owner:
+            try: self.shm.unlink()
+            except FileNotFoundError: pass
+
+    # ----- 쓰기 (lidar_acq 1개) -----
+    @property
+    def head(self) -> int:
+        return int(self._hdr[3])
+
+    def write(self, angles, ranges, ts: float = None) -> int:
+        seq = self.head + 1
+        i = seq % self.nslots
+        n = int(min(np.size(angles), np.size(ranges), self.capacity))
+        self._meta[i, 0] = 0                      # 쓰는 중
+        self._data[i, 0, :n] = np.asarray(angles)[:n]
+        self._data[i, 1, :n] = np.asarray(ranges)[:n]
+        self._meta[i, 2] = n
+        self._meta_ts[i, 1] = time.time() if ts is None else ts
+        self._meta[i, 0] = seq                    # 완료
+        self._hdr[3] = seq
+        self._notify()
+        return seq
+
+    def _notify(self, refresh_s: float = 1.0):
+        """리더 소켓마다 1바이트 (논블로킹). 리더 목록은 refresh_s 마다 폴더에서 다시 읽음."""
+        if self._wsock is None:
+            return
+        now = time.monotonic()
+        if now - self._peers_t > refresh_s:
+            try:
+                self._peers = [os.path.join(self.wake_dir, f) for f in os.listdir(self.wake_dir)]
+            except OSError:
+                self._peers = []
+            self._peers_t = now
+        for p in list(self._peers):
+            try:
+                self._wsock.sendto(b"\0", p)
+            except BlockingIOError:
+                pass                              # 리더 버퍼가 참 → 이미 깨울 거리가 쌓여 있음
+            except OSError:
+                # 리더가 죽고 남은 소켓 파일 → 정리
+                self._peers.remove(p)
+                try: os.unlink(p)
+                except OSError: pass
+
+    # ----- 읽기 -----
+    def read_latest(self, copy: bool = False):
+        """최신 스캔 → (seq, ts, angles, ranges) 또는 None.
+        copy=False 면 공유 메모리 뷰 그대로 반환 → 다 쓴 뒤 valid(seq) 로 덮어쓰기 여부 확인."""
+        for _ in range(4):
+            seq = self.head
+            if seq == 0:
+                return None
+            i = seq % self.nslots
+            if int(self._meta[i, 0]) != seq:
+                continue
+            n = int(self._meta[i, 2]); ts = float(self._meta_ts[i, 1])
+            ang, rng = self._data[i, 0, :n], self._data[i, 1, :n]
+            if copy:
+                ang, rng = ang.copy(), rng.copy()
+            if int(self._meta[i, 0]) == seq:
+                return seq, ts, ang, rng
+        return None
+
+    def valid(self, seq: int) -> bool:
+        return int(self._meta[seq % self.nslots, 0]) == seq
+
+class BusReader:
+    """
+    리더별 커서. read()는 새 스캔이 올 때까지(최대 timeout) 기다렸다가 뷰를 돌려줌.
+    기다릴 때는 깨우기 소켓 recv 에서 잠듦 (쓰는 쪽이 write 마다 신호). 목록 갱신 전 등 신호를 놓쳐도
+    max_wait_s 마다 head 를 다시 확인. 소켓이 없으면 적응형 폴링: 직전 프레임 + 스캔 주기(EMA)의 80% 까지
+    한 번에 자고, 도착 예상 시각 근처에서만 poll_s 간격.
+    """
+    def __init__(self, bus: ScanBus, poll_s: float = 0.002, max_wait_s: float = 0.1):
+        self.bus = bus
+        self.poll_s = poll_s; self.max_wait_s = max_wait_s
+        self.last_seq = 0
+        self.skipped = 0
+        self.wakeups = 0
+        self.period = None; self._t_last = None      # 스캔 주기 추정 (폴링 모드)
+        self.sock_path = None; self._sock = None
+        if hasattr(socket, "AF_UNIX") and os.path.isdir(bus.wake_dir):
+            path = os.path.join(bus.wake_dir, f"{os.getpid()}-{id(self):x}.sock")
+            try:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+                sock.bind(path)
+                self._sock, self.sock_path = sock, path
+            except OSError:
+                pass
+
+    def _drain(self):
+        self._sock.setblocking(False)            # 타임아웃 모드 recv 는 먼저 기다리므로 논블로킹으로
+        try:
+            while True:
+                self._sock.recv(64)
+        except OSError:
+            pass
+
+    def _take(self, copy):
+        if self.bus.head == self.last_seq:
+            return None
+        got = self.bus.read_latest(copy=copy)
+        if got is None or got[0] == self.last_seq:
+            return None
+        if self.last_seq:
+            self.skipped += max(0, got[0] - self.last_seq - 1)
+        self.last_seq = got[0]
+        now = time.monotonic()
+        if self._t_last is not None:
+            dt = now - self._t_last
+            self.period = dt if self.period is None else 0.8 * self.period + 0.2 * dt
+        self._t_last = now
+        return got
+
+    def read(self, timeout: float = 1.0, copy: bool = False):
+        deadline = time.monotonic() + timeout
+        while True:
+            if self._sock is not None:
+                self._drain()                        # 쌓인 신호 비우고 → head 확인 → 없으면 다음 신호까지 잠
+            got = self._take(copy)
+            if got is not None:
+                return got
+            now = time.monotonic()
+            if now >= deadline:
+                return None
+            self.wakeups += 1
+            if self._sock is not None:
+                self._sock.settimeout(min(deadline - now, self.max_wait_s))
+                try: self._sock.recv(64)
+                except (socket.timeout, OSError): pass
+                continue
+            wait = self.poll_s
+            if self.period is not None and self._t_last is not None:
+                wait = max(wait, self._t_last + 0.8 * self.period - now)   # 도착 예상 전까지는 한 번에
+            time.sleep(min(wait, deadline - now, self.max_wait_s))
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close(); self._sock = None
+            try: os.unlink(self.sock_path)
+            except OSError: pass
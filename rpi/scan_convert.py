@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# scan_convert.py
+# ydlidar.LaserScan → float32 NumPy (각도, 거리) 변환 공용 모듈
+#  - lidar_server._lidar_loop / avoidance_control.main / LiDAR 페이지(fetch_pc_frame) 공용
+#  - 포인트 순회는 np.fromiter 한 번(각도·거리 동시), 필터/도 변환은 배열 연산
+#  - 출력 버퍼는 미리 잡아두고 재사용 → 스캔마다 리스트/배열을 새로 만들지 않음
+#  - 입력 형식: scan.points (SDK) / scan.angles + scan.ranges 배열 (시뮬레이터) / scan.ranges + angle_min·angle_increment
+
+from itertools import chain
+import numpy as np
+
+class ScanConverter:
+    """
+    convert(scan) → (angles, ranges) float32 뷰.
+    반환 배열은 내부 버퍼를 가리키므로 다음 convert() 호출 때 덮어써집니다.
+    스캔을 보관해야 하면 호출 쪽에서 복사하세요.
+    """
+    def __init__(self, degrees: bool = False, drop_invalid: bool = True, capacity: int = 1024):
+        self.degrees = degrees            # True면 각도를 도(deg)로, False면 라디안 그대로
+        self.drop_invalid = drop_invalid  # True면 range <= 0 (무효) 포인트 제거
+        self._alloc(capacity)
+
+    def _alloc(self, capacity: int):
+        self.capacity = int(capacity)
+        self._raw = np.empty(2*self.capacity, np.float32)   # [a0, r0, a1, r1, ...]
+        self._ang = np.empty(self.capacity, np.float32)
+        self._rng = np.empty(self.capacity, np.float32)
+        self._idx = np.arange(self.capacity, dtype=np.float32)
+
+    def _reserve(self, n: int):
+        if n > self.capacity:
+            self._alloc(max(n, 2*self.capacity))
+
+    def _empty(self):
+        return self._ang[:0], self._rng[:0]
+
+    def convert(self, scan):
+        pts = getattr(scan, "points", None)
+        if pts is not None and len(pts):
+            n = len(pts); self._reserve(n)
+            raw = self._raw[:2*n]
+            raw[:] = np.fromiter(chain.from_iterable((p.angle, p.range) for p in pts),
+                                 dtype=np.float32, count=2*n)
+            return self._finish(raw[0::2], raw[1::2], n)
+
+        ranges = getattr(scan, "ranges", None)
+        angles = getattr(scan, "angles", None)
+        if angles is not None and ranges is not None and len(ranges):
+            # 배열 훅: 포인트별 각도/거리를 배열로 주는 소스 (pool_sim 등) → 한 번 복사로 끝
+            n = len(ranges); self._reserve(n)
+            ang = self._raw[:n]; rng = self._raw[self.capacity:self.capacity + n]
+            ang[:] = angles; rng[:] = ranges
+            return self._finish(ang, rng, n)
+
+        if ranges is not None and len(ranges):
+            n = len(ranges); self._reserve(n)
+            rng = self._raw[self.capacity:self.capacity + n]
+            rng[:] = np.asarray(ranges, dtype=np.float32)
+            ang = self._raw[:n]
+            a0 = float(getattr(scan, "angle_min", 0.0))
+            inc = float(getattr(scan, "angle_increment", 0.0))
+            np.multiply(self._idx[:n], inc, out=ang); ang += a0
+            return self._finish(ang, rng, n)
+
+        return self._empty()
+
+    def _finish(self, ang, rng, n):
+        if self.drop_invalid:
+            keep = rng > 0
+            k = int(np.count_nonzero(keep))
+            a_out, r_out = self._ang[:k], self._rng[:k]
+            np.compress(keep, ang, out=a_out)
+            np.compress(keep, rng, out=r_out)
+        else:
+            a_out, r_out = self._ang[:n], self._rng[:n]
+            np.copyto(a_out, ang); np.copyto(r_out, rng)
+        if self.degrees:
+            np.degrees(a_out, out=a_out)
+        return a_out, r_out
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+# scan_log.py
+# LiDAR 스캔 기록/재생 (현장 문제 재현, 노트북에서 SLAM/회피 오프라인 벤치마크용)
+#
+# 기록 형식: 폴더 하나
+#   meta.json                      : 형식 버전, 단위(rad, m), 만든 시각, 출처
+#   index.bin                      : 스캔마다 고정 길이 레코드 (INDEX_DTYPE) — np.memmap 으로 바로 읽힘
+#   chunk_00000.ang / .rng         : float32 열(column) 파일. 스캔들을 이어 붙임 (각도 열, 거리 열 따로)
+#   chunk 는 CHUNK_POINTS 포인트마다 새 파일 → 긴 기록도 파일 하나가 끝없이 커지지 않음
+# 각도는 라디안(무효점 포함 가능, 거리 0). 읽을 때는 memmap 뷰라 복사 없음
+#
+#   rec = ScanRecorder("runs/pool1", source="lidar_acq"); rec.write(ang_rad, rng, ts); rec.close()
+#   log = ScanLog("runs/pool1"); ts, ang, rng = log[i]
+#   for ts, ang, rng in ScanReplay("runs/pool1", speed=4.0): ...   # 4배속, speed=0 이면 최대 속도
+
+import os, json, time
+import numpy as np
+
+FORMAT = "eco-scanlog-1"
+CHUNK_POINTS = 4 * 1024 * 1024          # 파일당 포인트 수 (≈16MB × 2열)
+INDEX_DTYPE = np.dtype([("ts", "<f8"), ("chunk", "<u4"), ("n", "<u4"), ("offset", "<u8")])
+
+def _chunk_paths(path, k):
+    base = os.path.join(path, f"chunk_{k:05d}")
+    return base + ".ang", base + ".rng"
+
+class ScanRecorder:
+    def __init__(self, path, source=None, chunk_points: int = CHUNK_POINTS, flush_s: float = 1.0):
+        """path 폴더에 새 기록을 만듦 (이미 기록이 있으면 이어서 씀)."""
+        self.path = path
+        self.chunk_points = int(chunk_points)
+        self.flush_s = flush_s
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            with open(meta_path, "w") as fp:
+                json.dump({"format": FORMAT, "angle_unit": "rad", "range_unit": "m",
+                           "created": time.time(), "source": source}, fp)
+        # 이어 쓰기: 마지막 chunk 와 그 안의 위치를 인덱스에서 복원
+        idx = ScanLog._read_index(path)
+        self.count = int(idx.size)
+        if idx.size:
+            last = idx[-1]
+            self._chunk, self._offset = int(last["chunk"]), int(last["offset"] + last["n"])
+        else:
+            self._chunk, self._offset = 0, 0
+        del idx
+        self._index = open(os.path.join(path, "index.bin"), "ab")
+        tail = self._index.tell() % INDEX_DTYPE.itemsize     # 쓰다 만 마지막 레코드
+        if tail:
+            self._index.truncate(self._index.tell() - tail)
+        self._open_chunk()
+        self._t_flush = time.monotonic()
+
+    def _open_chunk(self):
+        a, r = _chunk_paths(self.path, self._chunk)
+        self._fa = open(a, "ab"); self._fr = open(r, "ab")
+        # 비정상 종료로 인덱스보다 길게 남은 꼬리는 잘라냄
+        for fp in (self._fa, self._fr):
+            if fp.tell() != 4 * self._offset:
+                fp.truncate(4 * self._offset); fp.seek(4 * self._offset)
+
+    def write(self, ang_rad, rng, ts=None):
+        """스캔 한 개 추가. 호출 쪽 버퍼는 바로 재사용해도 됨."""
+        n = int(min(np.size(ang_rad), np.size(rng)))
+        if self._offset and self._offset + n > self.chunk_points:
+            self._fa.close(); self._fr.close()
+            self._chunk += 1; self._offset = 0
+            self._open_chunk()
+        self._fa.write(np.asarray(ang_rad[:n], "<f4").tobytes())
+        self._fr.write(np.asarray(rng[:n], "<f4").tobytes())
+        rec = np.array([(time.time() if ts is None else ts, self._chunk, n, self._offset)], INDEX_DTYPE)
+        self._index.write(rec.tobytes())
+        self._offset += n; self.count += 1
+        now = time.monotonic()
+        if now - self._t_flush >= self.flush_s:
+            self.flush(); self._t_flush = now
+
+    def flush(self):
+        # 데이터 먼저, 인덱스 나중 → 읽는 쪽은 인덱스에 있는 스캔이면 데이터가 있다고 믿어도 됨
+        self._fa.flush(); self._fr.flush(); self._index.flush()
+
+    def close(self):
+        self.flush()
+        for fp in (self._fa, self._fr, self._index):
+            fp.close()
+
+class ScanLog:
+    """기록 읽기. log[i] → (ts, angles_rad, ranges_m) memmap 뷰."""
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as fp:
+            self.meta = json.load(fp)
+        if self.meta.get("format") != FORMAT:
+            raise ValueError(f"알 수 없는 기록 형식: {self.meta.get('format')}")
+        self.index = self._read_index(path)
+        self._maps = {}
+
+    @staticmethod
+    def _read_index(path):
+        p = os.path.join(path, "index.bin")
+        if not os.path.exists(p) or os.path.getsize(p) < INDEX_DTYPE.itemsize:
+            return np.zeros(0, INDEX_DTYPE)
+        n = os.path.getsize(p) // INDEX_DTYPE.itemsize      # 쓰다 만 마지막 레코드는 무시
+        return np.memmap(p, INDEX_DTYPE, mode="r", shape=(n,))
+
+    def __len__(self):
+        return int(self.index.size)
+
+    def _columns(self, k):
+        m = self._maps.get(k)
+        if m is None:
+            m = self._maps[k] = tuple(np.memmap(p, "<f4", mode="r") for p in _chunk_paths(self.path, k))
+        return m
+
+    def __getitem__(self, i):
+        rec = self.index[i]
+        o, n = int(rec["offset"]), int(rec["n"])
+        if n == 0:
+            return float(rec["ts"]), np.zeros(0, np.float32), np.zeros(0, np.float32)
+        a, r = self._columns(int(rec["chunk"]))
+        return float(rec["ts"]), a[o:o + n], r[o:o + n]
+
+    @property
+    def duration(self) -> float:
+        return float(self.index["ts"][-1] - self.index["ts"][0]) if len(self) > 1 else 0.0
+
+class ScanReplay:
+    """
+    기록 재생. 원래 시간 간격을 speed 배로 줄여 재생 (speed=0 이면 기다리지 않음).
+    이터레이터: (원래 ts, angles_rad, ranges_m). loop=True 면 끝에서 처음으로.
+    """
+    def __init__(self, path, speed: float = 1.0, loop: bool = False,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.log = ScanLog(path)
+        self.speed = float(speed); self.loop = loop
+        self.clock = clock; self.sleep = sleep
+        self.played = 0
+        self.done = False              # loop=False 에서 기록 끝까지 재생했으면 True
+        self._it = None
+
+    def __iter__(self):
+        log = self.log
+        if not len(log):
+            return
+        while True:
+            ts0 = float(log.index["ts"][0]); t0 = self.clock()
+            for i in range(len(log)):
+                ts, ang, rng = log[i]
+                if self.speed > 0:
+                    # 절대 마감시각 기준 → 오차가 누적되지 않음
+                    wait = t0 + (ts - ts0) / self.speed - self.clock()
+                    if wait > 0: self.sleep(wait)
+                self.played += 1
+                yield ts, ang, rng
+            if not self.loop:
+                return
+
+    def read(self):
+        """avoidance_control 스캔 소스와 같은 모양: read() → (ang, rng) / 끝나면 None."""
+        if self._it is None:
+            self._it = iter(self)
+        got = next(self._it, None)
+        if got is None:
+            self.done = True; return None
+        return got[1:]
+
+    def close(self):
+        pass
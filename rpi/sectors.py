@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# sectors.py
+# 전방 섹터별 최소거리 계산 (avoidance_control 용)
+#  - 각도를 res_deg 간격 빈(bin)으로 나눔. 빈 인덱스/정렬 순서는 각도 배열이 바뀔 때만 다시 계산
+#    (FixedResolution 라이다는 스캔마다 각도가 같으므로 사실상 한 번)
+#  - 스캔마다: 포인트 → 빈 최소값 (reduceat 1회) → 섹터 최소값 (reduceat 1회)
+#  - 벽 기준치도 빈 단위로 보관(wall_baseline.BaselineModel) → 유효 포인트 수가 바뀌어도 각도가 어긋나지 않음
+#    벽 판정은 빈 최소값과 기준치를 빈끼리 비교 (포인트 단위 슬라이싱 없음)
+
+import numpy as np
+from wall_baseline import BaselineModel
+
+class SectorEngine:
+    def __init__(self, edges_deg=(-60, -20, 20, 60), res_deg: float = 1.0,
+                 cap: float = 1.6, min_range: float = 0.05, wall_tol: float = 0.10,
+                 baseline: BaselineModel = None):
+        """
+        edges_deg : 섹터 경계(도, 오름차순). N+1개 → 섹터 N개
+        cap       : 판단용 최대거리 (이보다 먼 점은 cap 으로 취급)
+        wall_tol  : 벽 기준치 대비 ±비율 안이면 벽으로 보고 제외
+        """
+        self.res_deg = float(res_deg)
+        self.nbins = int(round(360.0 / self.res_deg))
+        self.cap = float(cap); self.min_range = float(min_range); self.wall_tol = float(wall_tol)
+        edges = [self._deg_to_bin(e) for e in edges_deg]
+        if any(b2 <= b1 for b1, b2 in zip(edges, edges[1:])):
+            raise ValueError(f"섹터 경계가 오름차순이 아닙니다: {edges_deg}")
+        self.edges_deg = tuple(edges_deg)
+        self.lo, self.hi = edges[0], edges[-1]
+        self.starts = np.asarray(edges[:-1], np.intp) - self.lo
+        self.nsectors = len(self.starts)
+        self.baseline = baseline if baseline is not None else BaselineModel(self.nbins, wall_tol)
+        if self.baseline.nbins != self.nbins:
+            raise ValueError(f"기준치 빈 개수({self.baseline.nbins}) ≠ 섹터 빈 개수({self.nbins})")
+        self._binmin = np.empty(self.nbins, np.float32)   # 마지막 스캔의 빈 최소값 (벽 포함)
+        self._key = None
+
+    def _deg_to_bin(self, deg):
+        return int(np.floor((deg + 180.0) / self.res_deg))
+
+    def _prepare(self, ang_rad):
+        """각도 배열 → (정렬 순서, 빈 구간 시작, 존재하는 빈) 캐시."""
+        n = ang_rad.size
+        key = (n, float(ang_rad[0]), float(ang_rad[-1])) if n else (0,)
+        if key == self._key:
+            return
+        idx = (np.floor((np.degrees(ang_rad.astype(np.float64)) + 180.0) / self.res_deg)
+               .astype(np.intp) % self.nbins)
+        order = np.argsort(idx, kind="stable")
+        sidx = idx[order]
+        first = np.flatnonzero(np.r_[True, sidx[1:] != sidx[:-1]]) if n else np.empty(0, np.intp)
+        self._order, self._seg, self._bins = order, first, sidx[first]
+        self._key = key
+
+    def bin_mins(self, ang_rad, rng):
+        """빈별 최소거리 (nbins,), 벽 포함. 유효 포인트가 없는 빈은 inf. 다음 호출 때 덮어써짐."""
+        bm = self._binmin; bm.fill(np.inf)
+        if ang_rad.size == 0:
+            return bm
+        self._prepare(ang_rad)
+        r = np.asarray(rng, np.float32)
+        ok = np.isfinite(r) & (r > self.min_range)
+        rr = np.where(ok, r, np.inf).astype(np.float32, copy=False)
+        bm[self._bins] = np.minimum.reduceat(rr[self._order], self._seg)
+        return bm
+
+    @property
+    def last_bins(self):
+        return self._binmin
+
+    def sector_mins(self, ang_rad, rng) -> np.ndarray:
+        """섹터별 최소거리 (nsectors,). 벽 빈은 제외, 점이 없으면 inf, 있으면 cap 이하."""
+        bm = self.bin_mins(ang_rad, rng)
+        sl = slice(self.lo, self.hi)
+        fov = bm[sl]
+        fov = np.where(self.baseline.is_wall(fov, sl), np.inf, fov)
+        out = np.minimum.reduceat(fov, self.starts)
+        return np.where(np.isfinite(out), np.minimum(out, self.cap), np.inf)
+
+    def observe_baseline(self, ang_rad, rng, alpha: float = 0.2):
+        """벽 기준치 학습용: 이 스캔을 그대로 기준치 모델에 반영."""
+        self.baseline.update(self.bin_mins(ang_rad, rng), alpha=alpha)
+
+def split_lcr(mins):
+    """N개 섹터 → (왼쪽 최소, 가운데, 오른쪽 최소). 짝수면 가운데 두 섹터를 가운데로 봄."""
+    n = len(mins); mid = n // 2
+    if n % 2:
+        c_lo, c_hi = mid, mid + 1
+    else:
+        c_lo, c_hi = mid - 1, mid + 1
+    Lm = float(np.min(mins[:c_lo])) if c_lo > 0 else np.inf
+    Cm = float(np.min(mins[c_lo:c_hi]))
+    Rm = float(np.min(mins[c_hi:])) if c_hi < n else np.inf
+    return Lm, Cm, Rm
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+# timers.py
+# 마감시각 기반 타이머 (main.py: 서보 자동 중앙 복귀, 추진 데드맨)
+#  - 스레드 1개가 가장 이른 마감까지만 잠듦. 걸린 타이머가 없으면 무기한 대기 → 유휴 시 CPU 0
+#  - arm(key, …)은 같은 key 의 이전 타이머를 대체 (명령이 올 때마다 다시 거는 용도)
+#  - 콜백은 타이머 스레드에서 실행되므로 짧게 (actuator.submit 처럼 넘기기만)
+
+import heapq, itertools, time, threading
+
+class DeadlineTimer:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._cv = threading.Condition()
+        self._heap = []                    # (deadline, token, key)
+        self._armed = {}                   # key → (token, callback)
+        self._tokens = itertools.count(1)
+        self._stop = False
+        self.fired = {}                    # key → 발화 횟수
+        self._th = threading.Thread(target=self._run, name="deadline-timer", daemon=True)
+
+    def start(self):
+        self._th.start()
+        return self
+
+    def stop(self):
+        with self._cv:
+            self._stop = True
+            self._cv.notify()
+
+    def arm(self, key, delay: float, callback):
+        """delay 초 뒤 callback() 한 번. 같은 key 가 걸려 있으면 새 마감으로 대체."""
+        with self._cv:
+            token = next(self._tokens)
+            self._armed[key] = (token, callback)
+            heapq.heappush(self._heap, (self.clock() + delay, token, key))
+            if self._heap[0][1] == token:     # 가장 이른 마감이 바뀐 경우만 깨움
+                self._cv.notify()
+
+    def cancel(self, key):
+        with self._cv:
+            self._armed.pop(key, None)     # 힙에 남은 항목은 발화 시 token 불일치로 무시됨
+
+    def armed(self, key) -> bool:
+        return key in self._armed
+
+    def _run(self):
+        while True:
+            with self._cv:
+                while True:
+                    if self._stop:
+                        return
+                    # 취소/대체된 항목은 힙 앞에서 정리
+                    while self._heap and self._armed.get(self._heap[0][2], (None,))[0] != self._heap[0][1]:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._cv.wait()
+                        continue
+                    remaining = self._heap[0][0] - self.clock()
+                    if remaining <= 0:
+                        break
+                    self._cv.wait(remaining)
+                _, _, key = heapq.heappop(self._heap)
+                _, callback = self._armed.pop(key)
+                self.fired[key] = self.fired.get(key, 0) + 1
+            try:
+                callback()
+            except Exception as e:
+                print(f"[timers] {key} 콜백 오류: {e}")
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# wall_baseline.py
+# 각도 빈별 벽 거리 모델 (평균 + 분산, 온라인 갱신, .npy 저장/불러오기)
+#  - SectorEngine 이 빈 최소거리(bin minima)를 넘겨주면 빈 단위(O(bins))로 벽 여부를 판단
+#  - 순항(CRUISE) 중에만 update() → 배가 움직이며 벽 거리가 서서히 바뀌어도 따라감
+#  - 기준치보다 "가까워진" 값은 장애물일 수 있으므로 게이트 밖이면 절대 학습하지 않음
+#    기준치보다 "멀어진" 값이 계속되면(장애물이 사라졌거나 벽이 멀어짐) 그 빈을 새로 시작
+
+import os
+import numpy as np
+
+class BaselineModel:
+    def __init__(self, nbins: int, wall_tol: float = 0.10, k_sigma: float = 3.0,
+                 alpha: float = 0.05, reseed_n: int = 20):
+        self.nbins = int(nbins)
+        self.wall_tol = wall_tol      # 평균 대비 ±비율 → 벽
+        self.k_sigma = k_sigma        # 또는 ±k·표준편차 안 → 벽
+        self.alpha = alpha            # 온라인 EMA 계수
+        self.reseed_n = reseed_n      # 연속으로 멀게 보인 횟수가 이만큼이면 빈 재시작
+        self.mean = np.full(self.nbins, np.nan, np.float32)
+        self.var = np.zeros(self.nbins, np.float32)
+        self.count = np.zeros(self.nbins, np.float32)
+        self._far = np.zeros(self.nbins, np.int32)
+        self.dirty = False
+
+    @property
+    def known(self) -> int:
+        return int(np.count_nonzero(~np.isnan(self.mean)))
+
+    def _gate(self, sl):
+        return np.maximum(self.wall_tol*self.mean[sl], self.k_sigma*np.sqrt(self.var[sl]))
+
+    def is_wall(self, x, sl=slice(None)):
+        """빈 최소거리 x(= mean[sl] 과 같은 길이) 중 벽으로 볼 빈. 기준치 없는 빈은 False."""
+        with np.errstate(invalid="ignore"):
+            return np.abs(x - self.mean[sl]) <= self._gate(sl)
+
+    def update(self, x, alpha: float = None):
+        """x: 빈 최소거리 (nbins,), 측정 없는 빈은 inf."""
+        a = self.alpha if alpha is None else alpha
+        seen = np.isfinite(x)
+        unknown = np.isnan(self.mean)
+        with np.errstate(invalid="ignore"):
+            dev = x - self.mean
+            gate = self._gate(slice(None))
+            follow = seen & ~unknown & (np.abs(dev) <= gate)
+            far = seen & ~unknown & (dev > gate)
+        self._far[far] += 1
+        self._far[follow] = 0
+        seed = (seen & unknown) | (far & (self._far >= self.reseed_n))
+        if np.any(seed):
+            self.mean[seed] = x[seed]; self.var[seed] = 0.0; self.count[seed] = 1; self._far[seed] = 0
+        if np.any(follow):
+            d = dev[follow]
+            self.mean[follow] += a*d
+            self.var[follow] = (1 - a)*(self.var[follow] + a*d*d)
+            self.count[follow] += 1
+        self.dirty = True
+
+    # ----- 저장/불러오기 -----
+    def save(self, path: str):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, np.stack([self.mean, self.var, self.count]).astype(np.float32))
+        os.replace(tmp, path)
+        self.dirty = False
+
+    def load(self, path: str) -> bool:
+        """저장된 모델을 불러옴. 파일이 없거나 빈 개수가 다르면 False."""
+        try:
+            arr = np.load(path)
+        except (OSError, ValueError):
+            return False
+        if arr.shape != (3, self.nbins):
+            return False
+        self.mean[:], self.var[:], self.count[:] = arr
+        self._far[:] = 0
+        self.dirty = False
+        return True
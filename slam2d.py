@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+# slam2d.py
+# 키프레임 + 로컬 서브맵 정합 2D SLAM (LiDAR 페이지용)
+#  - 매 스캔을 직전 스캔이 아니라 최근 키프레임 submap_kf 개를 합친 서브맵(월드 좌표 점 + 법선)에 ICP2D 로 정합
+#    → 스캔마다 오차가 쌓이지 않고, 서브맵 크기가 고정이라 프레임당 비용도 세션 길이와 무관
+#  - 키프레임: 마지막 키프레임에서 kf_dist(m) 또는 kf_angle(rad) 이상 움직이면 추가 (서브맵 KD-tree 도 이때만 다시 만듦)
+#  - 궤적: 키프레임 자세 + 현재 자세 (프레임마다 쌓지 않음 → 오래 돌려도 잘리지 않음)
+#  - pgo=True: 새 키프레임이 서브맵 밖의 옛 키프레임 근처(loop_radius)로 돌아오면 루프 클로저 정합 →
+#    포즈 그래프 최적화(가우스-뉴턴, 키프레임 0 고정)를 백그라운드 스레드에서 돌리고 끝나면 자세를 보정
+#
+#   slam = SubmapSLAM(pgo=True)
+#   x, y, th = slam.update(xy)      # 라이다 좌표 점(각도순, 스캔 1개) → 월드 자세
+#   slam.trajectory(), slam.stats()
+
+import math, threading
+import numpy as np
+from icp2d import ICP2D, line_normals
+
+# ----- SE(2) -----
+def wrap(a):
+    return (a + math.pi) % (2 * math.pi) - math.pi
+
+def compose(a, b):
+    c, s = math.cos(a[2]), math.sin(a[2])
+    return (a[0] + c * b[0] - s * b[1], a[1] + s * b[0] + c * b[1], wrap(a[2] + b[2]))
+
+def inverse(a):
+    c, s = math.cos(a[2]), math.sin(a[2])
+    return (-c * a[0] - s * a[1], s * a[0] - c * a[1], -a[2])
+
+def between(a, b):
+    """a 좌표에서 본 b 자세"""
+    return compose(inverse(a), b)
+
+def transform(pose, xy, translate=True):
+    c, s = math.cos(pose[2]), math.sin(pose[2])
+    out = xy @ np.array([[c, s], [-s, c]])
+    return out + (pose[0], pose[1]) if translate else out
+
+# ----- 포즈 그래프 -----
+W_ODOM = (1 / 0.05**2, 1 / 0.05**2, 1 / math.radians(2.0)**2)    # 정보행렬 대각 (1/분산)
+W_LOOP = (1 / 0.03**2, 1 / 0.03**2, 1 / math.radians(1.0)**2)
+
+def optimize_pose_graph(poses, edges, iters: int = 10):
+    """
+    poses: (n,3), edges: [(i, j, z=(dx,dy,dth) i 좌표에서 본 j, w=정보 대각)]
+    가우스-뉴턴 (노드 0 고정). 키프레임 수백 개 수준이라 밀집 행렬로 충분.
+    """
+    x = np.array(poses, np.float64); n = len(x)
+    for _ in range(iters):
+        H = np.zeros((3 * n, 3 * n)); b = np.zeros(3 * n)
+        for i, j, z, w in edges:
+            xi, xj = x[i], x[j]
+            ci, si = math.cos(xi[2]), math.sin(xi[2]); cz, sz = math.cos(z[2]), math.sin(z[2])
+            RiT = np.array([[ci, si], [-si, ci]]); RzT = np.array([[cz, sz], [-sz, cz]])
+            dRiT = np.array([[-si, ci], [-ci, -si]])
+            dt = xj[:2] - xi[:2]
+            e = np.r_[RzT @ (RiT @ dt - z[:2]), wrap(xj[2] - xi[2] - z[2])]
+            A = np.zeros((3, 3)); A[:2, :2] = -RzT @ RiT; A[:2, 2] = RzT @ dRiT @ dt; A[2, 2] = -1.0
+            B = np.zeros((3, 3)); B[:2, :2] = RzT @ RiT; B[2, 2] = 1.0
+            W = np.diag(w)
+            si_, sj = slice(3 * i, 3 * i + 3), slice(3 * j, 3 * j + 3)
+            H[si_, si_] += A.T @ W @ A; H[si_, sj] += A.T @ W @ B
+            H[sj, si_] += B.T @ W @ A; H[sj, sj] += B.T @ W @ B
+            b[si_] += A.T @ W @ e; b[sj] += B.T @ W @ e
+        H[:3, :3] += np.eye(3) * 1e9
+        dx = np.linalg.solve(H, -b).reshape(n, 3)
+        x += dx; x[:, 2] = (x[:, 2] + np.pi) % (2 * np.pi) - np.pi
+        if np.abs(dx).max() < 1e-6:
+            break
+    return x
+
+class Keyframe:
+    __slots__ = ("id", "pose", "xy", "normals", "valid")
+    def __init__(self, id, pose, xy, normals, valid):
+        self.id, self.pose, self.xy, self.normals, self.valid = id, pose, xy, normals, valid
+
+class SubmapSLAM:
+    def __init__(self, submap_kf: int = 8, kf_dist: float = 0.25, kf_angle: float = math.radians(15),
+                 pgo: bool = False, loop_radius: float = 0.6, icp: ICP2D = None):
+        self.submap_kf = int(submap_kf); self.kf_dist = kf_dist; self.kf_angle = kf_angle
+        self.pgo = pgo; self.loop_radius = loop_radius
+        self.icp = icp or ICP2D(max_dist=0.25)
+        self.loop_icp = ICP2D(max_iter=30, max_dist=0.40)
+        self._lock = threading.Lock()
+        self._pgo_th = None; self._pgo_again = False
+        self.graph_ver = 0
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.kfs = []; self.edges = []
+            self.pose = (0.0, 0.0, 0.0); self.vel = (0.0, 0.0, 0.0)
+            self.graph_ver += 1          # 돌고 있던 최적화 결과는 버려짐
+            self._corr = (0.0, 0.0, 0.0)
+            self._sub_key = None; self._sub_pts = 0
+            self.loops = 0; self.pgo_runs = 0; self.fails = 0
+
+    # ----- 프레임마다 -----
+    def update(self, xy):
+        xy = np.asarray(xy, np.float64).reshape(-1, 2)
+        with self._lock:
+            if not self.kfs:
+                if len(xy) >= self.icp.min_pts:
+                    self._add_kf(self.pose, xy)
+                return self.pose
+            pred = compose(self.pose, self.vel)              # 등속 가정 웜 스타트
+            ver = self.graph_ver
+            self._submap()
+        pose = self.icp.match(xy, init=pred)                 # 정합은 잠금 밖에서
+        with self._lock:
+            if not self.kfs:                                 # 정합 중에 reset()
+                return self.pose
+            if not self.icp.info["ok"]:
+                self.fails += 1; pose = pred
+            if self.graph_ver != ver:
+                # 정합 중에 최적화 결과가 반영됨 → 같은 보정을 이 결과에도
+                pose = compose(self._corr, pose) if self.graph_ver == ver + 1 else compose(self.pose, self.vel)
+            self.vel = between(self.pose, pose); self.pose = pose
+            d = between(self.kfs[-1].pose, pose)
+            if len(xy) >= self.icp.min_pts and (math.hypot(d[0], d[1]) > self.kf_dist or abs(d[2]) > self.kf_angle):
+                self._add_kf(pose, xy)
+            return pose
+
+    def _submap(self):
+        """최근 키프레임들을 월드 좌표로 합친 기준 점군 (키프레임 추가/자세 보정 때만 다시 만듦)."""
+        recent = self.kfs[-self.submap_kf:]
+        key = (recent[0].id, recent[-1].id, self.graph_ver)
+        if key == self._sub_key:
+            return
+        pts = np.concatenate([transform(k.pose, k.xy) for k in recent])
+        nrm = np.concatenate([transform(k.pose, k.normals, translate=False) for k in recent])
+        ok = np.concatenate([k.valid for k in recent])
+        self.icp.set_reference(pts, nrm, ok)
+        self._sub_key = key; self._sub_pts = len(pts)
+
+    def _add_kf(self, pose, xy):
+        nrm, ok = line_normals(xy, self.icp.jump)
+        kf = Keyframe(len(self.kfs), pose, xy, nrm, ok)
+        if self.kfs:
+            prev = self.kfs[-1]
+            self.edges.append((prev.id, kf.id, between(prev.pose, pose), W_ODOM))
+        self.kfs.append(kf)
+        if self.pgo and self._try_loop(kf):
+            self._schedule_pgo()
+
+    # ----- 루프 클로저 + 포즈 그래프 -----
+    def _try_loop(self, kf) -> bool:
+        old = self.kfs[:max(0, kf.id - self.submap_kf)]
+        if not old:
+            return False
+        d = [math.hypot(k.pose[0] - kf.pose[0], k.pose[1] - kf.pose[1]) for k in old]
+        i = int(np.argmin(d))
+        if d[i] > self.loop_radius:
+            return False
+        cand = old[i]
+        init = between(cand.pose, kf.pose)
+        self.loop_icp.set_reference(cand.xy, cand.normals, cand.valid)
+        z = self.loop_icp.match(kf.xy, init=init)
+        info = self.loop_icp.info
+        if not (info["ok"] and info["fitness"] >= 0.5 and info["rmse"] < 0.03
+                and math.hypot(z[0] - init[0], z[1] - init[1]) < self.loop_radius):
+            return False
+        self.edges.append((cand.id, kf.id, z, W_LOOP))
+        self.loops += 1
+        return True
+
+    def _schedule_pgo(self):
+        # 잠금 안에서 호출됨. 도는 중이면 끝나고 한 번 더 (스레드는 잠금 안에서 _pgo_th=None 후 종료)
+        if self._pgo_th is not None:
+            self._pgo_again = True; return
+        self._pgo_th = threading.Thread(target=self._pgo_run, daemon=True)
+        self._pgo_th.start()
+
+    def _pgo_run(self):
+        while True:
+            with self._lock:
+                self._pgo_again = False
+                ver = self.graph_ver
+                poses = [k.pose for k in self.kfs]; edges = list(self.edges)
+            new = optimize_pose_graph(poses, edges)
+            with self._lock:
+                if self.graph_ver == ver and len(self.kfs) >= len(poses):
+                    n = len(poses)
+                    # 최적화 뒤에 추가된 키프레임/현재 자세는 마지막 노드의 보정량만큼 같이 옮김
+                    corr = compose(tuple(new[-1]), inverse(poses[-1]))
+                    for k, p in zip(self.kfs, new):
+                        k.pose = (float(p[0]), float(p[1]), float(p[2]))
+                    for k in self.kfs[n:]:
+                        k.pose = compose(corr, k.pose)
+                    self.pose = compose(corr, self.pose)
+                    self._corr = corr; self.graph_ver += 1
+                    self.pgo_runs += 1
+                if not self._pgo_again:
+                    self._pgo_th = None
+                    return
+
+    # ----- 조회 -----
+    def trajectory(self) -> np.ndarray:
+        with self._lock:
+            return np.array([k.pose[:2] for k in self.kfs] + [self.pose[:2]], np.float64)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"keyframes": len(self.kfs), "submap_pts": self._sub_pts, "loops": self.loops,
+                    "pgo_runs": self.pgo_runs, "fails": self.fails, "icp": dict(self.icp.info)}